@@ -0,0 +1,119 @@
+"""Сохранение сгенерированного курса: построчные транзакции против пакетной записи.
+
+Запуск (база создаётся во временном файле):
+
+    uv run python -m benchmarks.bulk_crud --modules 20 --repeat 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+
+def build_course(modules_count: int, blocks_per_module: int, assessments_per_module: int):
+    from src.core import enums, schemas  # noqa: PLC0415
+
+    course = schemas.Course(
+        title="Электроника", description="Курс по основам электроники",
+        discipline="Электроника", creator_id=1,
+    )
+    modules = [
+        schemas.Module(
+            title=f"Модуль {i}",
+            description=f"Описание модуля {i}",
+            order=i,
+            content_blocks=[
+                schemas.ContentBlock(
+                    block_type=enums.BlockType.TEXT,
+                    data=schemas.TheoryBlock(content=f"# Тема {j}\n\n" + "Текст лекции. " * 200),
+                )
+                for j in range(blocks_per_module)
+            ],
+            assessments=[
+                schemas.Assessment(
+                    assessment_type=enums.AssessmentType.TEST,
+                    title=f"Тест {j}",
+                    description="Проверка знаний по модулю",
+                    verification_rules={"question_count": 10, "time_limit": 1800},
+                )
+                for j in range(assessments_per_module)
+            ],
+        )
+        for i in range(modules_count)
+    ]
+    return course, modules
+
+
+async def save_row_by_row(course, modules) -> None:
+    """Прежний способ: каждая строка в отдельной сессии и транзакции"""
+    from src.database import crud, models  # noqa: PLC0415
+
+    await crud.create(course, model_class=models.Course)
+    for module in modules:
+        await crud.create(
+            crud.to_row(module, models.Module, course_id=course.id, dependencies=[]),
+            model_class=models.Module,
+        )
+        for position, content_block in enumerate(module.content_blocks):
+            await crud.create(
+                crud.to_row(
+                    content_block, models.ContentBlock, module_id=module.id, position=position
+                ),
+                model_class=models.ContentBlock,
+            )
+        for assessment in module.assessments:
+            await crud.create(
+                crud.to_row(assessment, models.Assessment, module_id=module.id),
+                model_class=models.Assessment,
+            )
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from src.database.base import create_tables, engine  # noqa: PLC0415
+    from src.services.courses import save_course  # noqa: PLC0415
+
+    engine.echo = False
+    await create_tables()
+    results: dict[str, list[float]] = {"row_by_row": [], "bulk": []}
+    for _ in range(args.repeat):
+        for name, save in (("row_by_row", save_row_by_row), ("bulk", save_course)):
+            course, modules = build_course(args.modules, args.blocks, args.assessments)
+            started_at = time.perf_counter()
+            await save(course, modules)
+            results[name].append(time.perf_counter() - started_at)
+    await engine.dispose()
+    report = {
+        name: {
+            "median_seconds": round(statistics.median(timings), 4),
+            "min_seconds": round(min(timings), 4),
+        }
+        for name, timings in results.items()
+    }
+    report["speedup"] = round(
+        report["row_by_row"]["median_seconds"] / report["bulk"]["median_seconds"], 2
+    )
+    report["params"] = vars(args)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", type=int, default=20)
+    parser.add_argument("--blocks", type=int, default=8)
+    parser.add_argument("--assessments", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        # Путь к базе читается настройками при импорте `src`
+        os.environ["BOT_PATH"] = str(Path(directory) / "benchmark.sqlite3")
+        report = asyncio.run(run(args))
+    print(json.dumps(report, ensure_ascii=False, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
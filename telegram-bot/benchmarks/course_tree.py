@@ -0,0 +1,256 @@
+"""Чтение дерева курса и поиск задач очереди: JSON блоки без индексов против нормализованной схемы.
+
+Обе базы заполняются одинаковыми данными (по умолчанию 2000 курсов по 5 модулей):
+
+    uv run python -m benchmarks.course_tree --courses 2000 --lookups 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+import sqlalchemy as sa
+
+# Схема до нормализации: блоки хранятся JSON массивом в модуле, индексов нет
+legacy_metadata = sa.MetaData()
+legacy_courses = sa.Table(
+    "courses", legacy_metadata,
+    sa.Column("id", sa.Uuid, primary_key=True),
+    sa.Column("title", sa.String), sa.Column("description", sa.Text),
+    sa.Column("discipline", sa.String), sa.Column("creator_id", sa.BigInteger),
+)
+legacy_modules = sa.Table(
+    "modules", legacy_metadata,
+    sa.Column("id", sa.Uuid, primary_key=True),
+    sa.Column("course_id", sa.Uuid), sa.Column("title", sa.String),
+    sa.Column("description", sa.Text), sa.Column("order", sa.Integer),
+    sa.Column("content_blocks", sa.JSON), sa.Column("dependencies", sa.JSON),
+)
+legacy_assessments = sa.Table(
+    "assessments", legacy_metadata,
+    sa.Column("id", sa.Uuid, primary_key=True),
+    sa.Column("module_id", sa.Uuid), sa.Column("assessment_type", sa.String),
+    sa.Column("title", sa.String), sa.Column("description", sa.Text),
+    sa.Column("verification_rules", sa.JSON),
+)
+legacy_tasks = sa.Table(
+    "tasks", legacy_metadata,
+    sa.Column("id", sa.Uuid, primary_key=True),
+    sa.Column("status", sa.String), sa.Column("resource_id", sa.Uuid),
+    sa.Column("created_at", sa.DateTime),
+)
+
+
+def generate_rows(args: argparse.Namespace) -> dict[str, list[dict]]:
+    rows: dict[str, list[dict]] = {
+        "courses": [], "modules": [], "content_blocks": [], "assessments": [], "tasks": []
+    }
+    for i in range(args.courses):
+        course_id = uuid4()
+        rows["courses"].append({
+            "id": course_id, "title": f"Курс {i}", "description": "Описание курса",
+            "discipline": "Электроника", "creator_id": i + 1,
+        })
+        for order in range(args.modules):
+            module_id = uuid4()
+            rows["modules"].append({
+                "id": module_id, "course_id": course_id, "title": f"Модуль {order}",
+                "description": "Описание модуля", "order": order, "dependencies": [],
+            })
+            rows["content_blocks"].extend(
+                {
+                    "id": uuid4(), "module_id": module_id, "position": position,
+                    "block_type": "text",
+                    "data": {"content": "Текст лекции. " * 100, "generated_by_ai": True},
+                }
+                for position in range(args.blocks)
+            )
+            rows["assessments"].append({
+                "id": uuid4(), "module_id": module_id, "assessment_type": "test",
+                "title": "Тест", "description": "Проверка знаний",
+                "verification_rules": {"question_count": 10},
+            })
+    started_at = datetime.now()  # noqa: DTZ005
+    rows["tasks"] = [
+        {
+            "id": uuid4(),
+            # Большая часть задач уже выполнена, в очереди - около 1%
+            "status": "pending" if i % 100 == 0 else "completed",
+            "resource_id": uuid4(),
+            "created_at": started_at + timedelta(seconds=i),
+        }
+        for i in range(args.tasks)
+    ]
+    return rows
+
+
+def legacy_rows(rows: dict[str, list[dict]]) -> dict[str, list[dict]]:
+    blocks: dict = {}
+    for block in rows["content_blocks"]:
+        blocks.setdefault(block["module_id"], []).append({
+            "id": str(block["id"]), "block_type": block["block_type"], "data": block["data"]
+        })
+    return {
+        **rows,
+        "modules": [
+            {**module, "content_blocks": blocks.get(module["id"], [])}
+            for module in rows["modules"]
+        ],
+    }
+
+
+async def seed(engine, tables: dict[str, sa.Table], rows: dict[str, list[dict]]) -> None:
+    async with engine.begin() as connection:
+        for name, table in tables.items():
+            if rows[name]:
+                await connection.execute(table.insert(), rows[name])
+
+
+async def timed(lookups, load) -> dict:
+    latencies = []
+    queries = 0
+    for lookup in lookups:
+        started_at = time.perf_counter()
+        queries += await load(lookup)
+        latencies.append(time.perf_counter() - started_at)
+    return {
+        "median_ms": round(statistics.median(latencies) * 1000, 3),
+        "total_seconds": round(sum(latencies), 3),
+        "queries_per_lookup": round(queries / len(lookups), 1),
+    }
+
+
+async def run(args: argparse.Namespace, directory: Path) -> dict:
+    from sqlalchemy import event  # noqa: PLC0415
+
+    from src.database import models  # noqa: PLC0415
+    from src.database.base import Base, create_sqlite_engine, engine  # noqa: PLC0415
+    from src.database.queries import read_course_tree  # noqa: PLC0415
+    from src.settings import SQLiteSettings  # noqa: PLC0415
+
+    rows = generate_rows(args)
+    legacy_engine = create_sqlite_engine(SQLiteSettings(path=directory / "legacy.sqlite3"))
+    async with legacy_engine.begin() as connection:
+        await connection.run_sync(legacy_metadata.create_all)
+    await seed(
+        legacy_engine,
+        {
+            "courses": legacy_courses, "modules": legacy_modules,
+            "assessments": legacy_assessments, "tasks": legacy_tasks,
+        },
+        legacy_rows(rows),
+    )
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    await seed(
+        engine,
+        {
+            "courses": models.Course.__table__, "modules": models.Module.__table__,
+            "content_blocks": models.ContentBlock.__table__,
+            "assessments": models.Assessment.__table__, "tasks": models.Task.__table__,
+        },
+        {**rows, "tasks": [
+            {**task, "kind": "course_creation", "payload": {}} for task in rows["tasks"]
+        ]},
+    )
+
+    statements = 0
+
+    def count_statement(*_) -> None:
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_statement)
+
+    async def load_legacy(course_id) -> int:
+        async with legacy_engine.connect() as connection:
+            (await connection.execute(
+                sa.select(legacy_courses).where(legacy_courses.c.id == course_id)
+            )).one()
+            modules = (await connection.execute(
+                sa.select(legacy_modules)
+                .where(legacy_modules.c.course_id == course_id)
+                .order_by(legacy_modules.c.order)
+            )).all()
+            for module in modules:
+                (await connection.execute(
+                    sa.select(legacy_assessments)
+                    .where(legacy_assessments.c.module_id == module.id)
+                )).all()
+        return 2 + len(modules)
+
+    async def load_tree(course_id) -> int:
+        nonlocal statements
+        statements = 0
+        await read_course_tree(course_id)
+        return statements
+
+    async def next_task_legacy(_) -> int:
+        async with legacy_engine.connect() as connection:
+            await connection.execute(
+                sa.select(legacy_tasks.c.id)
+                .where(legacy_tasks.c.status == "pending")
+                .order_by(legacy_tasks.c.created_at)
+                .limit(1)
+            )
+        return 1
+
+    async def next_task(_) -> int:
+        async with engine.connect() as connection:
+            await connection.execute(
+                sa.select(models.Task.id)
+                .where(models.Task.status == "pending")
+                .order_by(models.Task.created_at)
+                .limit(1)
+            )
+        return 1
+
+    course_ids = random.Random(0).choices(  # noqa: S311
+        [course["id"] for course in rows["courses"]], k=args.lookups
+    )
+    report = {
+        "course_tree": {
+            "legacy": await timed(course_ids, load_legacy),
+            "normalized": await timed(course_ids, load_tree),
+        },
+        "next_pending_task": {
+            "legacy": await timed(range(args.lookups), next_task_legacy),
+            "normalized": await timed(range(args.lookups), next_task),
+        },
+        "rows": {name: len(table_rows) for name, table_rows in rows.items()},
+    }
+    for section in ("course_tree", "next_pending_task"):
+        report[section]["speedup"] = round(
+            report[section]["legacy"]["median_ms"] / report[section]["normalized"]["median_ms"], 2
+        )
+    await legacy_engine.dispose()
+    await engine.dispose()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, default=2000)
+    parser.add_argument("--modules", type=int, default=5)
+    parser.add_argument("--blocks", type=int, default=4)
+    parser.add_argument("--tasks", type=int, default=50_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        # Путь к базе читается настройками при импорте `src`
+        os.environ["BOT_PATH"] = str(Path(directory) / "normalized.sqlite3")
+        report = asyncio.run(run(args, Path(directory)))
+    report["params"] = vars(args)
+    print(json.dumps(report, ensure_ascii=False, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Пропускная способность эмбеддингов при параллельной нагрузке из нескольких процессов.
+
+Сравнивает модель, загруженную в каждый процесс (`inprocess`), с общим сервисом
+эмбеддингов (`service`, `embeddings_server.py`), который объединяет одновременные запросы
+в батчи. `--processes` процессов-клиентов (как воркеры и веб-приложение) отправляют
+по `--concurrency` одновременных запросов `aembed_query` (`aembed_documents`
+при `--texts-per-request` больше 1). Память - RSS процессов-клиентов в обоих режимах
+и процесса сервиса, разница RSS клиентов - экономия на каждый дополнительный воркер.
+
+    uv run python -m benchmarks.embedding_service --processes 4 --concurrency 8
+    EMBEDDINGS_BACKEND=onnx uv run python -m benchmarks.embedding_service --window-ms 10
+"""
+
+from typing import Any
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess  # noqa: S404
+import sys
+import tempfile
+import time
+from pathlib import Path
+from queue import Empty
+
+import httpx
+
+from .pipeline import SEARCH_QUERIES, percentile
+
+MODES = ("inprocess", "service")
+PROJECT_DIR = Path(__file__).parents[1]
+
+
+def rss_megabytes(pid: int | str = "self") -> float | None:
+    """Резидентная память процесса (только Linux)"""
+
+    try:
+        status = Path(f"/proc/{pid}/status").read_text(encoding="utf-8")
+    except OSError:
+        return None
+    for line in status.splitlines():
+        if line.startswith("VmRSS:"):
+            return round(int(line.split()[1]) / 1024, 1)
+    return None
+
+
+async def load(
+        embeddings: Any, concurrency: int, requests: int, texts_per_request: int
+) -> tuple[list[float], float]:
+    """`requests` запросов, не больше `concurrency` одновременно"""
+
+    slots = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def request(i: int) -> None:
+        texts = [
+            SEARCH_QUERIES[(i + j) % len(SEARCH_QUERIES)] for j in range(texts_per_request)
+        ]
+        async with slots:
+            started_at = time.perf_counter()
+            if texts_per_request == 1:
+                await embeddings.aembed_query(texts[0])
+            else:
+                await embeddings.aembed_documents(texts)
+            latencies.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(requests)))
+    return latencies, time.perf_counter() - started_at
+
+
+def client_process(
+        mode: str,
+        url: str,
+        args: argparse.Namespace,
+        ready: Any,
+        start: Any,
+        results: Any,
+) -> None:
+    from src.rag.embeddings import create_embeddings  # noqa: PLC0415
+    from src.rag.embeddings_service import EmbeddingsClient  # noqa: PLC0415
+    from src.settings import settings  # noqa: PLC0415
+
+    embeddings = (
+        create_embeddings(settings.embeddings) if mode == "inprocess" else EmbeddingsClient(url)
+    )
+    embeddings.embed_query(SEARCH_QUERIES[0])
+    ready.put(os.getpid())
+    start.wait()
+    latencies, seconds = asyncio.run(
+        load(embeddings, args.concurrency, args.requests, args.texts_per_request)
+    )
+    results.put({"latencies": latencies, "seconds": seconds, "rss_mb": rss_megabytes()})
+
+
+def wait_for_service(client: httpx.Client, server: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Embeddings service exited with code {server.returncode}")
+        try:
+            client.get("/stats").raise_for_status()
+        except httpx.TransportError:
+            time.sleep(0.5)
+        else:
+            return
+    raise TimeoutError("Embeddings service has not started")
+
+
+def receive(queue: Any, clients: list[Any], timeout: float) -> Any:
+    """Ждёт сообщение клиентов, не зависая при падении одного из них"""
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return queue.get(timeout=1)
+        except Empty:
+            if any(client.exitcode for client in clients):
+                raise RuntimeError("Client process failed") from None
+    raise TimeoutError("Client processes have not responded")
+
+
+def run_mode(mode: str, args: argparse.Namespace, url: str) -> dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    ready, start, results = context.Queue(), context.Event(), context.Queue()
+    clients = [
+        context.Process(target=client_process, args=(mode, url, args, ready, start, results))
+        for _ in range(args.processes)
+    ]
+    for client in clients:
+        client.start()
+    for _ in clients:
+        receive(ready, clients, args.startup_timeout)
+    start.set()
+    reports = [receive(results, clients, args.startup_timeout) for _ in clients]
+    for client in clients:
+        client.join()
+    latencies = [latency for report in reports for latency in report["latencies"]]
+    seconds = max(report["seconds"] for report in reports)
+    client_rss = [report["rss_mb"] for report in reports if report["rss_mb"] is not None]
+    return {
+        "requests": len(latencies),
+        "seconds": round(seconds, 3),
+        "requests_per_second": round(len(latencies) / seconds, 2),
+        "texts_per_second": round(len(latencies) * args.texts_per_request / seconds, 2),
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "latency_p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "client_rss_mb": round(statistics.fmean(client_rss), 1) if client_rss else None,
+    }
+
+
+def run_service(args: argparse.Namespace) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = f"{directory}/embeddings.sock"
+        env = {**os.environ, "EMBEDDINGS_SERVICE_WINDOW_MS": str(args.window_ms)}
+        server = subprocess.Popen(  # noqa: S603
+            [sys.executable, "embeddings_server.py", "--url", f"unix://{socket_path}"],
+            cwd=PROJECT_DIR,
+            env=env,
+        )
+        client = httpx.Client(
+            base_url="http://embeddings", transport=httpx.HTTPTransport(uds=socket_path)
+        )
+        try:
+            wait_for_service(client, server, args.startup_timeout)
+            result = run_mode("service", args, f"unix://{socket_path}")
+            result["server_rss_mb"] = rss_megabytes(server.pid)
+            result["server"] = client.get("/stats").json()
+        finally:
+            client.close()
+            server.terminate()
+            server.wait()
+    return result
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    report: dict[str, Any] = {}
+    for mode in args.modes:
+        report[mode] = run_service(args) if mode == "service" else run_mode(mode, args, "")
+    if all(mode in report for mode in MODES):
+        inprocess, service = report["inprocess"], report["service"]
+        report["speedup"] = round(
+            service["requests_per_second"] / inprocess["requests_per_second"], 2
+        )
+        if inprocess["client_rss_mb"] and service["client_rss_mb"] and service["server_rss_mb"]:
+            report["memory"] = {
+                "inprocess_total_mb": round(inprocess["client_rss_mb"] * args.processes, 1),
+                "service_total_mb": round(
+                    service["client_rss_mb"] * args.processes + service["server_rss_mb"], 1
+                ),
+                "saved_per_extra_worker_mb": round(
+                    inprocess["client_rss_mb"] - service["client_rss_mb"], 1
+                ),
+            }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Запросов на процесс")
+    parser.add_argument("--texts-per-request", type=int, default=1)
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--startup-timeout", type=float, default=600.0)
+    args = parser.parse_args()
+
+    report = run(args)
+    report["params"] = vars(args)
+    print(json.dumps(report, ensure_ascii=False, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Скорость и точность бэкендов эмбеддингов на чанках лекций `educon/Электроника`.
+
+Эталон - PyTorch fp32, с ним сравниваются ONNX Runtime fp32 и ONNX Runtime с int8
+квантованием весов: чанков в секунду, задержка `embed_query`, размер модели, косинусная
+близость векторов чанков к эталону и совпадение top-10 чанков по поисковым запросам.
+Средняя косинусная близость ниже `--min-cosine` считается потерей качества (код выхода 1).
+Отдельно считается доля паддинга при батчах фиксированного размера и батчах по длине.
+
+Первый запуск экспортирует модель в ONNX и квантует её (`EMBEDDINGS_ONNX_DIR`):
+
+    uv run python -m benchmarks.embeddings --threads 4
+    uv run python -m benchmarks.embeddings --backends torch onnx-int8 --limit 200
+"""
+
+from typing import Any
+
+import argparse
+import gc
+import json
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .pipeline import DOCUMENT_SUFFIXES, DOCUMENTS_DIR, SEARCH_QUERIES, percentile
+
+BACKENDS = {
+    "torch": {"backend": "torch"},
+    "onnx": {"backend": "onnx", "quantize": False},
+    "onnx-int8": {"backend": "onnx", "quantize": True},
+}
+TOP_K = 10
+
+
+def load_chunks(documents_dir: Path, limit: int | None) -> list[str]:
+    from src.rag.attached_materials import splitter  # noqa: PLC0415
+    from src.utils import convert_document_to_md  # noqa: PLC0415
+
+    chunks = [
+        chunk
+        for path in sorted(documents_dir.iterdir())
+        if path.suffix.lower() in DOCUMENT_SUFFIXES
+        for chunk in splitter.split_text(convert_document_to_md(path))
+    ]
+    return chunks[:limit]
+
+
+def padding(lengths: list[int], batches: list[list[int]]) -> dict[str, Any]:
+    """Доля паддинга: токены, дополненные до самого длинного текста батча"""
+
+    padded = sum(max(lengths[index] for index in batch) * len(batch) for batch in batches)
+    return {
+        "batches": len(batches),
+        "padded_tokens": padded,
+        "padding_ratio": round(1 - sum(lengths) / padded, 4),
+    }
+
+
+def batching(lengths: list[int], batch_size: int, max_batch_tokens: int) -> dict[str, Any]:
+    from src.rag.embeddings import length_sorted_batches  # noqa: PLC0415
+
+    indexes = list(range(len(lengths)))
+    by_length = sorted(indexes, key=lengths.__getitem__)
+    return {
+        "tokens": sum(lengths),
+        "fixed": padding(
+            lengths, [indexes[i:i + batch_size] for i in range(0, len(indexes), batch_size)]
+        ),
+        "fixed_sorted": padding(
+            lengths, [by_length[i:i + batch_size] for i in range(0, len(by_length), batch_size)]
+        ),
+        "length_sorted": padding(
+            lengths, length_sorted_batches(lengths, max_batch_tokens, batch_size)
+        ),
+    }
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def drift(
+        reference: tuple[np.ndarray, np.ndarray], candidate: tuple[np.ndarray, np.ndarray]
+) -> dict[str, Any]:
+    """Косинусная близость векторов к эталону и совпадение top-10 чанков по запросам"""
+
+    (reference_chunks, reference_queries), (chunks, queries) = reference, candidate
+    cosines = np.sum(normalize(reference_chunks) * normalize(chunks), axis=1).tolist()
+    top_k = min(TOP_K, len(chunks))
+    overlaps = []
+    for reference_query, query in zip(reference_queries, queries, strict=True):
+        expected = np.argsort(-normalize(reference_chunks) @ reference_query)[:top_k]
+        actual = np.argsort(-normalize(chunks) @ query)[:top_k]
+        overlaps.append(len(set(expected) & set(actual)) / top_k)
+    return {
+        "cosine_mean": round(statistics.fmean(cosines), 5),
+        "cosine_p01": round(percentile(cosines, 0.01), 5),
+        "cosine_min": round(min(cosines), 5),
+        "top10_overlap": round(statistics.fmean(overlaps), 4),
+    }
+
+
+def run_backend(
+        name: str, args: argparse.Namespace, chunks: list[str]
+) -> tuple[dict[str, Any], tuple[np.ndarray, np.ndarray], list[int]]:
+    from src.rag.embeddings import (  # noqa: PLC0415
+        create_embeddings,
+        onnx_file_name,
+        onnx_model_dir,
+    )
+    from src.settings import settings  # noqa: PLC0415
+
+    embeddings_settings = settings.embeddings.model_copy(update={
+        **BACKENDS[name],
+        "model_name": args.model_name,
+        "threads": args.threads,
+        "max_batch_tokens": args.max_batch_tokens,
+        "batch_size": args.batch_size,
+        **({"onnx_dir": args.onnx_dir} if args.onnx_dir else {}),
+    })
+    started_at = time.perf_counter()
+    embeddings = create_embeddings(embeddings_settings)
+    load_seconds = time.perf_counter() - started_at
+    embeddings.embed_documents(chunks[:args.warmup])
+    seconds = []
+    for _ in range(args.repeat):
+        started_at = time.perf_counter()
+        vectors = embeddings.embed_documents(chunks)
+        seconds.append(time.perf_counter() - started_at)
+    query_latencies, query_vectors = [], []
+    for query in SEARCH_QUERIES:
+        started_at = time.perf_counter()
+        query_vectors.append(embeddings.embed_query(query))
+        query_latencies.append(time.perf_counter() - started_at)
+    result: dict[str, Any] = {
+        "load_seconds": round(load_seconds, 2),
+        "seconds": round(min(seconds), 3),
+        "chunks_per_second": round(len(chunks) / min(seconds), 2),
+        "query_p50_ms": round(statistics.median(query_latencies) * 1000, 2),
+    }
+    if embeddings_settings.backend == "onnx":
+        path = onnx_model_dir(embeddings_settings) / onnx_file_name(embeddings_settings)
+        result["model_megabytes"] = round(
+            sum(file.stat().st_size for file in path.parent.glob(f"{path.name}*")) / 1024 / 1024,
+            1,
+        )
+    lengths = embeddings.token_lengths(chunks)
+    del embeddings
+    gc.collect()
+    return result, (np.asarray(vectors, dtype=np.float32), np.asarray(query_vectors)), lengths
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    chunks = load_chunks(args.documents, args.limit)
+    backends: dict[str, Any] = {}
+    report: dict[str, Any] = {"chunks": len(chunks), "backends": backends}
+    reference = None
+    for name in args.backends:
+        try:
+            backends[name], vectors, lengths = run_backend(name, args, chunks)
+        except (ImportError, OSError, RuntimeError) as e:
+            backends[name] = {"skipped": f"{type(e).__name__}: {e}"}
+            continue
+        if reference is None:
+            reference = vectors
+            report["batching"] = batching(lengths, args.batch_size, args.max_batch_tokens)
+        else:
+            backends[name].update(drift(reference, vectors))
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS),
+        help="Первый бэкенд - эталон для сравнения точности",
+    )
+    parser.add_argument("--documents", type=Path, default=DOCUMENTS_DIR)
+    parser.add_argument("--limit", type=int, default=None, help="Максимум чанков")
+    parser.add_argument("--model-name", default="deepvk/USER-bge-m3")
+    parser.add_argument("--onnx-dir", type=Path, default=None)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--max-batch-tokens", type=int, default=8192)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    args = parser.parse_args()
+
+    report = run(args)
+    report["params"] = vars(args)
+    print(json.dumps(report, ensure_ascii=False, indent=2, default=str))  # noqa: T201
+    degraded = [
+        name for name, result in report["backends"].items()
+        if result.get("cosine_mean", 1) < args.min_cosine
+    ]
+    if degraded:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""Фейковые внешние сервисы для офлайн бенчмарков.
+
+Один локальный HTTP сервер заменяет OpenAI-совместимый API Yandex Cloud AI Studio
+(воспроизводит записанные ответы моделей), Yandex Search API, поиск RuTube
+и сайты, которые открывает краулер (страницы из `fixtures/html`).
+"""
+
+from typing import Any
+
+import asyncio
+import base64
+import json
+import re
+import socket
+import threading
+import time
+import xml.etree.ElementTree as ET  # noqa: S405
+import zlib
+from collections import Counter
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from uuid import NAMESPACE_URL, uuid4, uuid5
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+HTML_CORPUS_DIR = FIXTURES_DIR / "html"
+LLM_RESPONSES_PATH = FIXTURES_DIR / "llm_responses.json"
+# Примерное количество символов в одном токене модели
+CHARS_PER_TOKEN = 4
+# Токенов в одном SSE событии потокового ответа
+STREAM_CHUNK_TOKENS = 4
+
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class LLMRecordings:
+    """Записанные ответы моделей, подобранные по запросу.
+
+    Структурированные ответы выбираются среди схем запроса (инструменты `ToolStrategy`
+    или `response_format`) по подстроке `match` в промптах, а шаг
+    агента (вызов инструмента, финальный ответ) - по количеству ответов модели
+    в истории. Запросы без схемы (инструменты `write_code`, `draw_mermaid_diagram`)
+    получают первый текстовый ответ с подходящим `match`.
+
+    :param path: JSON файл с записями.
+    """
+
+    def __init__(self, path: Path = LLM_RESPONSES_PATH) -> None:
+        recordings = json.loads(path.read_text(encoding="utf-8"))
+        self.structured: dict[str, list[dict[str, Any]]] = recordings["structured"]
+        self.text: list[dict[str, Any]] = recordings["text"]
+
+    def _schemas(self, body: dict[str, Any]) -> list[str]:
+        response_format = body.get("response_format") or {}
+        names = [
+            response_format.get("json_schema", {}).get("name"),
+            *(tool["function"]["name"] for tool in body.get("tools", [])),
+        ]
+        return [name for name in names if name in self.structured]
+
+    def reply(self, body: dict[str, Any]) -> tuple[str, dict[str, Any]]:
+        """Ответ модели на запрос `/chat/completions`.
+
+        :return: Название записи и шаг ответа (`content` или `tool_calls`).
+        """
+
+        messages = body["messages"]
+        prompt = "\n".join(
+            str(message.get("content") or "")
+            for message in messages
+            if message["role"] in {"system", "user"}
+        )
+        schemas = self._schemas(body)
+        if not schemas:
+            return "text", next(
+                turn for turn in self.text if turn.get("match") is None or turn["match"] in prompt
+            )
+        # Агенту могут быть доступны схемы всех типов блоков, нужная видна по промпту
+        schema, variant = next(
+            (
+                (schema, variant)
+                for schema in schemas
+                for variant in self.structured[schema]
+                if variant.get("match") is not None and variant["match"] in prompt
+            ),
+            (schemas[0], self.structured[schemas[0]][
+                zlib.crc32(prompt.encode()) % len(self.structured[schemas[0]])
+            ]),
+        )
+        step = sum(message["role"] == "assistant" for message in messages)
+        return schema, variant["turns"][min(step, len(variant["turns"]) - 1)]
+
+
+@dataclass(slots=True)
+class FakeStats:
+    requests: Counter[str] = field(default_factory=Counter)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "llm_requests": dict(self.requests),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+
+def _assistant_message(turn: dict[str, Any]) -> tuple[dict[str, Any], str]:
+    if "content" in turn:
+        return {"role": "assistant", "content": turn["content"]}, turn["content"]
+    tool_calls = [
+        {
+            "id": f"call_{uuid4().hex[:24]}",
+            "type": "function",
+            "function": {
+                "name": tool_call["name"],
+                "arguments": json.dumps(tool_call["args"], ensure_ascii=False),
+            },
+        }
+        for tool_call in turn["tool_calls"]
+    ]
+    completion = "".join(tool_call["function"]["arguments"] for tool_call in tool_calls)
+    return {"role": "assistant", "content": None, "tool_calls": tool_calls}, completion
+
+
+def _finish_reason(message: dict[str, Any]) -> str:
+    return "tool_calls" if message.get("tool_calls") else "stop"
+
+
+def _corpus_page(path: Path) -> dict[str, str]:
+    html = path.read_text(encoding="utf-8")
+    title = re.search(r"<title>(.*?)</title>", html, re.DOTALL)
+    paragraph = re.search(r"<p>(.*?)</p>", html, re.DOTALL)
+    return {
+        "name": path.name,
+        "title": title.group(1).strip() if title is not None else path.stem,
+        "passage": " ".join(re.sub(r"<[^>]+>", "", paragraph.group(1)).split())
+        if paragraph is not None else "",
+        "text": html.lower(),
+    }
+
+
+def _find_pages(pages: list[dict[str, str]], query: str) -> list[dict[str, str]]:
+    """Страницы корпуса по количеству слов запроса в тексте"""
+
+    words = [word for word in query.lower().split() if len(word) > 2]  # noqa: PLR2004
+    return sorted(pages, key=lambda page: -sum(word in page["text"] for word in words))
+
+
+def _search_xml(pages: list[dict[str, str]], base_url: str) -> str:
+    """Ответ Yandex Search API в формате XML с документами из корпуса"""
+
+    root = ET.Element("yandexsearch", version="1.0")
+    grouping = ET.SubElement(
+        ET.SubElement(ET.SubElement(root, "response"), "results"), "grouping"
+    )
+    for page in pages:
+        group = ET.SubElement(grouping, "group")
+        ET.SubElement(group, "categ", attr="d", name="127.0.0.1")
+        doc = ET.SubElement(group, "doc")
+        ET.SubElement(doc, "url").text = f"{base_url}/corpus/{page['name']}"
+        ET.SubElement(doc, "domain").text = "127.0.0.1"
+        ET.SubElement(doc, "title").text = page["title"]
+        ET.SubElement(doc, "modtime").text = "20250901T120000"
+        ET.SubElement(doc, "size").text = str(len(page["text"]))
+        ET.SubElement(doc, "charset").text = "utf-8"
+        ET.SubElement(ET.SubElement(doc, "passages"), "passage").text = page["passage"]
+        ET.SubElement(ET.SubElement(doc, "properties"), "extended-text").text = page["passage"]
+    return ET.tostring(root, encoding="unicode", xml_declaration=True)
+
+
+async def _stream_completion(
+        model: str,
+        message: dict[str, Any],
+        usage: dict[str, int] | None,
+        *,
+        ttft_ms: float,
+        token_ms: float,
+) -> AsyncIterator[str]:
+    """Ответ модели событиями SSE, как при `stream=True` в OpenAI API"""
+
+    completion_id, created = f"chatcmpl-{uuid4().hex}", int(time.time())
+
+    def event(choices: list[dict[str, Any]], **fields: Any) -> str:
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": choices,
+            **fields,
+        }
+        return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
+    def delta(delta: dict[str, Any], finish_reason: str | None = None) -> str:
+        return event([{"index": 0, "delta": delta, "finish_reason": finish_reason}])
+
+    await asyncio.sleep(ttft_ms / 1000)
+    yield delta({"role": "assistant", "content": ""})
+    size = STREAM_CHUNK_TOKENS * CHARS_PER_TOKEN
+    if message.get("tool_calls") is None:
+        for start in range(0, len(message["content"]), size):
+            await asyncio.sleep(STREAM_CHUNK_TOKENS * token_ms / 1000)
+            yield delta({"content": message["content"][start:start + size]})
+    for index, tool_call in enumerate(message.get("tool_calls") or []):
+        yield delta({"tool_calls": [{
+            "index": index,
+            "id": tool_call["id"],
+            "type": "function",
+            "function": {"name": tool_call["function"]["name"], "arguments": ""},
+        }]})
+        arguments = tool_call["function"]["arguments"]
+        for start in range(0, len(arguments), size):
+            await asyncio.sleep(STREAM_CHUNK_TOKENS * token_ms / 1000)
+            yield delta({"tool_calls": [{
+                "index": index, "function": {"arguments": arguments[start:start + size]}
+            }]})
+    yield delta({}, _finish_reason(message))
+    if usage is not None:
+        yield event([], usage=usage)
+    yield "data: [DONE]\n\n"
+
+
+def create_app(
+        recordings: LLMRecordings,
+        stats: FakeStats,
+        *,
+        ttft_ms: float = 0,
+        token_ms: float = 0,
+        search_ms: float = 0,
+):
+    """Приложение фейковых сервисов.
+
+    :param recordings: Записанные ответы моделей.
+    :param stats: Счётчики запросов и токенов.
+    :param ttft_ms: Задержка модели до первого токена.
+    :param token_ms: Задержка модели на каждый сгенерированный токен.
+    :param search_ms: Задержка ответа поисковых API.
+    """
+
+    from fastapi import FastAPI, Request  # noqa: PLC0415
+    from fastapi.responses import FileResponse, JSONResponse, StreamingResponse  # noqa: PLC0415
+
+    app = FastAPI()
+    pages = [_corpus_page(path) for path in sorted(HTML_CORPUS_DIR.glob("*.html"))]
+    operations: dict[str, str] = {}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        name, turn = recordings.reply(body)
+        message, completion = _assistant_message(turn)
+        usage = {
+            "prompt_tokens": count_tokens(json.dumps(body["messages"], ensure_ascii=False)),
+            "completion_tokens": count_tokens(completion),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        stats.requests[name] += 1
+        stats.prompt_tokens += usage["prompt_tokens"]
+        stats.completion_tokens += usage["completion_tokens"]
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+            return StreamingResponse(
+                _stream_completion(
+                    body["model"],
+                    message,
+                    usage if include_usage else None,
+                    ttft_ms=ttft_ms,
+                    token_ms=token_ms,
+                ),
+                media_type="text/event-stream",
+            )
+        await asyncio.sleep((ttft_ms + usage["completion_tokens"] * token_ms) / 1000)
+        return JSONResponse({
+            "id": f"chatcmpl-{uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": _finish_reason(message),
+            }],
+            "usage": usage,
+        })
+
+    def raw_data(query: str, base_url: str) -> str:
+        xml_content = _search_xml(_find_pages(pages, query), base_url)
+        return base64.b64encode(xml_content.encode("utf-8")).decode()
+
+    @app.post("/yandex/v2/web/searchAsync")
+    async def search_async(request: Request):
+        body = await request.json()
+        operation_id = uuid4().hex
+        operations[operation_id] = body["query"]["queryText"]
+        await asyncio.sleep(search_ms / 1000)
+        return {"id": operation_id, "done": False}
+
+    @app.post("/yandex/v2/web/search")
+    async def search(request: Request):
+        body = await request.json()
+        await asyncio.sleep(search_ms / 1000)
+        return {"rawData": raw_data(body["query"]["queryText"], str(request.base_url).rstrip("/"))}
+
+    @app.get("/yandex/operations/{operation_id}")
+    async def operation(operation_id: str, request: Request):
+        base_url = str(request.base_url).rstrip("/")
+        return {
+            "id": operation_id,
+            "done": True,
+            "response": {"rawData": raw_data(operations[operation_id], base_url)},
+        }
+
+    @app.get("/rutube/api/search/video")
+    async def rutube_search(query: str):
+        await asyncio.sleep(search_ms / 1000)
+        return {"results": [
+            {
+                "title": f"{page['title']} — видеолекция",
+                "description": page["passage"],
+                "author": {"name": "Кафедра электроники"},
+                "video_url": (
+                    f"https://rutube.ru/video/{uuid5(NAMESPACE_URL, query + page['name']).hex}/"
+                ),
+                "duration": 600 + 60 * i,
+                "publication_ts": "2025-09-01T12:00:00",
+            }
+            for i, page in enumerate(_find_pages(pages, query))
+        ]}
+
+    @app.get("/corpus/{name}")
+    async def corpus_page(name: str):
+        path = HTML_CORPUS_DIR / Path(name).name
+        if not path.is_file():
+            return JSONResponse({"detail": "Not Found"}, status_code=404)
+        return FileResponse(path, media_type="text/html")
+
+    return app
+
+
+@contextmanager
+def serve_fakes(**kwargs: Any) -> Iterator[tuple[str, FakeStats]]:
+    """Запускает фейковые сервисы в отдельном потоке на свободном порту.
+
+    :param kwargs: Параметры `create_app` (задержки модели и поиска).
+    :return: Базовый URL сервера и счётчики запросов.
+    """
+
+    import uvicorn  # noqa: PLC0415
+
+    stats = FakeStats()
+    app = create_app(LLMRecordings(), stats, **kwargs)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{sock.getsockname()[1]}", stats
+    finally:
+        server.should_exit = True
+        thread.join()
+        sock.close()
@@ -0,0 +1,113 @@
+"""Задержка FSM операций бота: MemoryStorage, SQLite/Redis с синхронной записью и пачками.
+
+Каждое "сообщение" читает состояние и данные, дважды вызывает `update_data`
+и меняет состояние, как шаг формы создания курса. Redis профиль использует
+`fakeredis`, если он установлен:
+
+    uv run python -m benchmarks.fsm_storage --chats 200 --messages 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, round(q * (len(values) - 1)))]
+
+
+async def run_profile(storage, args: argparse.Namespace) -> dict:
+    from aiogram.fsm.storage.base import StorageKey  # noqa: PLC0415
+
+    from src.bot.fsm import CourseCreationForm  # noqa: PLC0415
+
+    states = list(CourseCreationForm.__all_states__)
+    latencies = []
+    for message in range(args.messages):
+        for chat_id in range(args.chats):
+            key = StorageKey(bot_id=1, chat_id=chat_id, user_id=chat_id)
+            started_at = time.perf_counter()
+            await storage.get_state(key)
+            await storage.get_data(key)
+            await storage.update_data(key, {f"step_{message}": "ответ " * 20})
+            await storage.update_data(key, {"last_message": message})
+            await storage.set_state(key, states[message % len(states)])
+            latencies.append(time.perf_counter() - started_at)
+    started_at = time.perf_counter()
+    await storage.close()
+    close_seconds = time.perf_counter() - started_at
+    return {
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 4),
+        "latency_p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+        "close_ms": round(close_seconds * 1000, 2),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from aiogram.fsm.storage.base import StorageKey  # noqa: PLC0415
+    from aiogram.fsm.storage.memory import MemoryStorage  # noqa: PLC0415
+
+    from src.bot.storage import (  # noqa: PLC0415
+        PersistentStorage,
+        RedisEntryStore,
+        SQLiteEntryStore,
+    )
+    from src.database.base import Base, engine  # noqa: PLC0415
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    def persistent(store, flush_interval: float) -> PersistentStorage:
+        return PersistentStorage(
+            store, flush_interval=flush_interval, cache_size=10_000, cache_ttl_seconds=30
+        )
+
+    profiles = {
+        "memory": MemoryStorage,
+        "sqlite_sync": lambda: persistent(SQLiteEntryStore(), 0),
+        "sqlite_batched": lambda: persistent(SQLiteEntryStore(), args.flush_interval),
+    }
+    try:
+        from fakeredis import FakeAsyncRedis  # noqa: PLC0415
+    except ImportError:
+        pass
+    else:
+        profiles["redis_sync"] = lambda: persistent(RedisEntryStore(FakeAsyncRedis()), 0)
+        profiles["redis_batched"] = lambda: persistent(
+            RedisEntryStore(FakeAsyncRedis()), args.flush_interval
+        )
+    report = {name: await run_profile(factory(), args) for name, factory in profiles.items()}
+
+    # Состояние переживает перезапуск: новый экземпляр читает его из базы
+    restarted = persistent(SQLiteEntryStore(), args.flush_interval)
+    key = StorageKey(bot_id=1, chat_id=0, user_id=0)
+    report["sqlite_batched"]["survives_restart"] = (
+        await restarted.get_data(key)
+    ).get("last_message") == args.messages - 1
+    await restarted.close()
+    await engine.dispose()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=10)
+    parser.add_argument("--flush-interval", type=float, default=0.05)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        # Путь к базе читается настройками при импорте `src`
+        os.environ["BOT_PATH"] = str(Path(directory) / "fsm.sqlite3")
+        report = asyncio.run(run(args))
+    report["params"] = vars(args)
+    print(json.dumps(report, ensure_ascii=False, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Пропускная способность разбора запросов и сериализации ответов FastAPI приложения.
+
+Разбор: `json.loads` + `model_validate` против `model_validate_json` по сырому телу
+для апдейта Telegram, вложения и сгенерированного модуля курса.
+Сериализация: путь FastAPI по умолчанию (валидация ответа, словарь, `json.dumps`),
+тот же путь с orjson и `TypeAdapter.dump_json` сразу в байты:
+
+    uv run python -m benchmarks.json_serialization --blocks 40 --seconds 1
+"""
+
+import argparse
+import json
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from uuid import uuid4
+
+
+def throughput(func: Callable[[], object], seconds: float) -> float:
+    """Количество вызовов в секунду"""
+
+    calls, started_at = 0, time.perf_counter()
+    while (elapsed := time.perf_counter() - started_at) < seconds:
+        for _ in range(100):
+            func()
+        calls += 100
+    return calls / elapsed
+
+
+def build_update() -> dict:
+    user = {"id": 123456789, "is_bot": False, "first_name": "Иван", "language_code": "ru"}
+    return {
+        "update_id": 900000001,
+        "message": {
+            "message_id": 4242,
+            "date": int(datetime.now(UTC).timestamp()),
+            "chat": {"id": user["id"], "type": "private", "first_name": user["first_name"]},
+            "from": user,
+            "media_group_id": "13579",
+            "caption": "Методичка по электронике, раздел 3",
+            "document": {
+                "file_id": "BQACAgIAAxkBAAIBQ2Zk" * 3,
+                "file_unique_id": "AgADQ2Zk",
+                "file_name": "Электроника_лекция_3.pdf",
+                "mime_type": "application/pdf",
+                "file_size": 2_345_678,
+            },
+        },
+    }
+
+
+def build_module(blocks: int):
+    from src.core import schemas  # noqa: PLC0415
+    from src.core.enums import AssessmentType, BlockType  # noqa: PLC0415
+
+    block_data = [
+        (BlockType.TEXT, schemas.TheoryBlock(content="## Закон Ома\n" + "Теория. " * 200)),
+        (BlockType.VIDEO, schemas.VideoBlock(
+            url="https://rutube.ru/video/1", platform="RuTube", title="Транзисторы",
+            duration_seconds=900, key_moments={60: "Вступление", 300: "Схема"},
+            discussion_questions=["Чем отличается PNP от NPN?"],
+        )),
+        (BlockType.CODE_EXAMPLE, schemas.CodeExampleBlock(
+            language="python", code="print(5 / 220)\n" * 20, explanation="Расчёт тока",
+        )),
+        (BlockType.READING, schemas.ReadingBlock(
+            title="Основы электроники", source_type="книга", pages="10-25",
+            reading_time_minutes=30,
+        )),
+    ]
+    return schemas.Module(
+        title="Полупроводниковые приборы",
+        description="Диоды, транзисторы и их применение",
+        order=3,
+        content_blocks=[
+            schemas.ContentBlock(block_type=block_data[i % 4][0], data=block_data[i % 4][1])
+            for i in range(blocks)
+        ],
+        assessments=[
+            schemas.Assessment(
+                assessment_type=AssessmentType.TEST,
+                title=f"Тест {i}",
+                description="Проверка понимания темы",
+                verification_rules={"question_count": 10, "time_limit": 1800},
+            )
+            for i in range(5)
+        ],
+    )
+
+
+def run(args: argparse.Namespace) -> dict:
+    from aiogram.types import Update  # noqa: PLC0415
+    from pydantic import TypeAdapter  # noqa: PLC0415
+
+    from src.core import schemas  # noqa: PLC0415
+    from src.webapp.serialization import ORJSONResponse  # noqa: PLC0415
+
+    attachment = schemas.Attachment(
+        original_filename="Электроника_лекция_3.pdf",
+        filepath=f"blobs/ab/cd/{uuid4().hex}.pdf",
+        sha256=uuid4().hex * 2,
+        mime_type="application/pdf",
+        size=2_345_678,
+    )
+    module = build_module(args.blocks)
+    orjson_response = ORJSONResponse(content=None)
+    report = {}
+
+    update_body = json.dumps(build_update(), ensure_ascii=False).encode()
+    report["Update"] = {
+        "bytes": len(update_body),
+        "parse_dict_ops": throughput(
+            lambda: Update.model_validate(json.loads(update_body)), args.seconds
+        ),
+        "parse_json_ops": throughput(
+            lambda: Update.model_validate_json(update_body), args.seconds
+        ),
+    }
+    for name, value in (("Attachment", attachment), ("Module", module)):
+        schema_class = type(value)
+        adapter = TypeAdapter(schema_class)
+        body = adapter.dump_json(value)
+
+        def fastapi_default(value=value, adapter=adapter) -> bytes:
+            # Как `serialize_response` FastAPI + `JSONResponse.render`
+            content = adapter.dump_python(adapter.validate_python(value), mode="json")
+            return json.dumps(
+                content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+            ).encode()
+
+        def fastapi_orjson(value=value, adapter=adapter) -> bytes:
+            content = adapter.dump_python(adapter.validate_python(value), mode="json")
+            return orjson_response.render(content)
+
+        report[name] = {
+            "bytes": len(body),
+            "parse_dict_ops": throughput(
+                lambda body=body, schema_class=schema_class: schema_class.model_validate(
+                    json.loads(body)
+                ),
+                args.seconds,
+            ),
+            "parse_json_ops": throughput(
+                lambda body=body, adapter=adapter: adapter.validate_json(body), args.seconds
+            ),
+            "serialize_default_ops": throughput(fastapi_default, args.seconds),
+            "serialize_orjson_ops": throughput(fastapi_orjson, args.seconds),
+            "serialize_dump_json_ops": throughput(
+                lambda value=value, adapter=adapter: adapter.dump_json(value), args.seconds
+            ),
+        }
+    for result in report.values():
+        for key, value in result.items():
+            result[key] = round(value)
+        result["parse_speedup"] = round(result["parse_json_ops"] / result["parse_dict_ops"], 2)
+        if "serialize_default_ops" in result:
+            result["serialize_speedup"] = round(
+                result["serialize_dump_json_ops"] / result["serialize_default_ops"], 2
+            )
+    report["params"] = vars(args)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=40, help="Контент блоков в модуле")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Время замера одной операции")
+    args = parser.parse_args()
+    print(json.dumps(run(args), ensure_ascii=False, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Повторные загрузки одного файла: хранение по sha256 против отдельного файла на загрузку.
+
+Запуск (база и медиа каталог создаются во временной директории):
+
+    uv run python -m benchmarks.media_dedup --size-mib 20 --uploads 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+from uuid import uuid4
+
+CHUNK_SIZE = 1024 * 1024
+
+
+async def iter_file(path: Path) -> AsyncIterator[bytes]:
+    import aiofiles  # noqa: PLC0415
+
+    async with aiofiles.open(path, mode="rb") as opened_file:
+        while chunk := await opened_file.read(CHUNK_SIZE):
+            yield chunk
+
+
+def directory_size(directory: Path) -> int:
+    return sum(path.stat().st_size for path in directory.rglob("*") if path.is_file())
+
+
+def latencies_report(latencies: list[float]) -> dict:
+    return {
+        "first_ms": round(latencies[0] * 1000, 2),
+        "repeated_median_ms": round(statistics.median(latencies[1:]) * 1000, 2),
+    }
+
+
+async def run(args: argparse.Namespace, directory: Path) -> dict:
+    from src.database.base import Base, engine  # noqa: PLC0415
+    from src.services import media  # noqa: PLC0415
+    from src.storage import LocalStorage  # noqa: PLC0415
+
+    legacy_storage = LocalStorage(directory / "legacy")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    source = directory / "lecture.pdf"
+    source.write_bytes(os.urandom(args.size_mib * 1024 * 1024))
+
+    # Прежняя схема: каждая загрузка сохраняется в `<user_id>/<uuid>.<ext>`
+    legacy_latencies = []
+    for user_id in range(args.uploads):
+        started_at = time.perf_counter()
+        await legacy_storage.put_stream(f"{user_id}/{uuid4()}.pdf", iter_file(source))
+        legacy_latencies.append(time.perf_counter() - started_at)
+
+    latencies = []
+    for user_id in range(args.uploads):
+        started_at = time.perf_counter()
+        await media.upload_stream(user_id, source.name, iter_file(source))
+        latencies.append(time.perf_counter() - started_at)
+    usage = await media.storage_usage()
+    await engine.dispose()
+    return {
+        "legacy": {
+            "disk_bytes": directory_size(legacy_storage.root),
+            **latencies_report(legacy_latencies),
+        },
+        "content_addressed": {
+            "disk_bytes": directory_size(directory / "media"), **latencies_report(latencies)
+        },
+        "storage_usage": usage,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mib", type=int, default=20)
+    parser.add_argument("--uploads", type=int, default=10)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        # Пути к базе и хранилищу читаются настройками при импорте `src`
+        os.environ["BOT_PATH"] = str(Path(directory) / "db.sqlite3")
+        os.environ["STORAGE_LOCAL_ROOT"] = str(Path(directory) / "media")
+        report = asyncio.run(run(args, Path(directory)))
+    report["params"] = vars(args)
+    print(json.dumps(report, ensure_ascii=False, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
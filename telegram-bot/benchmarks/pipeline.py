@@ -0,0 +1,334 @@
+"""Пропускная способность и задержки этапов конвейера создания курса без внешних сервисов.
+
+Этапы: конвертация документов `educon/Электроника` в Markdown, разбиение на чанки,
+эмбеддинги (если модель уже скачана), извлечение текста страниц краулером,
+веб-поиск и поиск видео через фейковые Yandex Search API и RuTube, генерация курса
+агентами с фейковой OpenAI-совместимой моделью, которая воспроизводит записанные ответы
+(`fixtures/llm_responses.json`) с задержками `--ttft-ms` и `--token-ms`.
+
+Результат сравнивается с сохранённым базовым прогоном: падение пропускной способности
+или рост p95 задержки этапа больше `--tolerance` считается регрессией (код выхода 1):
+
+    uv run python -m benchmarks.pipeline --save-baseline
+    uv run python -m benchmarks.pipeline --stages conversion chunking --tolerance 0.2
+"""
+
+from typing import Any
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+from .fakes import HTML_CORPUS_DIR, serve_fakes
+
+DOCUMENTS_DIR = Path(__file__).parents[2] / "educon" / "Электроника"
+BASELINE_PATH = Path(__file__).parent / "baselines" / "pipeline.json"
+DOCUMENT_SUFFIXES = {".pdf", ".docx", ".pptx", ".txt", ".md"}
+STAGES = (
+    "conversion",
+    "chunking",
+    "embedding",
+    "crawler",
+    "browser",
+    "web_search",
+    "video_search",
+    "generation",
+)
+# Браузерный краулер требует установленный Chromium (`playwright install chromium`)
+DEFAULT_STAGES = tuple(stage for stage in STAGES if stage != "browser")
+SEARCH_QUERIES = (
+    "вольт-амперная характеристика диода",
+    "мостовой выпрямитель сглаживающий фильтр",
+    "схемы включения биполярного транзистора",
+    "полевой транзистор стокозатворная характеристика",
+    "отрицательная обратная связь в усилителях",
+    "генератор с мостом Вина",
+)
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, round(q * (len(values) - 1)))]
+
+
+def summarize(latencies: list[float], seconds: float, **extra: Any) -> dict[str, Any]:
+    """Показатели этапа: элементов в секунду и задержка обработки одного элемента"""
+
+    return {
+        "items": len(latencies),
+        "seconds": round(seconds, 4),
+        "throughput_per_second": round(len(latencies) / seconds, 3) if seconds else None,
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "latency_p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "latency_max_ms": round(max(latencies) * 1000, 3),
+        **extra,
+    }
+
+
+async def timed[T](
+        items: list[T], func: Callable[[T], Awaitable[Any]]
+) -> tuple[list[Any], list[float], float]:
+    """Последовательно обрабатывает элементы, замеряя время каждого"""
+
+    results, latencies = [], []
+    started_at = time.perf_counter()
+    for item in items:
+        item_started_at = time.perf_counter()
+        results.append(await func(item))
+        latencies.append(time.perf_counter() - item_started_at)
+    return results, latencies, time.perf_counter() - started_at
+
+
+class Pipeline:
+    """Этапы конвейера, промежуточные результаты (Markdown, чанки) переиспользуются"""
+
+    def __init__(self, args: argparse.Namespace, base_url: str) -> None:
+        self.args = args
+        self.base_url = base_url
+        self.documents = sorted(
+            path for path in args.documents.iterdir() if path.suffix.lower() in DOCUMENT_SUFFIXES
+        )
+        self._markdown: list[str] | None = None
+        self._chunks: list[str] | None = None
+
+    async def markdown(self) -> list[str]:
+        if self._markdown is None:
+            await self.conversion()
+        return self._markdown
+
+    async def chunks(self) -> list[str]:
+        if self._chunks is None:
+            await self.chunking()
+        return self._chunks
+
+    async def conversion(self) -> dict[str, Any]:
+        from src.utils import convert_document_to_md  # noqa: PLC0415
+
+        self._markdown, latencies, seconds = await timed(
+            self.documents, lambda path: asyncio.to_thread(convert_document_to_md, path)
+        )
+        megabytes = sum(path.stat().st_size for path in self.documents) / 1024 / 1024
+        return summarize(
+            latencies,
+            seconds,
+            megabytes=round(megabytes, 2),
+            megabytes_per_second=round(megabytes / seconds, 3),
+            characters=sum(map(len, self._markdown)),
+        )
+
+    async def chunking(self) -> dict[str, Any]:
+        from src.rag.attached_materials import splitter  # noqa: PLC0415
+
+        markdown = await self.markdown()
+        chunks, latencies, seconds = await timed(
+            markdown, lambda text: asyncio.to_thread(splitter.split_text, text)
+        )
+        self._chunks = [chunk for document_chunks in chunks for chunk in document_chunks]
+        return summarize(
+            latencies,
+            seconds,
+            chunks=len(self._chunks),
+            chunks_per_second=round(len(self._chunks) / seconds, 1),
+        )
+
+    async def embedding(self) -> dict[str, Any]:
+        from src.rag.attached_materials import get_embeddings  # noqa: PLC0415
+
+        chunks = await self.chunks()
+        started_at = time.perf_counter()
+        try:
+            embeddings = await asyncio.to_thread(get_embeddings)
+        except (ImportError, OSError) as e:
+            # Офлайн модель доступна только из кэша Hugging Face
+            return {"skipped": f"{type(e).__name__}: {e}"}
+        load_seconds = time.perf_counter() - started_at
+        batches = [
+            chunks[i:i + self.args.batch_size]
+            for i in range(0, len(chunks), self.args.batch_size)
+        ]
+        _, latencies, seconds = await timed(
+            batches, lambda batch: asyncio.to_thread(embeddings.embed_documents, batch)
+        )
+        return summarize(
+            latencies,
+            seconds,
+            load_seconds=round(load_seconds, 2),
+            chunks=len(chunks),
+            chunks_per_second=round(len(chunks) / seconds, 2),
+        )
+
+    async def crawler(self) -> dict[str, Any]:
+        from bs4 import BeautifulSoup  # noqa: PLC0415
+
+        from src.services.crawler import _extract_markdown_text  # noqa: PLC0415, PLC2701
+
+        pages = [
+            path.read_text(encoding="utf-8") for path in sorted(HTML_CORPUS_DIR.glob("*.html"))
+        ] * self.args.crawl_repeat
+
+        async def extract(html: str) -> str:  # noqa: RUF029
+            return _extract_markdown_text(BeautifulSoup(html, "html.parser"))
+
+        texts, latencies, seconds = await timed(pages, extract)
+        return summarize(latencies, seconds, characters=sum(map(len, texts)))
+
+    async def browser(self) -> dict[str, Any]:
+        from src.services.crawler import crawl_web_page  # noqa: PLC0415
+
+        urls = [
+            f"{self.base_url}/corpus/{path.name}"
+            for path in sorted(HTML_CORPUS_DIR.glob("*.html"))
+        ]
+        texts, latencies, seconds = await timed(
+            urls, lambda url: crawl_web_page(url, headless=True)
+        )
+        return summarize(latencies, seconds, characters=sum(map(len, texts)))
+
+    async def web_search(self) -> dict[str, Any]:
+        from src.intergrations import yandex_search_api  # noqa: PLC0415
+
+        queries = list(SEARCH_QUERIES) * self.args.search_repeat
+        results, latencies, seconds = await timed(queries, yandex_search_api.search_async)
+        return summarize(latencies, seconds, results=sum(map(len, results)))
+
+    async def video_search(self) -> dict[str, Any]:
+        from src.ai_agents.tools import search_in_rutube  # noqa: PLC0415
+
+        queries = list(SEARCH_QUERIES) * self.args.search_repeat
+        results, latencies, seconds = await timed(queries, search_in_rutube)
+        return summarize(latencies, seconds, results=sum(map(len, results)))
+
+    async def generation(self) -> dict[str, Any]:
+        from uuid import uuid4  # noqa: PLC0415
+
+        from src.core import enums, schemas  # noqa: PLC0415
+        from src.services.generation import CourseGenerator  # noqa: PLC0415
+
+        teacher_inputs = schemas.TeacherInputs(
+            user_id=1,
+            discipline="Электроника",
+            target_audience="Студенты 2 курса направления 09.03.02 с базовыми знаниями физики",
+            difficulty_level=enums.DifficultyLevel.INTERMEDIATE,
+            estimated_duration_hours=36,
+            attachments=[],
+            comment="Опираться на лекции и методические указания к лабораторным в Multisim",
+        )
+        deltas: list[schemas.ContentDelta] = []
+        result = await CourseGenerator(block_workers=self.args.block_workers).generate(
+            uuid4(), teacher_inputs, on_content=deltas.append if self.args.stream else None
+        )
+        summary = result.report.summary()
+        return summarize(
+            [step.duration for step in result.report.steps],
+            result.report.wall_clock_seconds,
+            modules=len(result.modules),
+            blocks=sum(len(module.content_blocks) for module in result.modules),
+            sequential_seconds=summary["sequential_seconds"],
+            speedup=summary["speedup"],
+            content_deltas=len(deltas),
+        )
+
+
+def compare(
+        stages: dict[str, dict[str, Any]], baseline: dict[str, Any], tolerance: float
+) -> list[dict[str, Any]]:
+    """Сравнивает этапы с базовым прогоном, дописывая изменения в результаты этапов.
+
+    :return: Этапы, пропускная способность или p95 задержки которых ухудшились
+    больше чем на `tolerance`.
+    """
+
+    regressions = []
+    for stage, result in stages.items():
+        base = baseline["stages"].get(stage)
+        if base is None or "skipped" in base or "skipped" in result:
+            continue
+        changes = {
+            "throughput_change": round(
+                result["throughput_per_second"] / base["throughput_per_second"] - 1, 3
+            ),
+            "latency_p95_change": round(
+                result["latency_p95_ms"] / base["latency_p95_ms"] - 1, 3
+            ) if base["latency_p95_ms"] else 0.0,
+        }
+        result["baseline"] = changes
+        if changes["throughput_change"] < -tolerance or changes["latency_p95_change"] > tolerance:
+            regressions.append({"stage": stage, **changes})
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> dict:
+    ttft_ms, token_ms, search_ms = args.ttft_ms, args.token_ms, args.search_ms
+    with (
+        serve_fakes(ttft_ms=ttft_ms, token_ms=token_ms, search_ms=search_ms) as (base_url, stats),
+        tempfile.TemporaryDirectory() as tmp_dir,
+    ):
+        # Настройки читаются при первом импорте `src`, поэтому окружение задаётся до него
+        os.environ.update({
+            "YANDEX_CLOUD_BASE_URL": f"{base_url}/v1",
+            "YANDEX_CLOUD_APIKEY": "fake",
+            # Повторные прогоны не должны отвечать из кэша ответов LLM
+            "LLM_CACHE_ENABLED": "false",
+            "METRICS_PATH": str(Path(tmp_dir) / "metrics.sqlite3"),
+            "HF_HUB_OFFLINE": "1",
+        })
+        from src.ai_agents import tools  # noqa: PLC0415
+        from src.intergrations import yandex_search_api  # noqa: PLC0415
+
+        yandex_search_api.BASE_URL = f"{base_url}/yandex/v2/"
+        yandex_search_api.OPERATIONS_URL = f"{base_url}/yandex/operations/"
+        tools.RUTUBE_API_URL = f"{base_url}/rutube/api/"
+
+        pipeline = Pipeline(args, base_url)
+        stages = {stage: await getattr(pipeline, stage)() for stage in args.stages}
+        report: dict[str, Any] = {"stages": stages, "fakes": stats.summary()}
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        report["regressions"] = compare(stages, baseline, args.tolerance)
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        baseline = {"stages": stages, "params": vars(args)}
+        args.baseline.write_text(
+            json.dumps(baseline, ensure_ascii=False, indent=2, default=str) + "\n",
+            encoding="utf-8",
+        )
+    report["params"] = vars(args)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--stages", nargs="+", choices=STAGES, default=DEFAULT_STAGES, help="Этапы конвейера"
+    )
+    parser.add_argument("--documents", type=Path, default=DOCUMENTS_DIR, help="Папка документов")
+    parser.add_argument("--batch-size", type=int, default=32, help="Чанков в батче эмбеддингов")
+    parser.add_argument("--crawl-repeat", type=int, default=20, help="Повторов корпуса HTML")
+    parser.add_argument("--search-repeat", type=int, default=5, help="Повторов поисковых запросов")
+    parser.add_argument("--block-workers", type=int, default=6, help="Воркеров генерации блоков")
+    parser.add_argument("--stream", action="store_true", help="Потоковая генерация блоков")
+    parser.add_argument("--ttft-ms", type=float, default=300, help="Задержка до первого токена")
+    parser.add_argument("--token-ms", type=float, default=2, help="Задержка на токен модели")
+    parser.add_argument("--search-ms", type=float, default=50, help="Задержка поисковых API")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Базовый прогон")
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Сохранить прогон как базовый"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.15, help="Допустимое ухудшение относительно базы"
+    )
+    args = parser.parse_args()
+    report = asyncio.run(run(args))
+    print(json.dumps(report, ensure_ascii=False, indent=2, default=str))  # noqa: T201
+    if report.get("regressions"):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Конкурентные вставки и обновления задач: стандартный профиль SQLite против настроенного.
+
+Запуск (каждый профиль использует свою временную базу):
+
+    uv run python -m benchmarks.sqlite_concurrency --writers 16 --operations 50 --readers 4
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from uuid import uuid4
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.core import enums, schemas
+from src.database import models
+from src.database.base import Base, create_sqlite_engine
+from src.settings import SQLiteSettings
+
+# Значения SQLite/pysqlite по умолчанию (timeout=5 секунд у sqlite3.connect)
+DEFAULT_PROFILE = {
+    "journal_mode": "DELETE",
+    "synchronous": "FULL",
+    "busy_timeout_ms": 5000,
+    "cache_size_kib": 2000,
+    "mmap_size": 0,
+    "temp_store": "DEFAULT",
+}
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, round(q * (len(values) - 1)))]
+
+
+async def run_profile(name: str, path: Path, args: argparse.Namespace) -> dict:
+    overrides = DEFAULT_PROFILE if name == "default" else {}
+    engine = create_sqlite_engine(SQLiteSettings(path=path, **overrides))
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    latencies: list[float] = []
+    errors = 0
+    stop_readers = asyncio.Event()
+
+    async def insert_and_update(task: schemas.Task) -> None:
+        async with sessionmaker() as session:
+            session.add(models.Task(**task.model_dump()))
+            await session.commit()
+        async with sessionmaker() as session:
+            await session.execute(
+                update(models.Task)
+                .where(models.Task.id == task.id)
+                .values(status=enums.TaskStatus.RUNNING, attempts=1)
+            )
+            await session.commit()
+
+    async def writer() -> None:
+        nonlocal errors
+        for _ in range(args.operations):
+            task = schemas.Task(
+                kind=enums.TaskKind.COURSE_CREATION,
+                status=enums.TaskStatus.PENDING,
+                resource_id=uuid4(),
+            )
+            started_at = time.perf_counter()
+            try:
+                await insert_and_update(task)
+            except OperationalError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started_at)
+
+    reads = 0
+
+    async def reader() -> None:
+        nonlocal reads, errors
+        while not stop_readers.is_set():
+            try:
+                async with sessionmaker() as session:
+                    await session.scalar(
+                        select(func.count()).where(
+                            models.Task.status == enums.TaskStatus.PENDING
+                        )
+                    )
+                reads += 1
+            except OperationalError:
+                errors += 1
+            await asyncio.sleep(0)
+
+    started_at = time.perf_counter()
+    async with asyncio.TaskGroup() as task_group:
+        readers = [task_group.create_task(reader()) for _ in range(args.readers)]
+        async with asyncio.TaskGroup() as writers:
+            for _ in range(args.writers):
+                writers.create_task(writer())
+        stop_readers.set()
+        await asyncio.gather(*readers)
+    elapsed = time.perf_counter() - started_at
+    await engine.dispose()
+    return {
+        "seconds": round(elapsed, 3),
+        "write_ops_per_second": round(len(latencies) / elapsed, 1),
+        "reads": reads,
+        "errors": errors,
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "latency_p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+    }
+
+
+async def run(args: argparse.Namespace, directory: Path) -> dict:
+    report = {
+        name: await run_profile(name, directory / f"{name}.sqlite3", args)
+        for name in ("default", "tuned")
+    }
+    report["speedup"] = round(
+        report["tuned"]["write_ops_per_second"] / report["default"]["write_ops_per_second"], 2
+    )
+    report["params"] = vars(args)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--operations", type=int, default=50)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        report = asyncio.run(run(args, Path(directory)))
+    print(json.dumps(report, ensure_ascii=False, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
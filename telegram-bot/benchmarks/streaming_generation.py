@@ -0,0 +1,132 @@
+"""Время до первого контента при генерации блока: `ainvoke` против потоковой генерации.
+
+Агент `create_agent` с фейковой моделью, которая отдаёт структурированный ответ
+(`TheoryBlock` или `CodeExampleBlock`) вызовом инструмента по `--token-ms`
+на токен, как модель через OpenAI-совместимый API:
+
+    uv run python -m benchmarks.streaming_generation --tokens 1500 --token-ms 20
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+
+def build_agent(schema, args: argparse.Namespace):
+    from langchain.agents import create_agent  # noqa: PLC0415
+    from langchain_core.language_models.chat_models import BaseChatModel  # noqa: PLC0415
+    from langchain_core.messages import AIMessage, AIMessageChunk  # noqa: PLC0415
+    from langchain_core.messages.tool import tool_call_chunk  # noqa: PLC0415
+    from langchain_core.outputs import (  # noqa: PLC0415
+        ChatGeneration,
+        ChatGenerationChunk,
+        ChatResult,
+    )
+
+    from src.core import schemas  # noqa: PLC0415
+
+    text = " ".join(f"слово{i}" for i in range(args.tokens))
+    response = (
+        {"content": f"## Закон Ома\n{text}", "generated_by_ai": True}
+        if schema is schemas.TheoryBlock
+        else {"language": "python", "code": text, "explanation": "Расчёт тока"}
+    )
+    arguments = json.dumps(response, ensure_ascii=False)
+    # Токен фейковой модели - около 8 символов аргументов
+    tokens = [arguments[i:i + 8] for i in range(0, len(arguments), 8)]
+
+    class FakeStreamingModel(BaseChatModel):
+        @property
+        def _llm_type(self) -> str:
+            return "fake-streaming"
+
+        def bind_tools(self, tools, **kwargs):  # noqa: ARG002
+            return self
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            raise NotImplementedError
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):  # noqa: ARG002, PLR6301
+            await asyncio.sleep(len(tokens) * args.token_ms / 1000)
+            message = AIMessage(
+                content="",
+                tool_calls=[{"name": schema.__name__, "args": response, "id": "call"}],
+            )
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+        async def _astream(self, messages, stop=None, run_manager=None, **kwargs):  # noqa: ARG002, PLR6301
+            for i, token in enumerate(tokens):
+                await asyncio.sleep(args.token_ms / 1000)
+                chunk = ChatGenerationChunk(message=AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[tool_call_chunk(
+                        name=schema.__name__ if i == 0 else None,
+                        args=token,
+                        id="call" if i == 0 else None,
+                        index=0,
+                    )],
+                ))
+                if run_manager is not None:
+                    await run_manager.on_llm_new_token("", chunk=chunk)
+                yield chunk
+
+    return create_agent(model=FakeStreamingModel(), tools=[], response_format=schema)
+
+
+async def run_block(schema, args: argparse.Namespace) -> dict:
+    from src.ai_agents.streaming import PartialOutput, astream_structured  # noqa: PLC0415
+
+    agent = build_agent(schema, args)
+    started_at = time.perf_counter()
+    result = await agent.ainvoke({"messages": []})
+    invoke_seconds = time.perf_counter() - started_at
+    assert isinstance(result["structured_response"], schema)
+
+    partials: list[tuple[float, PartialOutput]] = []
+    started_at = time.perf_counter()
+    result = await astream_structured(
+        agent,
+        {"messages": []},
+        {},
+        context=None,
+        schema=schema,
+        on_partial=lambda partial: partials.append((time.perf_counter() - started_at, partial)),
+        interval=args.interval,
+    )
+    stream_seconds = time.perf_counter() - started_at
+    first_content = next(elapsed for elapsed, partial in partials if partial.fields)
+    final = partials[-1][1]
+    return {
+        "invoke_first_content_seconds": round(invoke_seconds, 3),
+        "stream_first_content_seconds": round(first_content, 3),
+        "stream_total_seconds": round(stream_seconds, 3),
+        "partials_published": len(partials),
+        "final_matches_invoke": (
+            final.done and final.fields == result["structured_response"].model_dump(mode="json")
+        ),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from src.core import schemas  # noqa: PLC0415
+
+    report = {
+        schema.__name__: await run_block(schema, args)
+        for schema in (schemas.TheoryBlock, schemas.CodeExampleBlock)
+    }
+    report["params"] = vars(args)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=1500, help="Слов в тексте блока")
+    parser.add_argument("--token-ms", type=float, default=20, help="Задержка на токен модели")
+    parser.add_argument("--interval", type=float, default=0.5, help="Интервал публикации")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), ensure_ascii=False, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Размер индекса, память и recall@10 kNN поиска для режимов хранения векторов.
+
+Чанки лекций `educon/Электроника` эмбеддятся один раз, затем для каждого режима
+(`VECTOR_INDEX_MODE`) создаётся отдельный индекс Elasticsearch с тем же маппингом
+и тем же kNN запросом, что и `attached-materials-*`. Отчёт по режиму: размер индекса
+на диске и векторов kNN после слияния в один сегмент, оценка памяти под векторы HNSW
+(вне heap, в page cache), задержка и recall@10 относительно точного поиска по полным
+векторам. Без Elasticsearch считается только recall@10 режимов truncated и binary
+при точном первом проходе в numpy (`offline`).
+
+    uv run python -m benchmarks.vector_index --modes int8 bbq truncated binary
+    uv run python -m benchmarks.vector_index --truncated-dims 128 --oversample 8
+"""
+
+from typing import Any
+
+import argparse
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .embeddings import load_chunks
+from .pipeline import DOCUMENTS_DIR, SEARCH_QUERIES, percentile
+
+MODES = ("float", "int8", "int4", "bbq", "truncated", "binary")
+FIELD = "embedding"
+TOP_K = 10
+
+
+def memory_per_vector(mode: str, dims: int, truncated_dims: int) -> float:
+    """Байт на вектор, которые HNSW поиск держит в памяти (без графа)"""
+
+    return {
+        "float": 4 * dims,
+        "int8": dims + 4,
+        "int4": dims / 2 + 4,
+        "bbq": dims / 8 + 14,
+        "truncated": min(truncated_dims, dims) + 4,
+        "binary": dims / 8,
+    }[mode]
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> list[list[int]]:
+    scores = normalize(queries) @ normalize(vectors).T
+    return np.argsort(-scores, axis=1)[:, :k].tolist()
+
+
+def recall(expected: list[list[int]], actual: list[list[int]]) -> float:
+    return round(statistics.fmean(
+        len(set(expected_ids) & set(actual_ids)) / len(expected_ids)
+        for expected_ids, actual_ids in zip(expected, actual, strict=True)
+    ), 4)
+
+
+def offline_top_k(
+        mode: str, vectors: np.ndarray, queries: np.ndarray, args: argparse.Namespace
+) -> list[list[int]]:
+    """Точный первый проход по сокращённым векторам и пересчёт кандидатов по полным"""
+
+    candidates = TOP_K * args.oversample
+    if mode == "truncated":
+        dims = args.truncated_dims
+        scores = normalize(queries[:, :dims]) @ normalize(vectors[:, :dims]).T
+    else:
+        # Совпадающих битов больше - расстояние Хэмминга меньше
+        scores = (queries > 0).astype(np.float32) @ (vectors > 0).T.astype(np.float32)
+        scores += (queries <= 0).astype(np.float32) @ (vectors <= 0).T.astype(np.float32)
+    result = []
+    for query, query_scores in zip(queries, scores, strict=True):
+        shortlist = np.argsort(-query_scores)[:candidates]
+        rescored = normalize(vectors[shortlist]) @ normalize(query)
+        result.append(shortlist[np.argsort(-rescored)[:TOP_K]].tolist())
+    return result
+
+
+def run_es_mode(
+        es: Any,
+        mode: str,
+        vectors: np.ndarray,
+        queries: np.ndarray,
+        expected: list[list[int]],
+        args: argparse.Namespace,
+) -> dict[str, Any]:
+    from elasticsearch.helpers import bulk  # noqa: PLC0415
+
+    from src.rag.vector_index import (  # noqa: PLC0415
+        knn_retriever,
+        vector_fields,
+        vector_mappings,
+    )
+    from src.settings import settings  # noqa: PLC0415
+
+    index_settings = settings.vector_index.model_copy(update={
+        "mode": mode, "truncated_dims": args.truncated_dims, "oversample": args.oversample,
+    })
+    index_name = f"benchmark-vectors-{mode}"
+    es.indices.delete(index=index_name, ignore_unavailable=True)
+    es.indices.create(
+        index=index_name,
+        mappings={"properties": vector_mappings(FIELD, vectors.shape[1], index_settings)},
+    )
+    started_at = time.perf_counter()
+    bulk(es, (
+        {"_index": index_name, "_id": str(i), **fields}
+        for i, fields in enumerate(vector_fields(FIELD, vectors.tolist(), index_settings))
+    ))
+    es.indices.refresh(index=index_name)
+    # HNSW граф итогового сегмента строится при слиянии
+    es.indices.forcemerge(index=index_name, max_num_segments=1)
+    index_seconds = time.perf_counter() - started_at
+    store = es.indices.stats(index=index_name, metric="store")["indices"][index_name]
+    disk_usage = es.indices.disk_usage(index=index_name, run_expensive_tasks=True)
+    knn_bytes = sum(
+        field.get("knn_vectors_in_bytes", 0)
+        for field in disk_usage[index_name]["fields"].values()
+    )
+    latencies, actual = [], []
+    for query in queries.tolist():
+        started_at = time.perf_counter()
+        response = es.search(
+            index=index_name,
+            retriever=knn_retriever(
+                FIELD, query, index_settings, k=TOP_K, num_candidates=args.num_candidates
+            ),
+            size=TOP_K,
+            source=False,
+        )
+        latencies.append(time.perf_counter() - started_at)
+        actual.append([int(hit["_id"]) for hit in response["hits"]["hits"]])
+    if not args.keep:
+        es.indices.delete(index=index_name)
+    return {
+        "index_seconds": round(index_seconds, 2),
+        "store_mb": round(store["total"]["store"]["size_in_bytes"] / 2**20, 2),
+        "knn_vectors_mb": round(knn_bytes / 2**20, 2),
+        "vector_memory_estimate_mb": round(
+            memory_per_vector(mode, vectors.shape[1], args.truncated_dims)
+            * len(vectors) / 2**20,
+            2,
+        ),
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "latency_p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "recall_at_10": recall(expected, actual),
+    }
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    from src.rag.embeddings import create_embeddings  # noqa: PLC0415
+    from src.settings import settings  # noqa: PLC0415
+
+    chunks = load_chunks(args.documents, args.limit)
+    # Запросы - поисковые фразы и начала случайных чанков
+    samples = random.Random(0).sample(  # noqa: S311
+        chunks, min(args.sample_queries, len(chunks))
+    )
+    query_texts = [*SEARCH_QUERIES, *(chunk[:args.query_chars] for chunk in samples)]
+    embeddings = create_embeddings(settings.embeddings)
+    vectors = np.asarray(embeddings.embed_documents(chunks), dtype=np.float32)
+    queries = np.asarray(embeddings.embed_documents(query_texts), dtype=np.float32)
+    expected = exact_top_k(vectors, queries, TOP_K)
+
+    report: dict[str, Any] = {
+        "chunks": len(chunks),
+        "queries": len(query_texts),
+        "dims": vectors.shape[1],
+        "offline": {
+            mode: {"recall_at_10": recall(expected, offline_top_k(mode, vectors, queries, args))}
+            for mode in args.modes
+            if mode in {"truncated", "binary"}
+        },
+    }
+    try:
+        from elasticsearch import Elasticsearch  # noqa: PLC0415
+
+        es = Elasticsearch(hosts=[args.es_url])
+        es.info()
+    except Exception as e:  # noqa: BLE001
+        report["elasticsearch"] = {"skipped": f"{type(e).__name__}: {e}"}
+        return report
+    report["elasticsearch"] = {
+        mode: run_es_mode(es, mode, vectors, queries, expected, args) for mode in args.modes
+    }
+    return report
+
+
+def main() -> None:
+    from src.settings import settings  # noqa: PLC0415
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--documents", type=Path, default=DOCUMENTS_DIR)
+    parser.add_argument("--limit", type=int, default=None, help="Максимум чанков")
+    parser.add_argument("--sample-queries", type=int, default=50)
+    parser.add_argument("--query-chars", type=int, default=200)
+    parser.add_argument("--truncated-dims", type=int, default=settings.vector_index.truncated_dims)
+    parser.add_argument("--oversample", type=int, default=settings.vector_index.oversample)
+    parser.add_argument("--num-candidates", type=int, default=50)
+    parser.add_argument("--es-url", default=settings.elasticsearch.url)
+    parser.add_argument("--keep", action="store_true", help="Не удалять индексы после замера")
+    args = parser.parse_args()
+
+    report = run(args)
+    report["params"] = vars(args)
+    print(json.dumps(report, ensure_ascii=False, indent=2, default=str))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
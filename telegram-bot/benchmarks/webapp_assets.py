@@ -0,0 +1,165 @@
+"""Байты и TTFB страницы создания курса: прежняя раздача статики и шаблонов против кэшируемой.
+
+Клиент ведёт себя как браузер Telegram WebApp: загружает страницу и статику,
+на которую она ссылается, и хранит ответы в HTTP кэше. При повторном открытии
+свежие `immutable` ответы берутся из кэша без запроса, остальные проверяются
+условными запросами (`If-None-Match`, `If-Modified-Since`):
+
+    uv run python -m benchmarks.webapp_assets --opens 50
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import re
+import statistics
+import time
+
+PAGE_URL = "/courses/create"
+ACCEPT_ENCODING = "gzip, deflate, br"
+
+
+def build_before_app():
+    """Раздача до изменений: `StaticFiles` без кэш-заголовков и рендер шаблона на каждый запрос"""
+
+    from fastapi import FastAPI, Request  # noqa: PLC0415
+    from fastapi.responses import HTMLResponse  # noqa: PLC0415
+    from fastapi.staticfiles import StaticFiles  # noqa: PLC0415
+    from jinja2 import pass_context  # noqa: PLC0415
+    from starlette.templating import Jinja2Templates  # noqa: PLC0415
+
+    from src.webapp.assets import STATIC_DIR, TEMPLATES_DIR  # noqa: PLC0415
+
+    app = FastAPI()
+    app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+    templates = Jinja2Templates(directory=TEMPLATES_DIR)
+    templates.env.globals["static_url"] = pass_context(
+        lambda context, path: context["request"].url_for("static", path=path)
+    )
+
+    @app.get(PAGE_URL, response_class=HTMLResponse)
+    async def create_course(request: Request) -> HTMLResponse:
+        return templates.TemplateResponse(request, "create_course.html")
+
+    return app
+
+
+def build_after_app():
+    from fastapi import FastAPI  # noqa: PLC0415
+
+    from src.webapp.routers import router  # noqa: PLC0415
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+class BrowserCache:
+    """Упрощённый HTTP кэш браузера"""
+
+    def __init__(self) -> None:
+        self.headers: dict[str, dict[str, str]] = {}
+        self.bodies: dict[str, bytes] = {}
+
+    def conditional_headers(self, url: str) -> dict[str, str] | None:
+        """Заголовки условного запроса или None, если ответ берётся из кэша без запроса"""
+
+        headers = self.headers.get(url)
+        if headers is None:
+            return {}
+        if "immutable" in headers.get("cache-control", ""):
+            return None
+        conditional = {}
+        if "etag" in headers:
+            conditional["If-None-Match"] = headers["etag"]
+        if "last-modified" in headers:
+            conditional["If-Modified-Since"] = headers["last-modified"]
+        return conditional
+
+
+async def fetch(client, cache: BrowserCache, url: str, stats: dict) -> bytes:
+    """Загружает ресурс с учётом кэша и возвращает его распакованное содержимое"""
+
+    conditional = cache.conditional_headers(url)
+    if conditional is None:
+        return cache.bodies[url]
+    started_at = time.perf_counter()
+    async with client.stream(
+        "GET", url, headers={"Accept-Encoding": ACCEPT_ENCODING, **conditional}
+    ) as response:
+        stats["ttfb"].append(time.perf_counter() - started_at)
+        body = b"".join([chunk async for chunk in response.aiter_raw()])
+    stats["requests"] += 1
+    stats["bytes"] += len(body) + sum(
+        len(key) + len(value) + 4 for key, value in response.headers.items()
+    )
+    if response.status_code == 200:  # noqa: PLR2004
+        cache.headers[url] = {key.lower(): value for key, value in response.headers.items()}
+        cache.bodies[url] = decode(body, response.headers.get("content-encoding"))
+    return cache.bodies[url]
+
+
+def decode(body: bytes, encoding: str | None) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "br":
+        import brotli  # noqa: PLC0415
+
+        return brotli.decompress(body)
+    return body
+
+
+async def open_page(client, cache: BrowserCache) -> dict:
+    """Открывает страницу со всей статикой, на которую она ссылается"""
+
+    stats = {"bytes": 0, "requests": 0, "ttfb": []}
+    html = (await fetch(client, cache, PAGE_URL, stats)).decode()
+    for url in re.findall(r'(?:href|src)="http://app(/static/[^"]+)"', html):
+        await fetch(client, cache, url, stats)
+    # TTFB страницы: её запрос выполняется первым
+    stats["ttfb"] = stats["ttfb"][0]
+    return stats
+
+
+async def run_app(app, args: argparse.Namespace) -> dict:
+    import httpx  # noqa: PLC0415
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+        cache = BrowserCache()
+        first = await open_page(client, cache)
+        repeats = [await open_page(client, cache) for _ in range(args.opens)]
+    return {
+        "first_open_bytes": first["bytes"],
+        "first_open_requests": first["requests"],
+        "repeat_open_bytes": round(statistics.median(item["bytes"] for item in repeats)),
+        "repeat_open_requests": round(statistics.median(item["requests"] for item in repeats)),
+        "page_ttfb_p50_ms": round(statistics.median(item["ttfb"] for item in repeats) * 1000, 3),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    report = {
+        "before": await run_app(build_before_app(), args),
+        "after": await run_app(build_after_app(), args),
+    }
+    report["first_open_bytes_saved"] = round(
+        1 - report["after"]["first_open_bytes"] / report["before"]["first_open_bytes"], 3
+    )
+    report["repeat_open_bytes_saved"] = round(
+        1 - report["after"]["repeat_open_bytes"] / report["before"]["repeat_open_bytes"], 3
+    )
+    report["params"] = vars(args)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--opens", type=int, default=50, help="Повторных открытий страницы")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), ensure_ascii=False, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
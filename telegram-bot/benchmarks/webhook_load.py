@@ -0,0 +1,163 @@
+"""Задержка ответа вебхука под нагрузкой: обработка внутри запроса против очереди апдейтов.
+
+Фейковый клиент Telegram отправляет пачку апдейтов от нескольких чатов с
+`--connections` параллельными соединениями (как Bot API) и повторно доставляет
+часть апдейтов. Обработчик имитирует медленную работу (LLM, скачивание файла).
+Проверяется, что в каждом чате апдейты обработаны по порядку и без повторов:
+
+    uv run python -m benchmarks.webhook_load --updates 1000 --chats 50 --handler-ms 200
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import defaultdict
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, round(q * (len(values) - 1)))]
+
+
+def build_updates(args: argparse.Namespace) -> list[dict]:
+    updates = [
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 0,
+                "chat": {"id": update_id % args.chats, "type": "private"},
+                "from": {"id": update_id % args.chats, "is_bot": False, "first_name": "Test"},
+                "text": f"Сообщение {update_id}",
+            },
+        }
+        for update_id in range(1, args.updates + 1)
+    ]
+    # Повторная доставка: копия апдейта сразу за оригиналом
+    rng = random.Random(0)  # noqa: S311
+    redelivered = []
+    for update in updates:
+        redelivered.append(update)
+        if rng.random() < args.duplicates:
+            redelivered.append(update)
+    return redelivered
+
+
+def build_app(mode: str, args: argparse.Namespace, processed: dict[int, list[int]]):
+    from aiogram import Bot, Dispatcher, Router  # noqa: PLC0415
+    from aiogram.client.session.base import BaseSession  # noqa: PLC0415
+    from aiogram.types import Message, Update  # noqa: PLC0415
+    from fastapi import FastAPI, Request, Response, status  # noqa: PLC0415
+
+    from src.bot.updates import EnqueueResult, UpdateQueue  # noqa: PLC0415
+
+    class FakeTelegramSession(BaseSession):
+        """Сессия без сети: обработчики бенчмарка не вызывают Bot API"""
+
+        async def make_request(self, bot, method, timeout=None):
+            raise NotImplementedError
+
+        async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, **kwargs):
+            raise NotImplementedError
+
+        async def close(self) -> None:
+            pass
+
+    bot = Bot(token="42:TEST", session=FakeTelegramSession())  # noqa: S106
+    dispatcher = Dispatcher()
+    router = Router()
+
+    @router.message()
+    async def handle(message: Message) -> None:
+        await asyncio.sleep(args.handler_ms / 1000)
+        processed[message.chat.id].append(message.message_id)
+
+    dispatcher.include_router(router)
+    update_queue = UpdateQueue(
+        dispatcher, bot, workers=args.workers, max_size=args.updates * 2,
+        dedupe_size=args.updates * 2, album_latency=0.6,
+    )
+    app = FastAPI()
+
+    @app.post("/hook")
+    async def hook(request: Request) -> Response:
+        update = Update.model_validate(await request.json(), context={"bot": bot})
+        if mode == "inline":
+            await dispatcher.feed_update(bot=bot, update=update)
+        elif update_queue.put(update) == EnqueueResult.QUEUE_FULL:
+            return Response(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(status_code=status.HTTP_200_OK)
+
+    return app, update_queue
+
+
+async def run_mode(mode: str, args: argparse.Namespace) -> dict:
+    import httpx  # noqa: PLC0415
+
+    processed: dict[int, list[int]] = defaultdict(list)
+    app, update_queue = build_app(mode, args, processed)
+    updates = build_updates(args)
+    pending = asyncio.Queue()
+    for update in updates:
+        pending.put_nowait(update)
+    latencies = []
+
+    async def connection(client: httpx.AsyncClient) -> None:
+        # Как Bot API: следующий апдейт соединения отправляется после ответа на предыдущий
+        while not pending.empty():
+            update = pending.get_nowait()
+            started_at = time.perf_counter()
+            response = await client.post("/hook", json=update)
+            latencies.append(time.perf_counter() - started_at)
+            response.raise_for_status()
+
+    transport = httpx.ASGITransport(app=app)
+    started_at = time.perf_counter()
+    async with httpx.AsyncClient(transport=transport, base_url="http://bot") as client:
+        await asyncio.gather(*(connection(client) for _ in range(args.connections)))
+        accepted_seconds = time.perf_counter() - started_at
+        await update_queue.stop(timeout=600)
+    processed_seconds = time.perf_counter() - started_at
+    handled = [message_id for messages in processed.values() for message_id in messages]
+    return {
+        "webhook_p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "webhook_p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "webhook_max_ms": round(max(latencies) * 1000, 2),
+        "requests": len(latencies),
+        "all_accepted_seconds": round(accepted_seconds, 3),
+        "all_processed_seconds": round(processed_seconds, 3),
+        "handled_updates": len(handled),
+        "duplicates_handled": len(handled) - len(set(handled)),
+        "per_chat_order_kept": all(
+            messages == sorted(messages) for messages in processed.values()
+        ),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    report = {mode: await run_mode(mode, args) for mode in ("inline", "queued")}
+    report["p99_speedup"] = round(
+        report["inline"]["webhook_p99_ms"] / report["queued"]["webhook_p99_ms"], 1
+    )
+    report["params"] = vars(args)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--connections", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--handler-ms", type=float, default=200)
+    parser.add_argument("--duplicates", type=float, default=0.05)
+    args = parser.parse_args()
+    report = asyncio.run(run(args))
+    print(json.dumps(report, ensure_ascii=False, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import argparse
+import logging
+from urllib.parse import urlsplit
+
+import uvicorn
+
+from src.rag.embeddings_service import DEFAULT_SERVICE_URL, create_app
+from src.settings import settings
+
+
+def configure_logging(level=logging.INFO):
+    logging.basicConfig(
+        level=level,
+        datefmt="%Y-%m-%d %H:%M:%S",
+        format="[%(asctime)s.%(msecs)03d] %(module)10s:%(lineno)-3d %(levelname)-7s - %(message)s",
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Сервис эмбеддингов, общий для веб-приложения и воркеров"
+    )
+    parser.add_argument(
+        "--url",
+        default=settings.embeddings.service_url or DEFAULT_SERVICE_URL,
+        help="unix:///path/to/socket или http://host:port",
+    )
+    args = parser.parse_args()
+    configure_logging()
+    url = urlsplit(args.url)
+    if url.scheme == "unix":
+        uvicorn.run(create_app(settings.embeddings), uds=url.path, access_log=False)
+    else:
+        uvicorn.run(
+            create_app(settings.embeddings), host=url.hostname, port=url.port, access_log=False
+        )
@@ -2,6 +2,7 @@ import logging
 
 import uvicorn
 
+from src.tracing import setup_tracing
 from src.webapp.app import app
 
 
@@ -15,4 +16,5 @@ def configure_logging(level=logging.INFO):
 
 if __name__ == "__main__":
     configure_logging()
+    setup_tracing("webapp")
     uvicorn.run(app, host="0.0.0.0", port=8000)  # noqa: S104
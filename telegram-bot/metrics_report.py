@@ -0,0 +1,67 @@
+import argparse
+import json
+import time
+from itertools import starmap
+
+from src.ai_agents.metrics import GROUP_COLUMNS, get_metrics_store
+
+COLUMNS = (
+    "model_calls",
+    "cached_calls",
+    "cache_hit_rate",
+    "tool_calls",
+    "errors",
+    "prompt_tokens",
+    "completion_tokens",
+    "cost",
+    "model_seconds",
+    "tool_seconds",
+)
+
+
+def format_value(column: str, value: float) -> str:
+    if column == "cost":
+        return f"{value:.4f}"
+    if column == "cache_hit_rate":
+        return f"{value:.1%}"
+    if column.endswith("seconds"):
+        return f"{value:.1f}"
+    return str(value)
+
+
+def format_table(by: str, rows: list[dict]) -> str:
+    header = (by, *COLUMNS)
+    lines = [
+        (
+            str(row[by] if row[by] is not None else "-"),
+            *(format_value(column, row[column]) for column in COLUMNS),
+        )
+        for row in rows
+    ]
+    widths = [max(len(line[i]) for line in (header, *lines)) for i in range(len(header))]
+    return "\n".join(
+        "  ".join(
+            value.ljust(width) if i == 0 else value.rjust(width)
+            for i, (value, width) in enumerate(zip(line, widths, strict=True))
+        )
+        for line in (header, *lines)
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Стоимость и время вызовов агентов по курсам, агентам и инструментам"
+    )
+    parser.add_argument(
+        "--by", choices=list(GROUP_COLUMNS), action="append", help="Разрезы отчёта"
+    )
+    parser.add_argument("--hours", type=float, help="Учитывать вызовы за последние N часов")
+    parser.add_argument("--json", action="store_true", help="Вывести отчёт в JSON")
+    args = parser.parse_args()
+    since = time.time() - args.hours * 60 * 60 if args.hours else None
+    store = get_metrics_store()
+    report = {by: store.aggregate(by, since) for by in args.by or ("course", "agent", "tool")}
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))  # noqa: T201
+    else:
+        print("\n\n".join(starmap(format_table, report.items())))  # noqa: T201
@@ -9,7 +9,9 @@ from alembic import context
 
 from src.settings import settings
 from src.database.base import Base
-from src.database.models import Course, Module, Attachment, Assessment, Task
+from src.database.models import (
+    Course, Module, ContentBlock, Attachment, Assessment, Task, FSMRecord
+)
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
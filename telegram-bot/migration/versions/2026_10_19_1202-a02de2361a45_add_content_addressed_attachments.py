@@ -0,0 +1,38 @@
+"""Add content addressed attachments
+
+Revision ID: a02de2361a45
+Revises: 8879aeb6d732
+Create Date: 2026-10-19 12:02:10.420320
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a02de2361a45'
+down_revision: Union[str, Sequence[str], None] = '8879aeb6d732'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Ограничение уникальности filepath создано без имени, имя задаётся для batch режима
+naming_convention = {'uq': 'uq_%(table_name)s_%(column_0_name)s'}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('attachments', naming_convention=naming_convention) as batch_op:
+        batch_op.add_column(sa.Column('sha256', sa.String(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_attachments_sha256'), ['sha256'], unique=False)
+        batch_op.drop_constraint('uq_attachments_filepath', type_='unique')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('attachments', naming_convention=naming_convention) as batch_op:
+        batch_op.create_unique_constraint('uq_attachments_filepath', ['filepath'])
+        batch_op.drop_index(batch_op.f('ix_attachments_sha256'))
+        batch_op.drop_column('sha256')
@@ -0,0 +1,216 @@
+from typing import Any
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.embeddings import Embeddings
+from langchain_core.load import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# Как часто (в количестве записей) выполнять вытеснение устаревших и лишних записей
+EVICTION_INTERVAL = 100
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class LLMCacheStore:
+    """Персистентное SQLite хранилище ответов LLM.
+
+    :param path: Путь к файлу базы данных кэша.
+    :param ttl_seconds: Время жизни записи.
+    :param max_entries: Максимальное количество записей (вытесняются давно не читаемые).
+    """
+
+    def __init__(self, path: Path, ttl_seconds: int, max_entries: int) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._updates = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                llm_hash TEXT NOT NULL,
+                value TEXT NOT NULL,
+                vector BLOB,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS ix_llm_cache_lookup ON llm_cache (namespace, llm_hash)"
+        )
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._connection.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            self._connection.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+        return value
+
+    def put(
+            self, key: str, namespace: str, llm_hash: str, value: str, vector: bytes | None = None
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, namespace, llm_hash, value, vector, now, now),
+            )
+            self._updates += 1
+            if self._updates % EVICTION_INTERVAL == 0:
+                self._evict(now)
+
+    def vectors(self, namespace: str, llm_hash: str, limit: int) -> list[tuple[str, bytes]]:
+        """Векторы `limit` последних прочитанных записей"""
+
+        min_created_at = time.time() - self.ttl_seconds
+        with self._lock:
+            return self._connection.execute(
+                "SELECT key, vector FROM llm_cache "
+                "WHERE namespace = ? AND llm_hash = ? AND vector IS NOT NULL AND created_at >= ? "
+                "ORDER BY accessed_at DESC LIMIT ?",
+                (namespace, llm_hash, min_created_at, limit),
+            ).fetchall()
+
+    def _evict(self, now: float) -> None:
+        self._connection.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+        )
+        self._connection.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self, namespace: str | None = None) -> None:
+        with self._lock:
+            if namespace is None:
+                self._connection.execute("DELETE FROM llm_cache")
+            else:
+                self._connection.execute(
+                    "DELETE FROM llm_cache WHERE namespace = ?", (namespace,)
+                )
+
+    def size(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+class PersistentLLMCache(BaseCache):
+    """Кэш ответов LLM с точным ключом (модель, параметры, хэш сообщений).
+
+    Каждый агент получает собственный экземпляр (namespace), попадания учитываются
+    в метриках вызовов (`MetricsStore.aggregate`).
+    """
+
+    def __init__(self, store: LLMCacheStore, namespace: str) -> None:
+        self.store = store
+        self.namespace = namespace
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return _hash(f"{llm_string}\x00{prompt}")
+
+    @staticmethod
+    def _load(value: str | None) -> RETURN_VAL_TYPE | None:
+        return loads(value) if value is not None else None
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        return self._load(self.store.get(self._key(prompt, llm_string)))
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self.store.put(
+            self._key(prompt, llm_string), self.namespace, _hash(llm_string), dumps(return_val)
+        )
+
+    def clear(self, **kwargs: Any) -> None:  # noqa: ARG002
+        self.store.clear(self.namespace)
+
+
+class SemanticLLMCache(PersistentLLMCache):
+    """Кэш с поиском по семантической близости запроса.
+
+    При промахе по точному ключу сравнивает эмбеддинг не системных сообщений запроса
+    с сохранёнными ответами той же модели с теми же параметрами. Шаблоны инструкций
+    нужно передавать системным сообщением, иначе они доминируют в эмбеддинге
+    и несвязанные запросы становятся похожими.
+
+    :param embeddings_factory: Фабрика модели эмбеддингов (загружается при первом обращении).
+    :param similarity_threshold: Минимальная косинусная близость для попадания.
+    :param max_candidates: Сколько последних прочитанных записей сравнивать при промахе.
+    """
+
+    def __init__(
+            self,
+            store: LLMCacheStore,
+            namespace: str,
+            embeddings_factory: Callable[[], Embeddings],
+            similarity_threshold: float,
+            max_candidates: int = 1000,
+    ) -> None:
+        super().__init__(store, namespace)
+        self._embeddings_factory = embeddings_factory
+        self._embeddings: Embeddings | None = None
+        self.similarity_threshold = similarity_threshold
+        self.max_candidates = max_candidates
+
+    def _embed(self, prompt: str) -> np.ndarray:
+        if self._embeddings is None:
+            self._embeddings = self._embeddings_factory()
+        text = "\n".join(
+            str(message.content) for message in loads(prompt) if message.type != "system"
+        )
+        vector = np.asarray(self._embeddings.embed_query(text), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        value = self.store.get(self._key(prompt, llm_string))
+        if value is None:
+            candidates = self.store.vectors(
+                self.namespace, _hash(llm_string), self.max_candidates
+            )
+            if candidates:
+                keys = [key for key, _ in candidates]
+                matrix = np.stack([
+                    np.frombuffer(vector, dtype=np.float32) for _, vector in candidates
+                ])
+                similarities = matrix @ self._embed(prompt)
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    value = self.store.get(keys[best])
+        return self._load(value)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self.store.put(
+            self._key(prompt, llm_string),
+            self.namespace,
+            _hash(llm_string),
+            dumps(return_val),
+            self._embed(prompt).tobytes(),
+        )
@@ -0,0 +1,34 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from uuid import UUID
+
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from ..settings import settings
+
+
+@asynccontextmanager
+async def open_checkpointer() -> AsyncIterator[AsyncSqliteSaver]:
+    """Открывает LangGraph checkpointer в основной SQLite базе данных.
+
+    Таблицы `checkpoints` и `writes` создаются автоматически при первом использовании.
+    """
+    async with AsyncSqliteSaver.from_conn_string(str(settings.sqlite.path)) as checkpointer:
+        yield checkpointer
+
+
+async def delete_run_checkpoints(run_id: UUID) -> int:
+    """Удаляет checkpoints и writes всех потоков запуска генерации (`<run_id>:<шаг>`).
+
+    :return Количество удалённых потоков.
+    """
+    async with open_checkpointer() as checkpointer:
+        await checkpointer.setup()
+        async with checkpointer.conn.execute(
+            "SELECT DISTINCT thread_id FROM checkpoints WHERE thread_id LIKE ?",
+            (f"{run_id}:%",),
+        ) as cursor:
+            thread_ids = [thread_id for (thread_id,) in await cursor.fetchall()]
+        for thread_id in thread_ids:
+            await checkpointer.adelete_thread(thread_id)
+    return len(thread_ids)
@@ -1,27 +1,30 @@
 import logging
-from collections.abc import Callable
+from collections.abc import Awaitable, Callable
 
 from langchain.agents import create_agent
 from langchain.agents.middleware import (
+    AgentMiddleware,
     ModelRequest,
     ModelResponse,
     dynamic_prompt,
-    wrap_model_call,
 )
-from langchain_openai import ChatOpenAI
+from langchain.agents.structured_output import ToolStrategy
 from pydantic import BaseModel
 
 from ..core import enums, schemas
-from ..settings import PROMPTS_DIR, settings
+from ..settings import settings
+from .llm import create_chat_model
+from .metrics import UsageMiddleware
 from .module_designer import ContentBlock, SequenceStep
+from .prompts import prompt_registry
 from .tools import content_block_generator_tools
+from .tracing import TracingMiddleware
 
 logger = logging.getLogger(__name__)
 
-model = ChatOpenAI(
-    api_key=settings.yandexcloud.apikey,
-    model=settings.yandexcloud.qwen3_235b,
-    base_url=settings.yandexcloud.base_url,
+model = create_chat_model(
+    "content_block_generator",
+    settings.yandexcloud.qwen3_235b,
     temperature=0.5,
     max_retries=3
 )
@@ -36,10 +39,10 @@ class GeneratorContext(BaseModel):
 
 @dynamic_prompt
 def context_aware_prompt(request: ModelRequest) -> str:
-    prompt = (PROMPTS_DIR / "content_block_generator.md").read_text(encoding="utf-8")
     learning_sequence: list[SequenceStep] = request.runtime.context.learning_sequence
     content_block: ContentBlock = request.runtime.context.content_block
-    return prompt.format(
+    return prompt_registry.render(
+        "content_block_generator",
         module_title=request.runtime.context.module_title,
         module_description=request.runtime.context.module_description,
         learning_sequence="\n".join([
@@ -52,27 +55,57 @@ def context_aware_prompt(request: ModelRequest) -> str:
     )
 
 
-@wrap_model_call
-def context_based_output(
-        request: ModelRequest,
-        handler: Callable[[ModelRequest], ModelResponse]
-) -> ModelResponse:
-    block_type: enums.BlockType = request.runtime.context.content_block.block_type
+def block_schema(block_type: enums.BlockType) -> type[BaseModel]:
+    """Схема структурированного ответа для типа контент блока"""
+
     match block_type:
         case enums.BlockType.READING:
-            request = request.override(response_format=schemas.ReadingBlock)
-        case block_type.VIDEO:
-            request = request.override(response_format=schemas.VideoBlock)
-        case block_type.CODE_EXAMPLE:
-            request = request.override(response_format=schemas.CodeExampleBlock)
+            return schemas.ReadingBlock
+        case enums.BlockType.VIDEO:
+            return schemas.VideoBlock
+        case enums.BlockType.CODE_EXAMPLE:
+            return schemas.CodeExampleBlock
         case _:
-            request = request.override(response_format=schemas.TheoryBlock)
-    return handler(request)
+            return schemas.TheoryBlock
+
+
+def _with_block_schema(request: ModelRequest) -> ModelRequest:
+    block_type: enums.BlockType = request.runtime.context.content_block.block_type
+    return request.override(response_format=ToolStrategy(block_schema(block_type)))
+
+
+class ContextBasedOutput(AgentMiddleware):
+    """Схема ответа по типу контент блока из контекста.
+
+    Инструменты структурированного ответа объявляются при создании агента
+    (`ToolStrategy` по всем схемам блоков), здесь выбирается одна из них.
+    Генератор курса вызывает агента асинхронно, поэтому нужны обе версии обёртки.
+    """
+
+    def wrap_model_call(  # noqa: PLR6301
+            self,
+            request: ModelRequest,
+            handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse:
+        return handler(_with_block_schema(request))
+
+    async def awrap_model_call(  # noqa: PLR6301
+            self,
+            request: ModelRequest,
+            handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        return await handler(_with_block_schema(request))
 
 
 agent = create_agent(
     model=model,
     tools=content_block_generator_tools,
-    middleware=[context_aware_prompt, context_based_output],
+    middleware=[
+        context_aware_prompt,
+        ContextBasedOutput(),
+        UsageMiddleware("content_block_generator"),
+        TracingMiddleware("content_block_generator"),
+    ],
     context_schema=GeneratorContext,
+    response_format=ToolStrategy(schemas.AnyBlockData),
 )
@@ -5,19 +5,21 @@ from langchain.agents import create_agent
 from langchain.agents.middleware import ModelRequest, dynamic_prompt
 from langchain.agents.structured_output import ToolStrategy
 from langchain.tools import ToolRuntime, tool
-from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field, NonNegativeInt
 
 from ..core import schemas
 from ..rag.attached_materials import search_materials
-from ..settings import PROMPTS_DIR, settings
+from ..settings import settings
+from .llm import create_chat_model
+from .metrics import UsageMiddleware
+from .prompts import prompt_registry
+from .tracing import TracingMiddleware
 
 logger = logging.getLogger(__name__)
 
-model = ChatOpenAI(
-    api_key=settings.yandexcloud.apikey,
-    model=settings.yandexcloud.aliceai_llm,
-    base_url=settings.yandexcloud.base_url,
+model = create_chat_model(
+    "course_structure_planner",
+    settings.yandexcloud.aliceai_llm,
     temperature=0.5,
     max_retries=3
 )
@@ -60,17 +62,22 @@ async def attached_materials_search(runtime: ToolRuntime, query: str) -> list[st
 
 @dynamic_prompt
 def inject_teacher_inputs_in_system_prompt(request: ModelRequest) -> str:
-    prompt = (PROMPTS_DIR / "course_structure_planner.md").read_text(encoding="utf-8")
     teacher_inputs: schemas.TeacherInputs = request.runtime.context.teacher_inputs
     if teacher_inputs is None:
         raise ValueError("Teacher inputs missing in context!")
-    return prompt.format(teacher_prompt=teacher_inputs.to_prompt())
+    return prompt_registry.render(
+        "course_structure_planner", teacher_prompt=teacher_inputs.to_prompt()
+    )
 
 
 agent = create_agent(
     model=model,
     tools=[attached_materials_search],
-    middleware=[inject_teacher_inputs_in_system_prompt],
+    middleware=[
+        inject_teacher_inputs_in_system_prompt,
+        UsageMiddleware("course_structure_planner"),
+        TracingMiddleware("course_structure_planner"),
+    ],
     context_schema=PlannerContext,
     response_format=ToolStrategy(CourseStructurePlan)
 )
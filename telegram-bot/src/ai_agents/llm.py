@@ -0,0 +1,76 @@
+from typing import Any
+
+import logging
+from functools import cache
+
+from langchain_core.embeddings import Embeddings
+from langchain_openai import ChatOpenAI
+
+from ..settings import settings
+from .cache import LLMCacheStore, PersistentLLMCache, SemanticLLMCache
+from .metrics import UsageCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+_caches: dict[str, PersistentLLMCache] = {}
+
+
+@cache
+def _cache_store() -> LLMCacheStore:
+    return LLMCacheStore(
+        path=settings.llm_cache.path,
+        ttl_seconds=settings.llm_cache.ttl_seconds,
+        max_entries=settings.llm_cache.max_entries,
+    )
+
+
+def _embeddings() -> Embeddings:
+    from ..rag.attached_materials import get_embeddings  # noqa: PLC0415
+
+    return get_embeddings()
+
+
+def get_llm_cache(agent: str, semantic: bool = False) -> PersistentLLMCache | None:
+    """Возвращает кэш ответов LLM для агента (или `None`, если кэш отключён).
+
+    :param agent: Название агента или инструмента, используется как namespace кэша.
+    :param semantic: Разрешить попадания по семантической близости запроса.
+    """
+    if not settings.llm_cache.enabled:
+        return None
+    if agent not in _caches:
+        if semantic and settings.llm_cache.semantic:
+            _caches[agent] = SemanticLLMCache(
+                _cache_store(),
+                namespace=agent,
+                embeddings_factory=_embeddings,
+                similarity_threshold=settings.llm_cache.similarity_threshold,
+                max_candidates=settings.llm_cache.semantic_max_candidates,
+            )
+        else:
+            _caches[agent] = PersistentLLMCache(_cache_store(), namespace=agent)
+    return _caches[agent]
+
+
+def create_chat_model(
+        agent: str, model: str, *, semantic_cache: bool = False, **kwargs: Any
+) -> ChatOpenAI:
+    """Создаёт модель Yandex Cloud AI Studio с подключенным кэшем ответов и учётом токенов.
+
+    :param agent: Название агента или инструмента, которому принадлежит модель.
+    :param model: URI модели.
+    :param semantic_cache: Использовать семантический кэш (для инструментов).
+    :param kwargs: Параметры модели (temperature, max_tokens, max_retries, ...).
+    """
+    return ChatOpenAI(
+        api_key=settings.yandexcloud.apikey,
+        model=model,
+        base_url=settings.yandexcloud.base_url,
+        cache=get_llm_cache(agent, semantic=semantic_cache),
+        callbacks=[UsageCallbackHandler(agent, model)],
+        # Без `base_url` ChatOpenAI запрашивает usage в потоке сам, с ним - только явно,
+        # иначе потоковые вызовы (генерация блоков через `astream`) учитываются без токенов
+        stream_usage=True,
+        **kwargs,
+    )
+
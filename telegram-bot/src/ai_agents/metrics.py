@@ -0,0 +1,353 @@
+from typing import Any, Literal
+
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
+from functools import cache
+from operator import itemgetter
+from pathlib import Path
+from uuid import UUID
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain.tools.tool_node import ToolCallRequest
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import ToolMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langgraph.types import Command
+
+from ..settings import settings
+
+logger = logging.getLogger(__name__)
+
+type GroupBy = Literal["course", "task", "agent", "tool", "model"]
+
+# Колонка таблицы для каждого разреза отчёта
+GROUP_COLUMNS: dict[str, str] = {
+    "course": "course_id",
+    "task": "task_id",
+    "agent": "agent",
+    "tool": "tool",
+    "model": "model",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class MetricsScope:
+    """Атрибуция вызовов моделей и инструментов.
+
+    :param course_id: Генерируемый курс.
+    :param task_id: Задача, в рамках которой идёт генерация.
+    :param agent: Агент, вызвавший инструмент.
+    :param tool: Выполняемый инструмент, модели внутри него учитываются на его счёт.
+    """
+
+    course_id: UUID | None = None
+    task_id: UUID | None = None
+    agent: str | None = None
+    tool: str | None = None
+
+
+# Наследуется задачами asyncio и потоками `run_in_executor`, поэтому
+# доходит до вызовов моделей внутри графа агента и инструментов
+_scope: ContextVar[MetricsScope] = ContextVar("metrics_scope", default=MetricsScope())  # noqa: B039
+
+
+@contextmanager
+def metrics_scope(**fields: Any) -> Iterator[MetricsScope]:
+    """Дополняет атрибуцию вызовов внутри блока (`course_id`, `task_id`, `agent`, `tool`)"""
+
+    scope = replace(_scope.get(), **fields)
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+def model_name(model: str) -> str:
+    """Короткое имя модели без каталога Yandex Cloud (`gpt://<folder>/qwen3-235b/latest`)"""
+
+    if model.startswith("gpt://"):
+        return model.removeprefix("gpt://").split("/")[1]
+    return model
+
+
+class MetricsStore:
+    """Локальное SQLite хранилище вызовов моделей и инструментов агентов.
+
+    :param path: Путь к файлу базы данных метрик.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS agent_calls (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                agent TEXT NOT NULL,
+                model TEXT,
+                tool TEXT,
+                prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                completion_tokens INTEGER NOT NULL DEFAULT 0,
+                cached INTEGER NOT NULL DEFAULT 0,
+                latency REAL NOT NULL,
+                course_id TEXT,
+                task_id TEXT,
+                error TEXT,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS ix_agent_calls_created_at ON agent_calls (created_at)"
+        )
+
+    def record(
+            self,
+            kind: Literal["model", "tool"],
+            agent: str,
+            latency: float,
+            model: str | None = None,
+            tool: str | None = None,
+            prompt_tokens: int = 0,
+            completion_tokens: int = 0,
+            cached: bool = False,
+            error: str | None = None,
+    ) -> None:
+        scope = _scope.get()
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO agent_calls (kind, agent, model, tool, prompt_tokens, "
+                "completion_tokens, cached, latency, course_id, task_id, error, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    kind,
+                    agent,
+                    model,
+                    tool,
+                    prompt_tokens,
+                    completion_tokens,
+                    int(cached),
+                    latency,
+                    str(scope.course_id) if scope.course_id else None,
+                    str(scope.task_id) if scope.task_id else None,
+                    error,
+                    time.time(),
+                ),
+            )
+
+    def aggregate(self, by: GroupBy, since: float | None = None) -> list[dict[str, Any]]:
+        """Суммирует вызовы по разрезу (курс, задача, агент, инструмент или модель).
+
+        Время моделей и инструментов считается раздельно: время инструмента
+        включает вызовы моделей внутри него. Стоимость считается по ценам
+        `settings.metrics.model_prices`, ответы из кэша бесплатны и учитываются
+        в `cached_calls` и доле попаданий `cache_hit_rate`.
+
+        :param by: Разрез отчёта.
+        :param since: Учитывать вызовы начиная с unix времени.
+        """
+
+        column = GROUP_COLUMNS[by]
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT {column}, model, "  # noqa: S608
+                "SUM(kind = 'model'), SUM(kind = 'model' AND cached), SUM(kind = 'tool'), "
+                "SUM(error IS NOT NULL), "
+                "SUM(prompt_tokens), SUM(completion_tokens), "
+                "SUM(CASE WHEN cached THEN 0 ELSE prompt_tokens END), "
+                "SUM(CASE WHEN cached THEN 0 ELSE completion_tokens END), "
+                "SUM(CASE WHEN kind = 'model' THEN latency ELSE 0 END), "
+                "SUM(CASE WHEN kind = 'tool' THEN latency ELSE 0 END) "
+                "FROM agent_calls WHERE created_at >= ? "
+                f"GROUP BY {column}, model",
+                (since or 0,),
+            ).fetchall()
+        report: dict[str | None, dict[str, Any]] = {}
+        for (
+            key, model, model_calls, cached_calls, tool_calls, errors,
+            prompt_tokens, completion_tokens,
+            billed_prompt_tokens, billed_completion_tokens, model_seconds, tool_seconds,
+        ) in rows:
+            item = report.setdefault(key, {
+                by: key,
+                "model_calls": 0,
+                "cached_calls": 0,
+                "cache_hit_rate": 0.0,
+                "tool_calls": 0,
+                "errors": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "cost": 0.0,
+                "model_seconds": 0.0,
+                "tool_seconds": 0.0,
+            })
+            prompt_price, completion_price = settings.metrics.model_prices.get(
+                model or "", (0.0, 0.0)
+            )
+            item["model_calls"] += model_calls
+            item["cached_calls"] += cached_calls
+            item["tool_calls"] += tool_calls
+            item["errors"] += errors
+            item["prompt_tokens"] += prompt_tokens
+            item["completion_tokens"] += completion_tokens
+            item["cost"] += (
+                billed_prompt_tokens * prompt_price + billed_completion_tokens * completion_price
+            ) / 1000
+            item["model_seconds"] += model_seconds
+            item["tool_seconds"] += tool_seconds
+        for item in report.values():
+            if item["model_calls"]:
+                item["cache_hit_rate"] = round(item["cached_calls"] / item["model_calls"], 4)
+            item["cost"] = round(item["cost"], 6)
+            item["model_seconds"] = round(item["model_seconds"], 3)
+            item["tool_seconds"] = round(item["tool_seconds"], 3)
+        return sorted(
+            report.values(), key=itemgetter("cost", "model_seconds"), reverse=True
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM agent_calls")
+
+
+@cache
+def get_metrics_store() -> MetricsStore:
+    return MetricsStore(settings.metrics.path)
+
+
+def record_call(kind: Literal["model", "tool"], agent: str, latency: float, **fields: Any) -> None:
+    """Сохраняет вызов, ошибка записи метрик не прерывает генерацию"""
+
+    if not settings.metrics.enabled:
+        return
+    try:
+        get_metrics_store().record(kind, agent, latency, **fields)
+    except sqlite3.Error:
+        logger.exception("Failed to record %s call of `%s`", kind, agent)
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """Учитывает токены и время вызовов модели.
+
+    Подключается к модели в `create_chat_model`, поэтому учитывает и модели
+    агентов, и цепочки внутри инструментов. Вызов внутри инструмента
+    записывается на агента, вызвавшего инструмент.
+
+    :param agent: Название агента или инструмента, которому принадлежит модель.
+    :param model: URI модели.
+    """
+
+    # Обработчик вызывается в контексте вызова модели, а не в пуле потоков,
+    # иначе атрибуция из `ContextVar` теряется
+    run_inline = True
+
+    def __init__(self, agent: str, model: str) -> None:
+        self.agent = agent
+        self.model = model_name(model)
+        self._started_at: dict[UUID, float] = {}
+
+    def on_chat_model_start(
+            self, serialized: dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any  # noqa: ARG002
+    ) -> None:
+        self._started_at[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:  # noqa: ARG002
+        latency = time.perf_counter() - self._started_at.pop(run_id, time.perf_counter())
+        prompt_tokens, completion_tokens, cached = 0, 0, False
+        for generations in response.generations:
+            for generation in generations:
+                if not isinstance(generation, ChatGeneration):
+                    continue
+                usage = getattr(generation.message, "usage_metadata", None) or {}
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+                # Ответ из кэша LangChain помечает нулевой стоимостью
+                cached = cached or usage.get("total_cost") == 0
+        if not prompt_tokens and not completion_tokens:
+            token_usage = (response.llm_output or {}).get("token_usage") or {}
+            prompt_tokens = token_usage.get("prompt_tokens", 0)
+            completion_tokens = token_usage.get("completion_tokens", 0)
+        self._record(
+            latency,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cached=cached,
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:  # noqa: ARG002
+        latency = time.perf_counter() - self._started_at.pop(run_id, time.perf_counter())
+        self._record(latency, error=type(error).__name__)
+
+    def _record(self, latency: float, **fields: Any) -> None:
+        scope = _scope.get()
+        record_call(
+            "model",
+            scope.agent or self.agent,
+            latency,
+            model=self.model,
+            tool=scope.tool,
+            **fields,
+        )
+
+
+class UsageMiddleware(AgentMiddleware):
+    """Учитывает время вызовов инструментов агента.
+
+    На время вызова инструмента задаёт атрибуцию, поэтому модели внутри
+    инструмента учитываются на его счёт.
+
+    :param agent: Название агента.
+    """
+
+    def __init__(self, agent: str) -> None:
+        super().__init__()
+        self.agent = agent
+
+    def _record_tool(
+            self, tool: str, started_at: float, result: ToolMessage | Command | None
+    ) -> None:
+        error = None
+        if result is None:
+            error = "exception"
+        elif isinstance(result, ToolMessage) and result.status == "error":
+            # Ошибки инструментов ToolNode возвращает модели сообщением
+            error = "tool_error"
+        record_call("tool", self.agent, time.perf_counter() - started_at, tool=tool, error=error)
+
+    def wrap_tool_call(
+            self,
+            request: ToolCallRequest,
+            handler: Callable[[ToolCallRequest], ToolMessage | Command],
+    ) -> ToolMessage | Command:
+        tool = request.tool_call["name"]
+        started_at, result = time.perf_counter(), None
+        try:
+            with metrics_scope(agent=self.agent, tool=tool):
+                result = handler(request)
+        finally:
+            self._record_tool(tool, started_at, result)
+        return result
+
+    async def awrap_tool_call(
+            self,
+            request: ToolCallRequest,
+            handler: Callable[[ToolCallRequest], Awaitable[ToolMessage | Command]],
+    ) -> ToolMessage | Command:
+        tool = request.tool_call["name"]
+        started_at, result = time.perf_counter(), None
+        try:
+            with metrics_scope(agent=self.agent, tool=tool):
+                result = await handler(request)
+        finally:
+            self._record_tool(tool, started_at, result)
+        return result
@@ -5,20 +5,22 @@ from langchain.agents import create_agent
 from langchain.agents.middleware import ModelRequest, dynamic_prompt
 from langchain.agents.structured_output import ToolStrategy
 from langchain.tools import ToolRuntime, tool
-from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field, NonNegativeInt, PositiveInt
 
 from ..core import enums, schemas
 from ..rag.attached_materials import search_materials
-from ..settings import PROMPTS_DIR, settings
+from ..settings import settings
 from .course_structure_planner import ModuleNote
+from .llm import create_chat_model
+from .metrics import UsageMiddleware
+from .prompts import prompt_registry
+from .tracing import TracingMiddleware
 
 logger = logging.getLogger(__name__)
 
-model = ChatOpenAI(
-    api_key=settings.yandexcloud.apikey,
-    model=settings.yandexcloud.aliceai_llm,
-    base_url=settings.yandexcloud.base_url,
+model = create_chat_model(
+    "module_designer",
+    settings.yandexcloud.aliceai_llm,
     temperature=0.5,
     max_retries=3
 )
@@ -95,11 +97,11 @@ class ModuleDesign(BaseModel):
 
 @dynamic_prompt
 def inject_module_note_in_system_prompt(request: ModelRequest) -> str:
-    prompt = (PROMPTS_DIR / "module_designer.md").read_text(encoding="utf-8")
     teacher_inputs: schemas.TeacherInputs = request.runtime.context.teacher_inputs
     course_description: str = request.runtime.context.course_description
     module_note: ModuleNote = request.runtime.context.module_note
-    return prompt.format(
+    return prompt_registry.render(
+        "module_designer",
         teacher_prompt=teacher_inputs.to_prompt(),
         course_description=course_description,
         **module_note.model_dump()
@@ -110,6 +112,10 @@ agent = create_agent(
     model=model,
     tools=[attached_materials_search],
     context_schema=DesignerContext,
-    middleware=[inject_module_note_in_system_prompt],
+    middleware=[
+        inject_module_note_in_system_prompt,
+        UsageMiddleware("module_designer"),
+        TracingMiddleware("module_designer"),
+    ],
     response_format=ToolStrategy(ModuleDesign)
 )
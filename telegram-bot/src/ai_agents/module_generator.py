@@ -1,30 +1,38 @@
 from typing import Any, TypedDict
 
 import logging
+from collections.abc import Callable
 
 import aiohttp
 from langchain.agents import create_agent
 from langchain.agents.middleware import ModelRequest, SummarizationMiddleware, dynamic_prompt
-from langchain_core.output_parsers import PydanticOutputParser, StrOutputParser
+from langchain_core.output_parsers import (
+    JsonOutputParser,
+    PydanticOutputParser,
+    StrOutputParser,
+)
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableSerializable
 from langchain_core.tools import tool
-from langchain_openai import ChatOpenAI
 
 from ..core import enums, schemas
 from ..intergrations import yandex_search_api
 from ..services import crawler
 from ..settings import PROMPTS_DIR, settings
 from .course_structure_planner import ModulePlan
+from .llm import create_chat_model
+from .metrics import UsageMiddleware
+from .prompts import prompt_registry
+from .tools import code_request, code_writer_model, mermaid_artist_model
+from .tracing import TracingMiddleware
 
 logger = logging.getLogger(__name__)
 
 SYSTEM_PROMPT = (PROMPTS_DIR / "module_generator.md").read_text(encoding="utf-8")
 
-llm = ChatOpenAI(
-    api_key=settings.yandexcloud.apikey,
-    model=settings.yandexcloud.qwen3_235b,
-    base_url=settings.yandexcloud.base_url,
+llm = create_chat_model(
+    "module_generator",
+    settings.yandexcloud.qwen3_235b,
     temperature=0.2,
     max_retries=3,
     max_tokens=3000,
@@ -77,20 +85,9 @@ async def draw_mermaid_diagram(prompt: str) -> str:
         prompt: Твоё ТЗ для генерации диаграммы.
     """
 
-    model = ChatOpenAI(
-        api_key=settings.yandexcloud.apikey,
-        model=settings.yandexcloud.aliceai_llm,
-        base_url=settings.yandexcloud.base_url,
-        temperature=0.3,
-        max_retries=3
-    )
-    system_prompt = (PROMPTS_DIR / "mermaid_artist.md").read_text(encoding="utf-8")
-    chain = (
-            ChatPromptTemplate.from_messages([("system", system_prompt)])
-            | model
-            | StrOutputParser()
-    )
-    return await chain.ainvoke({"messages": [("human", prompt)]})
+    system_prompt = prompt_registry.render("mermaid_artist")
+    chain = mermaid_artist_model | StrOutputParser()
+    return await chain.ainvoke([("system", system_prompt), ("human", prompt)])
 
 
 @tool(parse_docstring=True)
@@ -102,17 +99,11 @@ async def write_code(language: str, prompt: str) -> str:
         prompt: Запрос для написания кода.
     """
 
-    model = ChatOpenAI(
-        api_key=settings.yandexcloud.apikey,
-        model=settings.yandexcloud.qwen3_235b,
-        base_url=settings.yandexcloud.base_url,
-        temperature=0.2,
-        max_tokens=3000,
-        max_retries=3,
-    )
-    system_prompt = (PROMPTS_DIR / "code_writer.md").read_text(encoding="utf-8")
-    chain = ChatPromptTemplate.from_template(system_prompt) | model | StrOutputParser()
-    return await chain.ainvoke({"language": language, "prompt": prompt})
+    chain = code_writer_model | StrOutputParser()
+    return await chain.ainvoke([
+        ("system", prompt_registry.render("code_writer", language=language)),
+        ("human", code_request(language, prompt)),
+    ])
 
 
 class ContentBlockContext(TypedDict):
@@ -129,9 +120,9 @@ class ContentBlockContext(TypedDict):
 
 @dynamic_prompt
 def content_block_generator_system_prompt(request: ModelRequest) -> str:
-    system_prompt = (PROMPTS_DIR / "content_block_generator.md").read_text(encoding="utf-8")
     context = request.runtime.context
-    return system_prompt.format(
+    return prompt_registry.render(
+        "content_block_generator",
         discipline=context.get("discipline"),
         title=context.get("module_title"),
         description=context.get("module_description"),
@@ -151,20 +142,38 @@ content_block_generator_agent = create_agent(
         content_block_generator_system_prompt,
         SummarizationMiddleware(
             model=llm, trigger=("tokens", 5000)
-        )
+        ),
+        UsageMiddleware("module_generator"),
+        TracingMiddleware("module_generator"),
     ],
     context_schema=ContentBlockContext,
     response_format=schemas.ContentBlock
 )
 
 
-async def generate_module(discipline: str, module_plan: ModulePlan) -> schemas.Module:
+async def generate_module(
+        discipline: str,
+        module_plan: ModulePlan,
+        on_partial: Callable[[dict[str, Any]], None] | None = None,
+) -> schemas.Module:
+    """Генерирует модуль курса.
+
+    :param discipline: Дисциплина курса.
+    :param module_plan: План модуля.
+    :param on_partial: Обработчик частично сгенерированного модуля, если передан -
+    ответ модели разбирается потоково по мере поступления токенов.
+    """
     logger.info("Generating %s module of discipline %s", module_plan.order, discipline)
     parser = PydanticOutputParser(pydantic_object=schemas.Module)
     prompt = ChatPromptTemplate.from_messages([
         ("system", SYSTEM_PROMPT),
     ]).partial(format_instructions=parser.get_format_instructions())
-    chain: RunnableSerializable[dict[str, str], schemas.Module] = prompt | llm | parser
-    return await chain.ainvoke({
-        "discipline": discipline, "module_note": module_plan.model_dump_json(),
-    })
+    inputs = {"discipline": discipline, "module_note": module_plan.model_dump_json()}
+    if on_partial is None:
+        chain: RunnableSerializable[dict[str, str], schemas.Module] = prompt | llm | parser
+        return await chain.ainvoke(inputs)
+    partial: dict[str, Any] = {}
+    # JsonOutputParser при потоковом разборе отдаёт накопленный JSON после каждого токена
+    async for partial in (prompt | llm | JsonOutputParser()).astream(inputs):
+        on_partial(partial)
+    return schemas.Module.model_validate(partial)
@@ -0,0 +1,98 @@
+import logging
+import string
+import threading
+from pathlib import Path
+
+from ..settings import PROMPTS_DIR, settings
+
+logger = logging.getLogger(__name__)
+
+_formatter = string.Formatter()
+
+
+def _escape(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+class PromptTemplate:
+    """Скомпилированный шаблон промпта.
+
+    Статический префикс (текст до первой подстановки) вычисляется один раз при компиляции,
+    поэтому стабильная часть системного промпта побайтово совпадает между вызовами
+    и может кэшироваться на стороне провайдера.
+    """
+
+    __slots__ = ("_tail", "fields", "mtime", "name", "prefix", "text")
+
+    def __init__(self, name: str, text: str, mtime: float) -> None:
+        self.name = name
+        self.text = text
+        self.mtime = mtime
+        prefix_parts: list[str] = []
+        tail_parts: list[str] = []
+        fields: list[str] = []
+        for literal, field_name, format_spec, conversion in _formatter.parse(text):
+            if not fields:
+                prefix_parts.append(literal)
+            else:
+                tail_parts.append(_escape(literal))
+            if field_name is None:
+                continue
+            fields.append(field_name)
+            tail_parts.append(
+                "{" + field_name
+                + (f"!{conversion}" if conversion else "")
+                + (f":{format_spec}" if format_spec else "")
+                + "}"
+            )
+        self.prefix = "".join(prefix_parts)
+        self.fields = frozenset(fields)
+        self._tail = "".join(tail_parts)
+
+    def render(self, **kwargs: object) -> str:
+        """Подставляет значения в шаблон (семантика `str.format`)"""
+
+        if not self._tail:
+            return self.prefix
+        return self.prefix + self._tail.format(**kwargs)
+
+
+class PromptRegistry:
+    """Реестр промптов, загружаемых из файлов один раз.
+
+    :param directory: Директория с Markdown файлами промптов.
+    :param hot_reload: Перечитывать файл при изменении mtime (для разработки).
+    """
+
+    def __init__(self, directory: Path, hot_reload: bool = False) -> None:
+        self.directory = directory
+        self.hot_reload = hot_reload
+        self._templates: dict[str, PromptTemplate] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, name: str) -> PromptTemplate:
+        path = self.directory / f"{name}.md"
+        mtime = path.stat().st_mtime
+        template = PromptTemplate(name, path.read_text(encoding="utf-8"), mtime)
+        logger.info("Prompt `%s` compiled, static prefix length: %s", name, len(template.prefix))
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        template = self._templates.get(name)
+        if template is not None and not self.hot_reload:
+            return template
+        with self._lock:
+            template = self._templates.get(name)
+            if template is None or (
+                self.hot_reload
+                and (self.directory / f"{name}.md").stat().st_mtime != template.mtime
+            ):
+                template = self._load(name)
+                self._templates[name] = template
+        return template
+
+    def render(self, name: str, /, **kwargs: object) -> str:
+        return self.get(name).render(**kwargs)
+
+
+prompt_registry = PromptRegistry(PROMPTS_DIR, hot_reload=settings.prompts.hot_reload)
@@ -0,0 +1,178 @@
+from typing import Annotated, Any
+
+import json
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import cache
+
+from langchain_core.messages import AIMessageChunk
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.utils.json import parse_partial_json
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+# Узел графа `create_agent`, вызывающий модель. Токены моделей внутри инструментов
+# (например генерация Mermaid диаграммы) в ответ агента не попадают
+MODEL_NODE = "model"
+
+
+@dataclass(frozen=True, slots=True)
+class PartialOutput:
+    """Частичный структурированный ответ агента.
+
+    :param delta: Токены модели, полученные с предыдущей публикации.
+    :param fields: Поля ответа, уже прошедшие валидацию схемы.
+    :param done: Ответ получен полностью.
+    """
+
+    delta: str
+    fields: dict[str, Any]
+    done: bool = False
+
+
+@cache
+def _field_adapter(schema: type[BaseModel], name: str) -> TypeAdapter[Any]:
+    field = schema.model_fields[name]
+    if not field.metadata:
+        return TypeAdapter(field.annotation)
+    return TypeAdapter(Annotated[field.annotation, *field.metadata])
+
+
+def _parse_partial(text: str) -> Any:
+    try:
+        return parse_partial_json(text)
+    except json.JSONDecodeError:
+        # Первый фрагмент вызова инструмента приходит с пустыми аргументами
+        return None
+
+
+def validate_partial(schema: type[BaseModel], data: Any) -> dict[str, Any]:
+    """Оставляет поля частичного ответа, значения которых уже валидны по схеме.
+
+    Недописанная строка валидна, поэтому текстовые поля появляются с первыми токенами,
+    а, например, недописанный вложенный объект пропускается до его завершения.
+    """
+
+    if not isinstance(data, dict):
+        return {}
+    fields = {}
+    for name, value in data.items():
+        if name not in schema.model_fields:
+            continue
+        adapter = _field_adapter(schema, name)
+        try:
+            fields[name] = adapter.dump_python(adapter.validate_python(value), mode="json")
+        except ValidationError:
+            continue
+    return fields
+
+
+class StructuredOutputCollector:
+    """Собирает структурированный ответ модели из потока токенов.
+
+    Ответ приходит либо аргументами вызова инструмента с именем схемы
+    (`ToolStrategy`), либо JSON в тексте сообщения (`ProviderStrategy`).
+
+    :param schema: Схема ответа.
+    """
+
+    def __init__(self, schema: type[BaseModel]) -> None:
+        self.schema = schema
+        self._message_id: str | None = None
+        self._tool_names: dict[int, str] = {}
+        self._tool_args: dict[int, list[str]] = {}
+        self._text: list[str] = []
+
+    def feed(self, chunk: AIMessageChunk) -> str:
+        """Добавляет фрагмент сообщения модели и возвращает его токены.
+
+        Фрагменты копятся строками и разбираются только в `partial`: сложение
+        `AIMessageChunk` разбирает накопленные аргументы на каждом токене.
+        """
+
+        if chunk.id != self._message_id:
+            # Новый вызов модели, например после вызова инструментов
+            self._message_id = chunk.id
+            self._tool_names, self._tool_args, self._text = {}, {}, []
+        tokens = []
+        for tool_call_chunk in chunk.tool_call_chunks:
+            index = tool_call_chunk["index"] or 0
+            if tool_call_chunk["name"]:
+                self._tool_names[index] = tool_call_chunk["name"]
+            self._tool_args.setdefault(index, []).append(tool_call_chunk["args"] or "")
+            tokens.append(tool_call_chunk["args"] or "")
+        if not chunk.tool_call_chunks:
+            self._text.append(chunk.text)
+            tokens.append(chunk.text)
+        return "".join(tokens)
+
+    def partial(self) -> dict[str, Any]:
+        for index, name in self._tool_names.items():
+            if name == self.schema.__name__:
+                return validate_partial(
+                    self.schema, _parse_partial("".join(self._tool_args[index]))
+                )
+        if self._tool_names:
+            # Модель вызывает обычные инструменты, ответа в этом сообщении нет
+            return {}
+        return validate_partial(self.schema, _parse_partial("".join(self._text)))
+
+
+async def astream_structured(
+        agent: Runnable,
+        agent_input: dict[str, Any] | None,
+        config: RunnableConfig,
+        *,
+        context: BaseModel,
+        schema: type[BaseModel],
+        on_partial: Callable[[PartialOutput], None],
+        interval: float,
+) -> dict[str, Any]:
+    """Выполняет агента через `astream`, публикуя частичный ответ по мере генерации.
+
+    Первые валидные поля публикуются сразу, следующие частичные ответы -
+    не чаще чем раз в `interval` секунд, последний - после получения полного ответа.
+
+    :param agent: Агент `create_agent`.
+    :param agent_input: Вход агента, None - продолжение с последнего checkpoint.
+    :param config: Конфигурация запуска.
+    :param context: Контекст агента.
+    :param schema: Схема структурированного ответа.
+    :param on_partial: Обработчик частичного ответа.
+    :param interval: Минимальный интервал между публикациями в секундах.
+    :return: Итоговое состояние агента, как у `ainvoke`.
+    """
+
+    collector = StructuredOutputCollector(schema)
+    state: dict[str, Any] = {}
+    delta, published_at, has_content = [], 0.0, False
+    async for mode, data in agent.astream(
+        agent_input, config, context=context, stream_mode=["messages", "values"]
+    ):
+        if mode == "values":
+            state = data
+            continue
+        message, metadata = data
+        if metadata.get("langgraph_node") != MODEL_NODE or not isinstance(
+            message, AIMessageChunk
+        ):
+            continue
+        delta.append(collector.feed(message))
+        now = time.monotonic()
+        if now - published_at < interval and has_content:
+            continue
+        fields = collector.partial()
+        # Первые валидные поля публикуются сразу, дальше - не чаще `interval`
+        if fields or now - published_at >= interval:
+            on_partial(PartialOutput(delta="".join(delta), fields=fields))
+            delta, published_at, has_content = [], now, bool(fields)
+    structured_response = state.get("structured_response")
+    on_partial(PartialOutput(
+        delta="".join(delta),
+        fields=(
+            structured_response.model_dump(mode="json")
+            if isinstance(structured_response, BaseModel) else collector.partial()
+        ),
+        done=True,
+    ))
+    return state
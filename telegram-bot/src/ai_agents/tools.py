@@ -6,20 +6,39 @@ import logging
 import aiohttp
 from langchain.tools import tool
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
 
 from ..intergrations import yandex_search_api
 from ..services import crawler as crawler_service
-from ..settings import PROMPTS_DIR, settings
+from ..settings import settings
+from .llm import create_chat_model
+from .prompts import prompt_registry
 
 logger = logging.getLogger(__name__)
 
+RUTUBE_API_URL = "https://rutube.ru/api/"
+
+mermaid_artist_model = create_chat_model(
+    "draw_mermaid_diagram",
+    settings.yandexcloud.aliceai_llm,
+    semantic_cache=True,
+    temperature=0.3,
+    max_retries=3
+)
+
+code_writer_model = create_chat_model(
+    "write_code",
+    settings.yandexcloud.qwen3_235b,
+    semantic_cache=True,
+    temperature=0.2,
+    max_tokens=3000,
+    max_retries=3,
+)
+
 
 async def search_in_rutube(query: str, videos_count: int = 10) -> list[dict[str, Any]]:
     logger.info("Calling `rutube_search` tool with query: `%s`", query)
     async with (
-        aiohttp.ClientSession(base_url="https://rutube.ru/api/") as session,
+        aiohttp.ClientSession(base_url=RUTUBE_API_URL) as session,
         session.get(url="search/video", params={"query": query}) as response,
     ):
         data = await response.json()
@@ -84,20 +103,15 @@ def draw_mermaid_diagram(prompt: str) -> str:
     """
 
     logger.info("Calling `draw_mermaid_diagram` tool with prompt: `%s`", prompt)
-    model = ChatOpenAI(
-        api_key=settings.yandexcloud.apikey,
-        model=settings.yandexcloud.aliceai_llm,
-        base_url=settings.yandexcloud.base_url,
-        temperature=0.3,
-        max_retries=3
-    )
-    system_prompt = (PROMPTS_DIR / "mermaid_artist.md").read_text(encoding="utf-8")
-    chain = (
-            ChatPromptTemplate.from_messages([("system", system_prompt)])
-            | model
-            | StrOutputParser()
-    )
-    return chain.invoke({"messages": [("human", prompt)]})
+    system_prompt = prompt_registry.render("mermaid_artist")
+    chain = mermaid_artist_model | StrOutputParser()
+    return chain.invoke([("system", system_prompt), ("human", prompt)])
+
+
+def code_request(language: str, prompt: str) -> str:
+    """Запрос к `code_writer_model`, шаблон инструкций передаётся системным сообщением"""
+
+    return f"Язык программирования: {language}\n\n{prompt}"
 
 
 @tool(parse_docstring=True)
@@ -113,17 +127,11 @@ def write_code(language: str, prompt: str) -> str:
         "Calling `write_code` tool with language `%s` by prompt: `%s`",
         language, prompt
     )
-    model = ChatOpenAI(
-        api_key=settings.yandexcloud.apikey,
-        model=settings.yandexcloud.qwen3_235b,
-        base_url=settings.yandexcloud.base_url,
-        temperature=0.2,
-        max_tokens=3000,
-        max_retries=3,
-    )
-    system_prompt = (PROMPTS_DIR / "code_writer.md").read_text(encoding="utf-8")
-    chain = ChatPromptTemplate.from_template(system_prompt) | model | StrOutputParser()
-    return chain.invoke({"language": language, "prompt": prompt})
+    chain = code_writer_model | StrOutputParser()
+    return chain.invoke([
+        ("system", prompt_registry.render("code_writer", language=language)),
+        ("human", code_request(language, prompt)),
+    ])
 
 
 content_block_generator_tools = [
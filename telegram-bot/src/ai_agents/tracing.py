@@ -0,0 +1,113 @@
+from typing import Any
+
+from collections.abc import Awaitable, Callable
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse
+from langchain.tools.tool_node import ToolCallRequest
+from langchain_core.messages import AIMessage, ToolMessage
+from langgraph.types import Command
+from opentelemetry import trace
+
+from ..tracing import tracer
+from .metrics import model_name
+
+
+def _model_attributes(agent: str, request: ModelRequest) -> dict[str, Any]:
+    model = getattr(request.model, "model_name", None) or getattr(request.model, "model", "")
+    return {
+        "gen_ai.operation.name": "chat",
+        "gen_ai.agent.name": agent,
+        "gen_ai.request.model": model_name(str(model)),
+    }
+
+
+def _set_usage(span: trace.Span, response: ModelResponse | AIMessage) -> None:
+    messages = response.result if isinstance(response, ModelResponse) else [response]
+    for message in messages:
+        if isinstance(message, AIMessage) and message.usage_metadata:
+            span.set_attribute("gen_ai.usage.input_tokens", message.usage_metadata["input_tokens"])
+            span.set_attribute(
+                "gen_ai.usage.output_tokens", message.usage_metadata["output_tokens"]
+            )
+
+
+def _set_tool_status(span: trace.Span, result: ToolMessage | Command) -> None:
+    if isinstance(result, ToolMessage) and result.status == "error":
+        # Ошибки инструментов ToolNode возвращает модели сообщением, а не исключением
+        span.set_status(trace.StatusCode.ERROR, "tool_error")
+
+
+class TracingMiddleware(AgentMiddleware):
+    """Создаёт спаны вызовов модели и инструментов агента.
+
+    Спаны инструментов становятся родительскими для их внутренних
+    запросов (поиск, краулер, цепочки с моделями).
+
+    :param agent: Название агента.
+    """
+
+    def __init__(self, agent: str) -> None:
+        super().__init__()
+        self.agent = agent
+
+    def _tool_span(self, request: ToolCallRequest) -> Any:
+        tool = request.tool_call["name"]
+        return tracer.start_as_current_span(
+            f"execute_tool {tool}",
+            attributes={
+                "gen_ai.operation.name": "execute_tool",
+                "gen_ai.agent.name": self.agent,
+                "gen_ai.tool.name": tool,
+                "gen_ai.tool.call.id": request.tool_call.get("id") or "",
+            },
+        )
+
+    def wrap_model_call(
+            self,
+            request: ModelRequest,
+            handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse | AIMessage:
+        attributes = _model_attributes(self.agent, request)
+        with tracer.start_as_current_span(
+            f"chat {attributes['gen_ai.request.model']}",
+            kind=trace.SpanKind.CLIENT,
+            attributes=attributes,
+        ) as span:
+            response = handler(request)
+            _set_usage(span, response)
+            return response
+
+    async def awrap_model_call(
+            self,
+            request: ModelRequest,
+            handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse | AIMessage:
+        attributes = _model_attributes(self.agent, request)
+        with tracer.start_as_current_span(
+            f"chat {attributes['gen_ai.request.model']}",
+            kind=trace.SpanKind.CLIENT,
+            attributes=attributes,
+        ) as span:
+            response = await handler(request)
+            _set_usage(span, response)
+            return response
+
+    def wrap_tool_call(
+            self,
+            request: ToolCallRequest,
+            handler: Callable[[ToolCallRequest], ToolMessage | Command],
+    ) -> ToolMessage | Command:
+        with self._tool_span(request) as span:
+            result = handler(request)
+            _set_tool_status(span, result)
+            return result
+
+    async def awrap_tool_call(
+            self,
+            request: ToolCallRequest,
+            handler: Callable[[ToolCallRequest], Awaitable[ToolMessage | Command]],
+    ) -> ToolMessage | Command:
+        with self._tool_span(request) as span:
+            result = await handler(request)
+            _set_tool_status(span, result)
+            return result
@@ -1,13 +1,23 @@
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums.parse_mode import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 
 from ..settings import settings
 from .handlers import router
+from .storage import create_fsm_storage
+from .updates import UpdateQueue
 
 bot = Bot(token=settings.bot.token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
 
-dp = Dispatcher(storage=MemoryStorage())
+dp = Dispatcher(storage=create_fsm_storage(settings.fsm))
 
 dp.include_router(router)
+
+update_queue = UpdateQueue(
+    dp,
+    bot,
+    workers=settings.webhook.workers,
+    max_size=settings.webhook.max_queue_size,
+    dedupe_size=settings.webhook.dedupe_size,
+    album_latency=settings.ingestion.album_latency,
+)
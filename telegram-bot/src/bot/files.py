@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Awaitable, Callable
+from pathlib import Path
+
+import aiofiles
+from aiogram import Bot
+from aiogram.types import Document
+
+from ..core import schemas
+from ..services import media
+from ..settings import settings
+from ..storage import CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Общее на процесс ограничение одновременных скачиваний из Telegram
+download_semaphore = asyncio.BoundedSemaphore(settings.ingestion.download_concurrency)
+
+
+async def _read_local_file(path: Path) -> AsyncIterator[bytes]:
+    async with aiofiles.open(path, mode="rb") as opened_file:
+        while chunk := await opened_file.read(CHUNK_SIZE):
+            yield chunk
+
+
+async def _stream_file(bot: Bot, file_id: str) -> AsyncIterator[bytes]:
+    """Потоково читает файл из Telegram, как `bot.download`, но без буфера в памяти"""
+
+    file = await bot.get_file(file_id)
+    if bot.session.api.is_local:
+        chunks = _read_local_file(Path(bot.session.api.wrap_local_file.to_local(file.file_path)))
+    else:
+        chunks = bot.session.stream_content(
+            url=bot.session.api.file_url(bot.token, file.file_path),
+            timeout=settings.ingestion.download_timeout,
+            chunk_size=CHUNK_SIZE,
+            raise_for_status=True,
+        )
+    async for chunk in chunks:
+        yield chunk
+
+
+async def download_document(bot: Bot, user_id: int, document: Document) -> schemas.Attachment:
+    async with download_semaphore:
+        return await media.upload_stream(
+            user_id=user_id,
+            filename=document.file_name or document.file_unique_id,
+            chunks=_stream_file(bot, document.file_id),
+        )
+
+
+async def download_documents(
+        bot: Bot,
+        user_id: int,
+        documents: list[Document],
+        on_downloaded: Callable[[schemas.Attachment], Awaitable[None]] | None = None,
+) -> list[schemas.Attachment]:
+    """Параллельно скачивает документы в хранилище.
+
+    Каждый файл передаётся в `on_downloaded` сразу после загрузки, не дожидаясь
+    остальных. Ошибка скачивания одного файла не прерывает остальные.
+
+    :return: Загруженные вложения в порядке документов (без неудавшихся).
+    """
+
+    async def download(document: Document) -> schemas.Attachment:
+        attachment = await download_document(bot, user_id, document)
+        if on_downloaded is not None:
+            await on_downloaded(attachment)
+        return attachment
+
+    results = await asyncio.gather(
+        *(download(document) for document in documents), return_exceptions=True
+    )
+    attachments = []
+    for document, result in zip(documents, results, strict=True):
+        if isinstance(result, BaseException):
+            logger.error(
+                "Error while downloading file `%s`", document.file_name, exc_info=result
+            )
+            continue
+        attachments.append(result)
+    return attachments
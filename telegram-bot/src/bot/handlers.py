@@ -3,7 +3,9 @@ from aiogram.filters import CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, ContentType, Message
 
+from ..services.ingestion import enqueue_preparation
 from .callbacks import DifficultyLevelCBData, MenuAction, MenuCBData
+from .files import download_documents
 from .fsm import CourseCreationForm
 from .keyboards import difficulty_level_kb, start_kb
 
@@ -64,7 +66,27 @@ async def process_duration(message: Message, state: FSMContext) -> None:
 async def process_files(
         message: Message, state: FSMContext, album_messages: list[Message] | None = None
 ) -> None:
-    ...
+    documents = [
+        album_message.document
+        for album_message in album_messages or [message]
+        if album_message.document is not None
+    ]
+    progress_message = await message.answer(f"⏳ Загружаю файлы: {len(documents)}...")
+    # Файлы уходят на конвертацию и эмбеддинг сразу после скачивания, не дожидаясь остальных
+    attachments = await download_documents(
+        message.bot, message.from_user.id, documents, on_downloaded=enqueue_preparation
+    )
+    data = await state.get_data()
+    await state.update_data(
+        attachments=[
+            *data.get("attachments", []), *(str(attachment.id) for attachment in attachments)
+        ]
+    )
+    await progress_message.edit_text(
+        f"✅ Загружено файлов: {len(attachments)} из {len(documents)}\n\n"
+        "🔗 Отправьте <b>ссылки</b> на внешние материалы:"
+    )
+    await state.set_state(CourseCreationForm.external_links)
 
 
 @router.message(CourseCreationForm.external_links)
@@ -0,0 +1,80 @@
+import html
+import logging
+import time
+from uuid import UUID
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import Message
+
+from ..core import enums, schemas
+from ..services.progress import watch
+from ..settings import settings
+
+logger = logging.getLogger(__name__)
+
+STAGE_TITLES: dict[enums.TaskStage, str] = {
+    enums.TaskStage.QUEUED: "⏳ Задача в очереди",
+    enums.TaskStage.CONVERTING: "📄 Обработка материалов",
+    enums.TaskStage.EMBEDDING: "🧮 Индексация материалов",
+    enums.TaskStage.PLANNING: "🗺️ Планирование структуры курса",
+    enums.TaskStage.DESIGNING: "🧩 Проектирование модулей",
+    enums.TaskStage.GENERATING: "✍️ Генерация контента",
+    enums.TaskStage.COMPLETED: "✅ Курс создан",
+    enums.TaskStage.FAILED: "❌ Не удалось создать курс",
+}
+# Сколько последних символов генерируемого блока показывать в сообщении
+CONTENT_PREVIEW_LENGTH = 600
+
+
+def format_content(content: schemas.ContentDelta) -> str:
+    """Хвост самого длинного текстового поля генерируемого блока"""
+
+    text = max(
+        (value for value in content.fields.values() if isinstance(value, str)),
+        key=len,
+        default="",
+    )
+    if len(text) > CONTENT_PREVIEW_LENGTH:
+        text = "…" + text[-CONTENT_PREVIEW_LENGTH:]
+    return f"<i>{html.escape(content.label)}</i>\n<blockquote>{html.escape(text)}</blockquote>"
+
+
+def format_progress(event: schemas.ProgressEvent) -> str:
+    lines = [f"<b>{STAGE_TITLES[event.stage]}</b>"]
+    if event.total:
+        lines.append(f"{event.current}/{event.total}")
+    if event.eta_seconds is not None:
+        lines.append(f"Осталось примерно {round(event.eta_seconds / 60) or 1} мин.")
+    if event.message:
+        lines.append(event.message)
+    if event.content is not None and event.content.fields:
+        lines.append(format_content(event.content))
+    return "\n".join(lines)
+
+
+async def track_progress(
+        message: Message, task_id: UUID, edit_interval: float = settings.progress.bot_edit_interval
+) -> None:
+    """Отображает прогресс задачи, редактируя сообщение бота.
+
+    Telegram ограничивает частоту редактирования, поэтому промежуточные события
+    применяются не чаще чем раз в `edit_interval` секунд, а финальное - всегда.
+    Во время генерации в сообщении появляется текст создаваемого блока.
+    """
+    edited_at, text = 0.0, message.html_text
+    async for event in watch(task_id):
+        now = time.monotonic()
+        if not event.is_final and now - edited_at < edit_interval:
+            continue
+        new_text = format_progress(event)
+        if new_text == text:
+            continue
+        try:
+            await message.edit_text(new_text)
+        except TelegramRetryAfter as e:
+            logger.warning("Progress message edit throttled for %s seconds", e.retry_after)
+            edited_at = now + e.retry_after
+            continue
+        except TelegramBadRequest as e:
+            logger.warning("Failed to edit progress message: %s", e.message)
+        edited_at, text = now, new_text
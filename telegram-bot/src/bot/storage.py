@@ -0,0 +1,267 @@
+from typing import Any, Protocol
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseStorage,
+    DefaultKeyBuilder,
+    KeyBuilder,
+    StateType,
+    StorageKey,
+)
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..database import models
+from ..database.base import sessionmaker
+from ..settings import FSMSettings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class FSMEntry:
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def is_empty(self) -> bool:
+        return self.state is None and not self.data
+
+
+class FSMEntryStore(Protocol):
+    """Постоянное хранилище записей FSM. Пустые записи удаляются"""
+
+    async def read(self, key: str) -> FSMEntry | None: ...
+
+    async def write_many(self, entries: Mapping[str, FSMEntry]) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class SQLiteEntryStore:
+    """Записи FSM в таблице `fsm_records` основной базы"""
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession] = sessionmaker) -> None:
+        self.session_factory = session_factory
+
+    async def read(self, key: str) -> FSMEntry | None:
+        async with self.session_factory() as session:
+            row = (await session.execute(
+                select(models.FSMRecord.state, models.FSMRecord.data)
+                .where(models.FSMRecord.key == key)
+            )).one_or_none()
+        return FSMEntry(state=row.state, data=row.data) if row is not None else None
+
+    async def write_many(self, entries: Mapping[str, FSMEntry]) -> None:
+        rows = [
+            {"key": key, "state": entry.state, "data": entry.data}
+            for key, entry in entries.items()
+            if not entry.is_empty
+        ]
+        empty_keys = [key for key, entry in entries.items() if entry.is_empty]
+        async with self.session_factory() as session, session.begin():
+            if rows:
+                stmt = sqlite_insert(models.FSMRecord)
+                await session.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[models.FSMRecord.key],
+                        set_={
+                            "state": stmt.excluded.state,
+                            "data": stmt.excluded.data,
+                            "updated_at": func.now(),
+                        },
+                    ),
+                    rows,
+                )
+            if empty_keys:
+                await session.execute(
+                    delete(models.FSMRecord).where(models.FSMRecord.key.in_(empty_keys))
+                )
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisEntryStore:
+    """Записи FSM в Redis или совместимом сервере, запись пачкой через pipeline.
+
+    :param redis: Клиент `redis.asyncio.Redis` (например `fakeredis` в тестах).
+    """
+
+    def __init__(self, redis: Any) -> None:
+        self.redis = redis
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisEntryStore":
+        try:
+            from redis.asyncio import Redis  # noqa: PLC0415
+        except ImportError as e:
+            raise RuntimeError(
+                "Redis FSM storage requires `redis` package, install `telegram-bot[redis]`"
+            ) from e
+        return cls(Redis.from_url(url))
+
+    async def read(self, key: str) -> FSMEntry | None:
+        value = await self.redis.get(key)
+        if value is None:
+            return None
+        entry = json.loads(value)
+        return FSMEntry(state=entry["state"], data=entry["data"])
+
+    async def write_many(self, entries: Mapping[str, FSMEntry]) -> None:
+        async with self.redis.pipeline(transaction=False) as pipeline:
+            for key, entry in entries.items():
+                if entry.is_empty:
+                    pipeline.delete(key)
+                else:
+                    pipeline.set(
+                        key,
+                        json.dumps({"state": entry.state, "data": entry.data}, ensure_ascii=False),
+                    )
+            await pipeline.execute()
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+
+class PersistentStorage(BaseStorage):
+    """FSM хранилище с локальным кэшем поверх постоянного хранилища записей.
+
+    Чтение и запись обслуживаются из LRU кэша процесса без обращения к базе.
+    Изменения сразу попадают в кэш (write-through), а в хранилище записываются
+    пачкой раз в `flush_interval`: несколько `update_data` одного сообщения
+    и изменения разных чатов за окно превращаются в одну транзакцию.
+    При остановке несохранённые изменения записываются в `close`.
+
+    :param store: Постоянное хранилище записей.
+    :param flush_interval: Окно накопления изменений, при 0 запись синхронная.
+    :param cache_size: Максимальное количество записей в кэше.
+    :param cache_ttl_seconds: Время жизни записи в кэше, ограничивает устаревание
+    при записи из другого процесса.
+    """
+
+    def __init__(
+            self,
+            store: FSMEntryStore,
+            flush_interval: float,
+            cache_size: int,
+            cache_ttl_seconds: float,
+            key_builder: KeyBuilder | None = None,
+    ) -> None:
+        self.store = store
+        self.flush_interval = flush_interval
+        self.cache_size = cache_size
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.key_builder = key_builder or DefaultKeyBuilder(
+            prefix="fsm", with_bot_id=True, with_destiny=True
+        )
+        self._cache: OrderedDict[str, tuple[float, FSMEntry]] = OrderedDict()
+        self._pending: dict[str, FSMEntry] = {}
+        self._flush_task: asyncio.Task[None] | None = None
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self.key_builder.build(key)
+        entry = await self._get_entry(storage_key)
+        await self._set_entry(
+            storage_key,
+            FSMEntry(state=state.state if isinstance(state, State) else state, data=entry.data),
+        )
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return (await self._get_entry(self.key_builder.build(key))).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            msg = f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            raise DataNotDictLikeError(msg)
+        storage_key = self.key_builder.build(key)
+        entry = await self._get_entry(storage_key)
+        # Копия через JSON отвязывает данные от вызывающего кода и сразу
+        # проверяет сериализуемость, а не при фоновой записи
+        await self._set_entry(
+            storage_key,
+            FSMEntry(state=entry.state, data=json.loads(json.dumps(data, ensure_ascii=False))),
+        )
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return (await self._get_entry(self.key_builder.build(key))).data.copy()
+
+    async def flush(self) -> None:
+        """Записывает накопленные изменения в хранилище"""
+
+        if not self._pending:
+            return
+        entries, self._pending = self._pending, {}
+        try:
+            await self.store.write_many(entries)
+        except Exception:
+            # Изменения, не перезаписанные за время записи, будут записаны следующей пачкой
+            self._pending = {**entries, **self._pending}
+            raise
+        logger.debug("Flushed %s FSM entries", len(entries))
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        await self.store.close()
+
+    async def _get_entry(self, key: str) -> FSMEntry:
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            self._cache.move_to_end(key)
+            return cached[1]
+        entry = self._pending.get(key) or await self.store.read(key) or FSMEntry()
+        self._cache_entry(key, entry)
+        return entry
+
+    async def _set_entry(self, key: str, entry: FSMEntry) -> None:
+        self._cache_entry(key, entry)
+        self._pending[key] = entry
+        if self.flush_interval <= 0:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    def _cache_entry(self, key: str, entry: FSMEntry) -> None:
+        self._cache[key] = (time.monotonic() + self.cache_ttl_seconds, entry)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self._flush_task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Error while flushing FSM entries, will retry")
+            if self._pending and self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush_later())
+
+
+def create_fsm_storage(fsm_settings: FSMSettings) -> BaseStorage:
+    if fsm_settings.backend == "memory":
+        return MemoryStorage()
+    store = (
+        RedisEntryStore.from_url(fsm_settings.redis_url)
+        if fsm_settings.backend == "redis" else SQLiteEntryStore()
+    )
+    return PersistentStorage(
+        store,
+        flush_interval=fsm_settings.flush_interval,
+        cache_size=fsm_settings.cache_size,
+        cache_ttl_seconds=fsm_settings.cache_ttl_seconds,
+    )
@@ -0,0 +1,158 @@
+from typing import Any
+
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from enum import StrEnum
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Message, Update
+from opentelemetry import context as otel_context
+from opentelemetry.context import Context
+
+from ..tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class EnqueueResult(StrEnum):
+    ACCEPTED = "accepted"
+    DUPLICATE = "duplicate"
+    QUEUE_FULL = "queue_full"
+
+
+class UpdateQueue:
+    """Очередь апдейтов вебхука, обрабатываемых пулом воркеров диспетчера.
+
+    Вебхук только кладёт апдейт в очередь и сразу отвечает Telegram, поэтому
+    медленные обработчики не задерживают ответ и не вызывают повторную доставку.
+
+    Апдейты одного чата обрабатываются строго по порядку поступления, разные
+    чаты - параллельно, но не больше `workers` одновременно. Повторно
+    доставленные апдейты отбрасываются по `update_id`. Сообщения альбома
+    (Telegram присылает каждый файл отдельным апдейтом) собираются здесь же
+    и передаются обработчику одним вызовом с `album_messages`, так как внутри
+    очереди чата они не могут ждать друг друга.
+
+    :param dispatcher: Диспетчер бота.
+    :param bot: Бот, от имени которого обрабатываются апдейты.
+    :param workers: Максимальное количество одновременно обрабатываемых апдейтов.
+    :param max_size: Максимальное количество ожидающих апдейтов.
+    :param dedupe_size: Сколько последних `update_id` помнить для отбрасывания повторов.
+    :param album_latency: Пауза между сообщениями альбома, после которой он считается полным.
+    """
+
+    def __init__(
+            self,
+            dispatcher: Dispatcher,
+            bot: Bot,
+            workers: int,
+            max_size: int,
+            dedupe_size: int,
+            album_latency: float,
+    ) -> None:
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.max_size = max_size
+        self.dedupe_size = dedupe_size
+        self.album_latency = album_latency
+        self._slots = asyncio.Semaphore(workers)
+        self._lanes: dict[Any, deque[tuple[Update, dict[str, Any], Context]]] = {}
+        self._lane_tasks: set[asyncio.Task[None]] = set()
+        self._albums: dict[str, list[Update]] = {}
+        self._album_timers: dict[str, asyncio.TimerHandle] = {}
+        self._seen: OrderedDict[int, None] = OrderedDict()
+        self._size = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def put(self, update: Update) -> EnqueueResult:
+        if update.update_id in self._seen:
+            return EnqueueResult.DUPLICATE
+        if self._size >= self.max_size:
+            # Апдейт не запоминается, Telegram доставит его повторно
+            return EnqueueResult.QUEUE_FULL
+        self._seen[update.update_id] = None
+        while len(self._seen) > self.dedupe_size:
+            self._seen.popitem(last=False)
+        self._size += 1
+        if isinstance(update.event, Message) and update.event.media_group_id is not None:
+            self._collect_album(update, update.event.media_group_id)
+        else:
+            self._append(update, {})
+        return EnqueueResult.ACCEPTED
+
+    async def stop(self, timeout: float) -> None:
+        """Дожидается обработки принятых апдейтов, но не дольше `timeout`"""
+
+        for media_group_id in list(self._album_timers):
+            self._release_album(media_group_id)
+        if self._lane_tasks:
+            _, pending = await asyncio.wait(self._lane_tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                logger.warning("%s chats were not processed before shutdown", len(pending))
+
+    def _collect_album(self, update: Update, media_group_id: str) -> None:
+        self._albums.setdefault(media_group_id, []).append(update)
+        timer = self._album_timers.pop(media_group_id, None)
+        if timer is not None:
+            timer.cancel()
+        self._album_timers[media_group_id] = asyncio.get_running_loop().call_later(
+            self.album_latency, self._release_album, media_group_id
+        )
+
+    def _release_album(self, media_group_id: str) -> None:
+        self._album_timers.pop(media_group_id).cancel()
+        updates = sorted(self._albums.pop(media_group_id), key=lambda update: update.update_id)
+        # Альбом обрабатывается одним вызовом, остальные апдейты только учитываются
+        self._size -= len(updates) - 1
+        self._append(updates[0], {"album_messages": [update.event for update in updates]})
+
+    def _append(self, update: Update, data: dict[str, Any]) -> None:
+        context = UserContextMiddleware.resolve_event_context(update)
+        lane_key = (
+            context.chat.id if context.chat is not None
+            else context.user.id if context.user is not None
+            else update.update_id
+        )
+        lane = self._lanes.get(lane_key)
+        if lane is None:
+            lane = self._lanes[lane_key] = deque()
+            task = asyncio.create_task(self._drain(lane_key, lane))
+            self._lane_tasks.add(task)
+            task.add_done_callback(self._lane_tasks.discard)
+        # Обработка продолжает трейс запроса вебхука, а не задачи очереди чата
+        lane.append((update, data, otel_context.get_current()))
+
+    async def _drain(
+            self, lane_key: Any, lane: deque[tuple[Update, dict[str, Any], Context]]
+    ) -> None:
+        try:
+            while lane:
+                update, data, trace_context = lane.popleft()
+                async with self._slots:
+                    await self._process(update, data, trace_context)
+                self._size -= 1
+        finally:
+            del self._lanes[lane_key]
+
+    async def _process(
+            self, update: Update, data: dict[str, Any], trace_context: Context
+    ) -> None:
+        try:
+            with tracer.start_as_current_span(
+                "telegram.update",
+                context=trace_context,
+                attributes={
+                    "telegram.update_id": update.update_id,
+                    "telegram.update_type": update.event_type,
+                },
+            ):
+                await self.dispatcher.feed_update(self.bot, update, **data)
+        except Exception:
+            logger.exception("Error while processing update %s", update.update_id)
@@ -14,6 +14,22 @@ class TaskStatus(StrEnum):
     FAILED = "failed"
 
 
+class TaskKind(StrEnum):
+    COURSE_CREATION = "course_creation"
+    ATTACHMENT_PREPARATION = "attachment_preparation"
+
+
+class TaskStage(StrEnum):
+    QUEUED = "queued"
+    CONVERTING = "converting"
+    EMBEDDING = "embedding"
+    PLANNING = "planning"
+    DESIGNING = "designing"
+    GENERATING = "generating"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
 class BlockType(StrEnum):
     TEXT = "text"
     VIDEO = "video"
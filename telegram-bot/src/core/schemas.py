@@ -15,7 +15,15 @@ from pydantic import (
 )
 
 from ..utils import current_datetime
-from .enums import AssessmentType, BlockType, DifficultyLevel, TaskStatus, UserRole
+from .enums import (
+    AssessmentType,
+    BlockType,
+    DifficultyLevel,
+    TaskKind,
+    TaskStage,
+    TaskStatus,
+    UserRole,
+)
 
 
 class User(BaseModel):
@@ -32,12 +40,32 @@ class File(BaseModel):
     uploaded_at: datetime
 
 
+class StoredFile(BaseModel):
+    """Результат потоковой записи файла в хранилище"""
+
+    key: str
+    size: NonNegativeInt
+    sha256: str
+    mime_type: str
+    deduplicated: bool = False
+
+
+class FileStat(BaseModel):
+    """Метаданные объекта в хранилище"""
+
+    size: NonNegativeInt
+    content_type: str | None = None
+    etag: str | None = None
+    modified_at: datetime | None = None
+
+
 class Attachment(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
     id: UUID = Field(default_factory=uuid4)
     original_filename: str
     filepath: str
+    sha256: str | None = None
     mime_type: str
     size: PositiveInt
     uploaded_at: datetime = Field(default_factory=current_datetime)
@@ -49,14 +77,56 @@ class Task(BaseModel):
     id: UUID = Field(default_factory=uuid4)
     created_at: datetime = Field(default_factory=current_datetime)
     updated_at: datetime = Field(default_factory=current_datetime)
+    kind: TaskKind = TaskKind.COURSE_CREATION
+    payload: dict[str, Any] = Field(default_factory=dict)
+    started_at: datetime | None = None
     finished_at: datetime | None = None
+    heartbeat_at: datetime | None = None
+    lease_expires_at: datetime | None = None
+    worker_id: str | None = None
+    attempts: NonNegativeInt = 0
+    error: str | None = None
+    progress: dict[str, Any] | None = None
     status: TaskStatus
     resource_id: UUID
 
 
+class ContentDelta(BaseModel):
+    """Частично сгенерированный контент блок.
+
+    `delta` - токены модели с предыдущего фрагмента, `fields` - все уже
+    валидные поля блока, поэтому для отображения достаточно последнего фрагмента.
+    """
+
+    label: str
+    block_type: BlockType
+    delta: str = ""
+    fields: dict[str, Any] = Field(default_factory=dict)
+    done: bool = False
+
+
+class ProgressEvent(BaseModel):
+    """Событие прогресса выполнения задачи"""
+
+    task_id: UUID
+    stage: TaskStage
+    current: NonNegativeInt = 0
+    total: NonNegativeInt = 0
+    message: str = ""
+    eta_seconds: float | None = None
+    content: ContentDelta | None = None
+    created_at: datetime = Field(default_factory=current_datetime)
+
+    @property
+    def is_final(self) -> bool:
+        return self.stage in {TaskStage.COMPLETED, TaskStage.FAILED}
+
+
 class Course(BaseModel):
     """Модель образовательного курса"""
 
+    model_config = ConfigDict(from_attributes=True)
+
     id: UUID = Field(default_factory=uuid4)
     created_at: datetime = Field(default_factory=current_datetime)
     title: str = Field(
@@ -74,6 +144,8 @@ class Course(BaseModel):
 
 
 class Module(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: UUID = Field(default_factory=uuid4, description="Не указывать, генерируется автоматически")
     title: str = Field(..., description="Название модуля")
     description: str = Field(
@@ -144,6 +216,8 @@ class ContentBlock(BaseModel):
      - type="reading": {"title": "Книга", "pages": "10-25", "link": "..."}
     """
 
+    model_config = ConfigDict(from_attributes=True)
+
     id: UUID = Field(default_factory=uuid4, description="Не указывать, генерируется автоматически")
     block_type: BlockType = Field(
         ..., description="Тип контент блока (строго из доступных enum)"
@@ -160,6 +234,8 @@ class ContentBlock(BaseModel):
 
 
 class Assessment(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: UUID = Field(default_factory=uuid4, description="Не указывать, генерируется автоматически")
     assessment_type: AssessmentType = Field(..., description="Тип ассессмента")
     title: str = Field(..., description="Название ассессмента")
@@ -175,6 +251,12 @@ class Assessment(BaseModel):
     )
 
 
+class CourseTree(Course):
+    """Курс вместе с модулями, их контент блоками и ассессментами"""
+
+    modules: list[Module] = Field(default_factory=list)
+
+
 class TeacherInputs(BaseModel):
     """Входные данные от преподавателя для создания курса"""
 
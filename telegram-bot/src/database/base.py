@@ -4,7 +4,7 @@ from collections.abc import AsyncIterator
 from datetime import datetime
 from uuid import UUID, uuid4
 
-from sqlalchemy import DateTime, func
+from sqlalchemy import DateTime, event, func
 from sqlalchemy.ext.asyncio import (
     AsyncAttrs,
     AsyncEngine,
@@ -14,11 +14,37 @@ from sqlalchemy.ext.asyncio import (
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
-from ..settings import settings
+from ..settings import SQLiteSettings, settings
+from ..tracing import instrument_sqlalchemy
 
-engine: Final[AsyncEngine] = create_async_engine(
-    url=settings.sqlite.sqlalchemy_url, echo=True
-)
+
+def create_sqlite_engine(sqlite_settings: SQLiteSettings) -> AsyncEngine:
+    """Создаёт движок SQLite с профилем производительности из настроек.
+
+    WAL позволяет читать параллельно с записью, а `busy_timeout` заставляет
+    конкурирующих писателей ждать блокировку вместо ошибки `database is locked`.
+    """
+    sqlite_engine = create_async_engine(
+        url=sqlite_settings.sqlalchemy_url,
+        echo=sqlite_settings.echo,
+        pool_size=sqlite_settings.pool_size,
+        max_overflow=sqlite_settings.max_overflow,
+        pool_timeout=sqlite_settings.pool_timeout,
+    )
+    pragmas = sqlite_settings.pragmas
+
+    @event.listens_for(sqlite_engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection, _) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    instrument_sqlalchemy(sqlite_engine.sync_engine, system="sqlite")
+    return sqlite_engine
+
+
+engine: Final[AsyncEngine] = create_sqlite_engine(settings.sqlite)
 sessionmaker: Final[async_sessionmaker[AsyncSession]] = async_sessionmaker(
     engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
 )
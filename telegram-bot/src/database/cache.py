@@ -0,0 +1,252 @@
+from typing import Any, Protocol
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from uuid import UUID
+
+from pydantic import BaseModel
+from sqlalchemy import select
+
+from ..settings import settings
+from . import crud, models
+from .base import Base, sessionmaker
+
+# Схема родителя включает дочерние записи (модуль - блоки и ассессменты),
+# поэтому запись дочерней строки инвалидирует и закэшированного родителя
+PARENTS: dict[type[Base], tuple[type[Base], str]] = {
+    models.ContentBlock: (models.Module, "module_id"),
+    models.Assessment: (models.Module, "module_id"),
+}
+
+
+class SharedCacheBackend(Protocol):
+    """Общий для нескольких процессов кэш сериализованных схем.
+
+    Все схемы одной записи хранятся под одним ключом, поэтому инвалидация
+    удаляет их одной операцией.
+    """
+
+    async def get(self, key: str, schema_name: str) -> bytes | None: ...
+
+    async def set(self, key: str, schema_name: str, value: bytes, ttl_seconds: float) -> None: ...
+
+    async def delete(self, *keys: str) -> None: ...
+
+
+class RedisCacheBackend:
+    """Общий кэш на Redis (или совместимом сервере, например Valkey/KeyDB)"""
+
+    def __init__(self, url: str) -> None:
+        try:
+            from redis.asyncio import Redis  # noqa: PLC0415
+        except ImportError as e:
+            raise RuntimeError(
+                "Shared read cache requires `redis` package, install `telegram-bot[redis]`"
+            ) from e
+        self._client = Redis.from_url(url)
+
+    async def get(self, key: str, schema_name: str) -> bytes | None:
+        return await self._client.hget(key, schema_name)
+
+    async def set(self, key: str, schema_name: str, value: bytes, ttl_seconds: float) -> None:
+        async with self._client.pipeline(transaction=True) as pipeline:
+            pipeline.hset(key, schema_name, value)
+            pipeline.expire(key, max(1, round(ttl_seconds)))
+            await pipeline.execute()
+
+    async def delete(self, *keys: str) -> None:
+        await self._client.delete(*keys)
+
+
+class LRUCache:
+    """Потокобезопасный LRU кэш с ограничением времени жизни записей.
+
+    Схемы одной записи хранятся вместе, вытесняются и инвалидируются целиком.
+
+    :param max_size: Максимальное количество записей.
+    :param ttl_seconds: Время жизни записи.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, dict[str, tuple[float, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, schema_name: str) -> Any | None:
+        with self._lock:
+            schemas = self._entries.get(key)
+            if schemas is None or schema_name not in schemas:
+                return None
+            expires_at, value = schemas[schema_name]
+            if expires_at < time.monotonic():
+                del schemas[schema_name]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, schema_name: str, value: Any) -> None:
+        with self._lock:
+            schemas = self._entries.setdefault(key, {})
+            schemas[schema_name] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ReadThroughCache:
+    """Read-through кэш провалидированных схем поверх `crud`.
+
+    Сначала проверяется локальный LRU (без SQL и без валидации Pydantic), затем
+    общий кэш (только разбор JSON), и лишь затем выполняется загрузка из БД.
+    Закэшированные схемы разделяются между вызовами, их нельзя изменять на месте.
+
+    :param local: Локальный LRU кэш процесса.
+    :param shared: Необязательный общий кэш для нескольких процессов.
+    """
+
+    def __init__(self, local: LRUCache, shared: SharedCacheBackend | None = None) -> None:
+        self.local = local
+        self.shared = shared
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls) -> "ReadThroughCache":
+        return cls(
+            local=LRUCache(settings.read_cache.max_size, settings.read_cache.ttl_seconds),
+            shared=(
+                RedisCacheBackend(settings.read_cache.redis_url)
+                if settings.read_cache.redis_url else None
+            ),
+        )
+
+    @staticmethod
+    def key(model_class: type[Base], id: UUID) -> str:  # noqa: A002
+        return f"{model_class.__tablename__}:{id}"
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.shared_hits + self.misses
+        return (self.hits + self.shared_hits) / total if total else 0.0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hit_ratio, 4),
+            "size": len(self.local),
+        }
+
+    async def get[SchemaT: BaseModel](
+            self,
+            model_class: type[Base],
+            id: UUID,  # noqa: A002
+            schema_class: type[SchemaT],
+            loader: Callable[[], Awaitable[SchemaT | None]],
+    ) -> SchemaT | None:
+        if not settings.read_cache.enabled:
+            return await loader()
+        key, schema_name = self.key(model_class, id), schema_class.__name__
+        schema = self.local.get(key, schema_name)
+        if schema is not None:
+            self.hits += 1
+            return schema
+        if self.shared is not None:
+            value = await self.shared.get(key, schema_name)
+            if value is not None:
+                self.shared_hits += 1
+                schema = schema_class.model_validate_json(value)
+                self.local.set(key, schema_name, schema)
+                return schema
+        self.misses += 1
+        schema = await loader()
+        # Отсутствующие записи не кэшируются, чтобы не скрывать последующую вставку
+        if schema is not None:
+            self.local.set(key, schema_name, schema)
+            if self.shared is not None:
+                await self.shared.set(
+                    key, schema_name, schema.model_dump_json().encode(), self.local.ttl_seconds
+                )
+        return schema
+
+    async def invalidate(self, model_class: type[Base], *ids: UUID) -> None:
+        keys = [self.key(model_class, record_id) for record_id in ids]
+        for key in keys:
+            self.local.delete(key)
+        if self.shared is not None and keys:
+            await self.shared.delete(*keys)
+
+
+read_cache = ReadThroughCache.from_settings()
+
+
+async def read[SchemaT: BaseModel, ModelT: Base](
+        id: UUID, *, model_class: type[ModelT], schema_class: type[SchemaT]  # noqa: A002
+) -> SchemaT | None:
+    return await read_cache.get(
+        model_class,
+        id,
+        schema_class,
+        lambda: crud.read(id, model_class=model_class, schema_class=schema_class),
+    )
+
+
+async def _parent_ids(model_class: type[Base], ids: list[UUID]) -> set[UUID]:
+    if model_class not in PARENTS or not ids:
+        return set()
+    column = getattr(model_class, PARENTS[model_class][1])
+    async with sessionmaker() as session:
+        return set(await session.scalars(select(column).where(model_class.id.in_(ids))))
+
+
+async def _invalidate(model_class: type[Base], ids: list[UUID], parent_ids: set[UUID]) -> None:
+    await read_cache.invalidate(model_class, *ids)
+    if parent_ids:
+        await read_cache.invalidate(PARENTS[model_class][0], *parent_ids)
+
+
+async def refresh[SchemaT: BaseModel, ModelT: Base](
+        id: UUID, *, model_class: type[ModelT], schema_class: type[SchemaT], **kwargs: Any  # noqa: A002
+) -> SchemaT:
+    # Родитель до записи и после неё: строка может перейти к другому родителю
+    parent_ids = await _parent_ids(model_class, [id])
+    schema = await crud.refresh(id, model_class=model_class, schema_class=schema_class, **kwargs)
+    parent_ids |= await _parent_ids(model_class, [id])
+    await _invalidate(model_class, [id], parent_ids)
+    return schema
+
+
+async def remove[ModelT: Base](id: UUID, *, model_class: type[ModelT]) -> None:  # noqa: A002
+    parent_ids = await _parent_ids(model_class, [id])
+    await crud.remove(id, model_class=model_class)
+    await _invalidate(model_class, [id], parent_ids)
+
+
+async def upsert_many[SchemaT: BaseModel, ModelT: Base](
+        schemas: list[crud.Row], *, model_class: type[ModelT], schema_class: type[SchemaT]
+) -> list[SchemaT]:
+    parent_ids: set[UUID] = set()
+    if model_class in PARENTS:
+        rows = [crud.to_row(schema, model_class) for schema in schemas]
+        parent_ids = await _parent_ids(model_class, [row["id"] for row in rows if "id" in row])
+    result = await crud.upsert_many(schemas, model_class=model_class, schema_class=schema_class)
+    ids = [schema.id for schema in result]
+    parent_ids |= await _parent_ids(model_class, ids)
+    await _invalidate(model_class, ids, parent_ids)
+    return result
@@ -1,53 +1,183 @@
-from typing import TypeVar
+from typing import Any, TypeVar
 
+from collections.abc import AsyncIterator, Iterable, Mapping
+from contextlib import asynccontextmanager
 from uuid import UUID
 
 from pydantic import BaseModel
-from sqlalchemy import delete, insert, select, update
+from sqlalchemy import JSON, delete, func, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .base import Base, sessionmaker
 
 SchemaT = TypeVar("SchemaT", bound=BaseModel)
 ModelT = TypeVar("ModelT", bound=Base)
 
+Row = BaseModel | Mapping[str, Any]
 
-async def create[SchemaT: BaseModel, ModelT: Base](
-        schema: SchemaT, *, model_class: type[ModelT]
+# Колонки, которые не перезаписываются при upsert
+IMMUTABLE_COLUMNS = frozenset({"id", "created_at"})
+
+
+def to_row[ModelT: Base](schema: Row, model_class: type[ModelT], **values: Any) -> dict[str, Any]:
+    """Преобразует схему в строку таблицы модели.
+
+    Поля схемы, которых нет в таблице, отбрасываются, JSON колонки сериализуются
+    в JSON-совместимые значения.
+
+    :param schema: Pydantic схема или готовая строка.
+    :param model_class: Класс ORM модели.
+    :param values: Дополнительные значения колонок (например, внешние ключи).
+    """
+    if isinstance(schema, Mapping):
+        return {**schema, **values}
+    columns = model_class.__table__.columns
+    json_columns = {column.key for column in columns if isinstance(column.type, JSON)}
+    fields = columns.keys() & type(schema).model_fields.keys()
+    row = schema.model_dump(include=fields - json_columns)
+    if fields & json_columns:
+        row |= schema.model_dump(mode="json", include=fields & json_columns)
+    return row | values
+
+
+@asynccontextmanager
+async def unit_of_work() -> AsyncIterator[AsyncSession]:
+    """Единица работы для составных записей.
+
+    Все операции, которым передана сессия, выполняются в одной транзакции:
+    она фиксируется при выходе из блока и откатывается при исключении.
+    """
+    async with sessionmaker() as session, session.begin():
+        yield session
+
+
+@asynccontextmanager
+async def _session(session: AsyncSession | None) -> AsyncIterator[AsyncSession]:
+    if session is not None:
+        # Фиксацией управляет владелец сессии (unit_of_work)
+        yield session
+        return
+    async with unit_of_work() as new_session:
+        yield new_session
+
+
+async def create[ModelT: Base](
+        schema: Row, *, model_class: type[ModelT], session: AsyncSession | None = None
 ) -> None:
-    async with sessionmaker() as session:
-        stmt = insert(model_class).values(**schema.model_dump())
-        await session.execute(stmt)
-        await session.commit()
+    async with _session(session) as active_session:
+        stmt = insert(model_class).values(**to_row(schema, model_class))
+        await active_session.execute(stmt)
+
+
+async def create_many[ModelT: Base](
+        schemas: Iterable[Row], *, model_class: type[ModelT], session: AsyncSession | None = None
+) -> int:
+    """Вставляет строки одним executemany в одной транзакции.
+
+    :return Количество вставленных строк.
+    """
+    rows = [to_row(schema, model_class) for schema in schemas]
+    if not rows:
+        return 0
+    async with _session(session) as active_session:
+        await active_session.execute(insert(model_class), rows)
+    return len(rows)
 
 
 async def read[SchemaT: BaseModel, ModelT: Base](
-        id: UUID, *, model_class: type[ModelT], schema_class: type[SchemaT]  # noqa: A002
+        id: UUID,  # noqa: A002
+        *,
+        model_class: type[ModelT],
+        schema_class: type[SchemaT],
+        session: AsyncSession | None = None,
 ) -> SchemaT | None:
-    async with sessionmaker() as session:
+    async with _session(session) as active_session:
         stmt = select(model_class).where(model_class.id == id)
-        result = await session.execute(stmt)
+        result = await active_session.execute(stmt)
         model = result.scalar_one_or_none()
     return schema_class.model_validate(model) if model is not None else None
 
 
+async def read_many[SchemaT: BaseModel, ModelT: Base](
+        ids: Iterable[UUID],
+        *,
+        model_class: type[ModelT],
+        schema_class: type[SchemaT],
+        session: AsyncSession | None = None,
+) -> list[SchemaT]:
+    """Читает записи по списку идентификаторов одним запросом.
+
+    :return Найденные записи в порядке переданных идентификаторов
+     (отсутствующие пропускаются).
+    """
+    ids = list(ids)
+    if not ids:
+        return []
+    async with _session(session) as active_session:
+        stmt = select(model_class).where(model_class.id.in_(ids))
+        models = {model.id: model for model in await active_session.scalars(stmt)}
+    return [
+        schema_class.model_validate(models[model_id]) for model_id in ids if model_id in models
+    ]
+
+
+async def upsert_many[SchemaT: BaseModel, ModelT: Base](
+        schemas: Iterable[Row],
+        *,
+        model_class: type[ModelT],
+        schema_class: type[SchemaT],
+        session: AsyncSession | None = None,
+) -> list[SchemaT]:
+    """Вставляет или обновляет (по `id`) строки в одной транзакции.
+
+    Используется `INSERT ... ON CONFLICT DO UPDATE ... RETURNING`, поэтому
+    актуальное состояние записей возвращается без дополнительного запроса.
+    """
+    rows = [to_row(schema, model_class) for schema in schemas]
+    if not rows:
+        return []
+    stmt = sqlite_insert(model_class)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[model_class.id],
+        set_={
+            **{
+                column: stmt.excluded[column]
+                for column in rows[0].keys() - IMMUTABLE_COLUMNS
+            },
+            "updated_at": func.now(),
+        },
+    ).returning(model_class)
+    async with _session(session) as active_session:
+        models = await active_session.scalars(
+            stmt, rows, execution_options={"populate_existing": True}
+        )
+        return [schema_class.model_validate(model) for model in models]
+
+
 async def refresh[SchemaT: BaseModel, ModelT: Base](
-        id: UUID, *, model_class: type[ModelT], schema_class: type[SchemaT], **kwargs  # noqa: A002
+        id: UUID,  # noqa: A002
+        *,
+        model_class: type[ModelT],
+        schema_class: type[SchemaT],
+        session: AsyncSession | None = None,
+        **kwargs: Any,
 ) -> SchemaT:
-    async with sessionmaker() as session:
+    async with _session(session) as active_session:
         stmt = (
             update(model_class)
             .where(model_class.id == id)
             .values(**kwargs)
             .returning(model_class)
         )
-        result = await session.execute(stmt)
-        await session.commit()
+        result = await active_session.execute(stmt)
         model = result.scalar_one_or_none()
     return schema_class.model_validate(model) if model is not None else None
 
 
-async def remove[ModelT: Base](id: UUID, *, model_class: type[ModelT]) -> None:  # noqa: A002
-    async with sessionmaker() as session:
+async def remove[ModelT: Base](
+        id: UUID, *, model_class: type[ModelT], session: AsyncSession | None = None  # noqa: A002
+) -> None:
+    async with _session(session) as active_session:
         stmt = delete(model_class).where(model_class.id == id)
-        await session.execute(stmt)
-        await session.commit()
+        await active_session.execute(stmt)
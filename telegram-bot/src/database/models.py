@@ -3,7 +3,7 @@ from typing import Any
 from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy import JSON, BigInteger, DateTime, ForeignKey, Text
+from sqlalchemy import JSON, BigInteger, DateTime, ForeignKey, Index, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -11,17 +11,33 @@ from .base import Base
 
 class Task(Base):
     __tablename__ = "tasks"
+    # Выборка задач очереди по статусу в порядке постановки
+    __table_args__ = (Index("ix_tasks_status_created_at", "status", "created_at"),)
 
+    kind: Mapped[str] = mapped_column(server_default="course_creation")
+    payload: Mapped[dict[str, Any]] = mapped_column(JSON, default=dict, server_default="{}")
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    lease_expires_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    worker_id: Mapped[str | None] = mapped_column(nullable=True)
+    attempts: Mapped[int] = mapped_column(server_default="0")
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    progress: Mapped[dict[str, Any] | None] = mapped_column(JSON, nullable=True)
     status: Mapped[str]
-    resource_id: Mapped[UUID]
+    resource_id: Mapped[UUID] = mapped_column(index=True)
 
 
 class Attachment(Base):
     __tablename__ = "attachments"
 
     original_filename: Mapped[str]
-    filepath: Mapped[str] = mapped_column(unique=True)
+    # Ключ файла в хранилище. Файлы с одинаковым содержимым хранятся один раз,
+    # поэтому ключ может повторяться
+    filepath: Mapped[str]
+    sha256: Mapped[str | None] = mapped_column(index=True, nullable=True)
     mime_type: Mapped[str]
     size: Mapped[int]
     uploaded_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
@@ -35,30 +51,65 @@ class Course(Base):
     discipline: Mapped[str]
     creator_id: Mapped[int] = mapped_column(BigInteger)
 
-    modules: Mapped[list["Module"]] = relationship(back_populates="course")
+    modules: Mapped[list["Module"]] = relationship(
+        back_populates="course", order_by="Module.order"
+    )
 
 
 class Module(Base):
     __tablename__ = "modules"
 
-    course_id: Mapped[UUID] = mapped_column(ForeignKey("courses.id"), unique=False)
+    course_id: Mapped[UUID] = mapped_column(
+        ForeignKey("courses.id"), unique=False, index=True
+    )
     title: Mapped[str]
     description: Mapped[str] = mapped_column(Text)
     order: Mapped[int]
-    content_blocks: Mapped[dict[str, Any]] = mapped_column(JSON)
     dependencies: Mapped[list[UUID]] = mapped_column(JSON)
 
     course: Mapped["Course"] = relationship(back_populates="modules")
-    assessments: Mapped[list["Assessment"]] = relationship(back_populates="module")
+    # Схема модуля включает блоки и ассессменты, поэтому они загружаются вместе с ним:
+    # ленивая загрузка после закрытия сессии в `crud.read`/`crud.refresh` невозможна
+    content_blocks: Mapped[list["ContentBlock"]] = relationship(
+        back_populates="module", order_by="ContentBlock.position", lazy="selectin"
+    )
+    assessments: Mapped[list["Assessment"]] = relationship(
+        back_populates="module", lazy="selectin"
+    )
+
+
+class ContentBlock(Base):
+    __tablename__ = "content_blocks"
+    __table_args__ = (
+        Index("ix_content_blocks_module_id_position", "module_id", "position", unique=True),
+    )
+
+    module_id: Mapped[UUID] = mapped_column(ForeignKey("modules.id"))
+    position: Mapped[int]
+    block_type: Mapped[str]
+    data: Mapped[dict[str, Any]] = mapped_column(JSON)
+
+    module: Mapped["Module"] = relationship(back_populates="content_blocks")
 
 
 class Assessment(Base):
     __tablename__ = "assessments"
 
-    module_id: Mapped[UUID] = mapped_column(ForeignKey("modules.id"), unique=False)
+    module_id: Mapped[UUID] = mapped_column(
+        ForeignKey("modules.id"), unique=False, index=True
+    )
     assessment_type: Mapped[str]
     title: Mapped[str]
     description: Mapped[str] = mapped_column(Text)
     verification_rules: Mapped[dict[str, Any]] = mapped_column(JSON)
 
     module: Mapped["Module"] = relationship(back_populates="assessments")
+
+
+# Состояние и данные FSM бота для ключа, построенного из бота, чата и пользователя
+class FSMRecord(Base):
+    __tablename__ = "fsm_records"
+
+    key: Mapped[str] = mapped_column(unique=True)
+    state: Mapped[str | None] = mapped_column(nullable=True)
+    data: Mapped[dict[str, Any]] = mapped_column(JSON, default=dict, server_default="{}")
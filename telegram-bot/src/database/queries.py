@@ -0,0 +1,52 @@
+from collections.abc import Iterable
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from ..core import schemas
+from . import models
+from .base import sessionmaker
+
+# Модули, их блоки и ассессменты загружаются отдельными IN-запросами,
+# поэтому дерево любого количества курсов читается за 4 запроса
+COURSE_TREE_OPTIONS = (
+    selectinload(models.Course.modules).selectinload(models.Module.content_blocks),
+    selectinload(models.Course.modules).selectinload(models.Module.assessments),
+)
+
+
+async def read_course_tree(course_id: UUID) -> schemas.CourseTree | None:
+    """Загружает курс с модулями, контент блоками и ассессментами"""
+
+    async with sessionmaker() as session:
+        stmt = select(models.Course).where(models.Course.id == course_id).options(
+            *COURSE_TREE_OPTIONS
+        )
+        course = await session.scalar(stmt)
+        return schemas.CourseTree.model_validate(course) if course is not None else None
+
+
+async def read_course_trees(course_ids: Iterable[UUID]) -> list[schemas.CourseTree]:
+    """Загружает деревья нескольких курсов за постоянное количество запросов"""
+
+    course_ids = list(course_ids)
+    if not course_ids:
+        return []
+    async with sessionmaker() as session:
+        stmt = select(models.Course).where(models.Course.id.in_(course_ids)).options(
+            *COURSE_TREE_OPTIONS
+        )
+        courses = await session.scalars(stmt)
+        return [schemas.CourseTree.model_validate(course) for course in courses]
+
+
+async def read_module(module_id: UUID) -> schemas.Module | None:
+    """Загружает модуль с контент блоками и ассессментами"""
+
+    async with sessionmaker() as session:
+        stmt = select(models.Module).where(models.Module.id == module_id).options(
+            selectinload(models.Module.content_blocks), selectinload(models.Module.assessments)
+        )
+        module = await session.scalar(stmt)
+        return schemas.Module.model_validate(module) if module is not None else None
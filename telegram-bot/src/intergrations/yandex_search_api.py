@@ -8,8 +8,10 @@ import time
 import xml.etree.ElementTree as ET  # noqa: S405
 
 import aiohttp
+from opentelemetry import trace
 
 from ..settings import settings
+from ..tracing import traced
 
 BASE_URL = "https://searchapi.api.cloud.yandex.net/v2/"
 OPERATIONS_URL = "https://operation.api.cloud.yandex.net/operations/"
@@ -143,6 +145,7 @@ async def _get_search_results(operation_id: str) -> list[dict[str, Any]]:
     return _parse_xml_response(xml_content)
 
 
+@traced("yandex_search.search_async")
 async def search_async(query: str, interval: int = 1, max_wait: int = 300) -> list[dict[str, Any]]:
     headers = {
         "Authorization": f"Api-Key {settings.yandexcloud.apikey}",
@@ -155,10 +158,15 @@ async def search_async(query: str, interval: int = 1, max_wait: int = 300) -> li
         data = await response.json()
         operation_id = data["id"]
 
-    start_time = time.time()
+    span = trace.get_current_span()
+    span.set_attribute("yandex_search.operation_id", operation_id)
+    start_time, polls = time.time(), 0
     while time.time() - start_time < max_wait:
         status = await _check_operation_status(operation_id)
+        polls += 1
         if status.get("done", False):
+            span.set_attribute("yandex_search.polls", polls)
             return await _get_search_results(operation_id)
         await asyncio.sleep(interval)
+    span.set_attribute("yandex_search.polls", polls)
     raise YandexSearchTimeoutError(f"Timeout waiting for search results after {max_wait} seconds")
@@ -1,22 +1,31 @@
 from typing import Any
 
+import asyncio
+import json
 import logging
 import time
-from collections.abc import Iterable, Mapping
-from pathlib import Path
+from collections.abc import Callable, Mapping
+from functools import cache
 from uuid import UUID
+from weakref import WeakValueDictionary
 
+import numpy as np
 from elasticsearch import Elasticsearch
 from elasticsearch.helpers import bulk
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_elasticsearch import ElasticsearchRetriever
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-from ..core import schemas
+from ..core import enums, schemas
 from ..database import crud, models
-from ..settings import settings
+from ..settings import PROJECT_ROOT, VectorIndexSettings, settings
+from ..storage import local_copy
+from ..tracing import traced, tracer
 from ..utils import convert_document_to_md
+from .embeddings import create_embeddings
+from .embeddings_service import EmbeddingsClient
+from .vector_index import META_KEY, knn_retriever, vector_fields, vector_mappings
 
 logger = logging.getLogger(__name__)
 
@@ -25,18 +34,45 @@ DENSE_VECTOR_FIELD = "embedding"
 NUM_CHARACTERS_FIELD = "num_characters"
 METADATA_FIELD = "metadata"
 TOP_K = 10
+KNN_K = 5
+KNN_NUM_CANDIDATES = 10
+# Результаты конвертации и эмбеддинга документов по sha256 содержимого
+MARKDOWN_CACHE_DIR = PROJECT_ROOT / ".tmp" / "markdown"
+CHUNKS_CACHE_DIR = PROJECT_ROOT / ".tmp" / "chunks"
 
 es_client = Elasticsearch(hosts=[settings.elasticsearch.url])
 
-embeddings = HuggingFaceEmbeddings(
-    model_name="deepvk/USER-bge-m3",
-    model_kwargs={"device": "cpu"},
-    encode_kwargs={"normalize_embeddings": False}
-)
+
+@cache
+def get_embeddings() -> Embeddings:
+    """Модель эмбеддингов, загружается при первом обращении (не при импорте агентов).
+
+    Если задан адрес сервиса эмбеддингов, модель не загружается в процесс,
+    а запросы отправляются сервису.
+    """
+
+    if settings.embeddings.service_url is not None:
+        return EmbeddingsClient(
+            settings.embeddings.service_url, timeout=settings.embeddings.service_timeout
+        )
+    return create_embeddings(settings.embeddings)
+
+
+splitter = RecursiveCharacterTextSplitter(chunk_size=1200, chunk_overlap=50, length_function=len)
+
+# Режимы хранения векторов уже созданных индексов
+_index_vector_settings: dict[str, VectorIndexSettings] = {}
+
+# Не даёт задачам предобработки и создания курса одного воркера одновременно
+# обрабатывать один файл.
+# Блокировка живёт, пока её держат или ждут, поэтому словарь не растёт с каждым файлом
+_prepare_locks: WeakValueDictionary[str, asyncio.Lock] = WeakValueDictionary()
 
 
 def _create_index_if_not_exists(
         index_name: str,
+        dims: int,
+        index_settings: VectorIndexSettings,
         text_field: str = TEXT_FIELD,
         dense_vector_field: str = DENSE_VECTOR_FIELD,
         num_characters_field: str = NUM_CHARACTERS_FIELD,
@@ -47,9 +83,10 @@ def _create_index_if_not_exists(
     es_client.indices.create(
         index=index_name,
         mappings={
+            "_meta": {META_KEY: index_settings.model_dump(include={"mode", "truncated_dims"})},
             "properties": {
                 text_field: {"type": "text"},
-                dense_vector_field: {"type": "dense_vector"},
+                **vector_mappings(dense_vector_field, dims, index_settings),
                 num_characters_field: {"type": "integer"},
                 metadata_field: {"type": "object"},
             }
@@ -57,41 +94,156 @@ def _create_index_if_not_exists(
     )
 
 
+def _vector_settings(index_name: str) -> VectorIndexSettings:
+    """Режим хранения векторов, с которым создан индекс.
+
+    Индексы, созданные до появления режимов, хранят только полные векторы
+    (HNSW с int8 квантованием по умолчанию Elasticsearch).
+    """
+
+    if index_name in _index_vector_settings:
+        return _index_vector_settings[index_name]
+    if not es_client.indices.exists(index=index_name):
+        return settings.vector_index
+    mappings = es_client.indices.get_mapping(index=index_name)[index_name]["mappings"]
+    index_settings = settings.vector_index.model_copy(
+        update=mappings.get("_meta", {}).get(META_KEY, {"mode": "int8"})
+    )
+    # Режим индекса не меняется после создания
+    _index_vector_settings[index_name] = index_settings
+    return index_settings
+
+
 def _index_data(
         index_name: str,
         text_field: str,
         dense_vector_field: str,
         num_characters_field: str,
-        texts: Iterable[str],
+        texts: list[str],
+        vectors: list[list[float]],
         metadata: dict[str, Any],
+        content_key: str,
         refresh: bool = True,
 ) -> None:
+    if not vectors:
+        return
+    index_settings = _vector_settings(index_name)
     _create_index_if_not_exists(
         index_name=index_name,
+        dims=len(vectors[0]),
+        index_settings=index_settings,
         text_field=text_field,
         dense_vector_field=dense_vector_field,
         num_characters_field=num_characters_field
     )
-    vectors = embeddings.embed_documents(list(texts))
     requests = [
         {
             "_op_type": "index",
             "_index": index_name,
-            "_id": i,
+            "_id": f"{content_key}:{i}",
             text_field: text,
-            dense_vector_field: vector,
+            **fields,
             num_characters_field: len(text),
             METADATA_FIELD: metadata,
         }
-        for i, (text, vector) in enumerate(zip(texts, vectors, strict=False))
+        for i, (text, fields) in enumerate(
+            zip(texts, vector_fields(dense_vector_field, vectors, index_settings), strict=False)
+        )
     ]
     bulk(es_client, requests)
     if refresh:
         es_client.indices.refresh(index=index_name)
 
 
-def _hybrid_query(search_query: str) -> dict[str, Any]:
-    vector = embeddings.embed_query(search_query)
+def _is_indexed(index_name: str, content_key: str) -> bool:
+    return bool(
+        es_client.indices.exists(index=index_name)
+        and es_client.exists(index=index_name, id=f"{content_key}:0")
+    )
+
+
+async def _convert_to_md(attachment: schemas.Attachment) -> str:
+    """Конвертирует вложение в Markdown, переиспользуя результат для того же содержимого"""
+
+    cache_path = (
+        MARKDOWN_CACHE_DIR / f"{attachment.sha256}.md" if attachment.sha256 is not None else None
+    )
+    if cache_path is not None and cache_path.exists():
+        return await asyncio.to_thread(cache_path.read_text, encoding="utf-8")
+    # Конвертация нагружает CPU, поэтому выполняется вне event loop
+    async with local_copy(attachment.filepath) as path:
+        with tracer.start_as_current_span(
+            "markitdown.convert", attributes={"file.mime_type": attachment.mime_type}
+        ) as span:
+            md_text = await asyncio.to_thread(convert_document_to_md, path)
+            span.set_attribute("markitdown.characters", len(md_text))
+    if cache_path is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(cache_path.write_text, md_text, encoding="utf-8")
+    return md_text
+
+
+def _load_chunks(sha256: str) -> tuple[list[str], list[list[float]]] | None:
+    texts_path = CHUNKS_CACHE_DIR / f"{sha256}.json"
+    vectors_path = CHUNKS_CACHE_DIR / f"{sha256}.npy"
+    if not (texts_path.exists() and vectors_path.exists()):
+        return None
+    texts = json.loads(texts_path.read_text(encoding="utf-8"))
+    return texts, np.load(vectors_path).tolist()
+
+
+def _save_chunks(sha256: str, texts: list[str], vectors: list[list[float]]) -> None:
+    CHUNKS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # Векторы пишутся первыми: без файла с текстами кэш не считается заполненным
+    np.save(CHUNKS_CACHE_DIR / f"{sha256}.npy", np.asarray(vectors, dtype=np.float32))
+    (CHUNKS_CACHE_DIR / f"{sha256}.json").write_text(
+        json.dumps(texts, ensure_ascii=False), encoding="utf-8"
+    )
+
+
+async def prepare_attachment(
+        attachment: schemas.Attachment,
+        on_stage: Callable[[enums.TaskStage], None] | None = None,
+) -> tuple[list[str], list[list[float]]]:
+    """Конвертирует вложение в Markdown, разбивает на чанки и считает их эмбеддинги.
+
+    Результат кэшируется по sha256 содержимого, поэтому файл, заранее
+    обработанный задачей предобработки, при создании курса только записывается в индекс.
+
+    :return: Тексты чанков и их векторы.
+    """
+    content_key = attachment.sha256 or str(attachment.id)
+    lock = _prepare_locks.get(content_key)
+    if lock is None:
+        lock = _prepare_locks[content_key] = asyncio.Lock()
+    async with lock:
+        if attachment.sha256 is not None:
+            cached = await asyncio.to_thread(_load_chunks, attachment.sha256)
+            if cached is not None:
+                return cached
+        if on_stage is not None:
+            on_stage(enums.TaskStage.CONVERTING)
+        md_text = await _convert_to_md(attachment)
+        logger.info(
+            "File %s loaded and converted to Markdown, characters length: %s",
+            attachment.original_filename, len(md_text)
+        )
+        texts = splitter.split_text(md_text)
+        if on_stage is not None:
+            on_stage(enums.TaskStage.EMBEDDING)
+        # Эмбеддинги нагружают CPU, поэтому считаются вне event loop
+        with tracer.start_as_current_span(
+            "embeddings.embed_documents", attributes={"embeddings.texts": len(texts)}
+        ):
+            vectors = await asyncio.to_thread(get_embeddings().embed_documents, texts)
+        if attachment.sha256 is not None:
+            await asyncio.to_thread(_save_chunks, attachment.sha256, texts, vectors)
+    return texts, vectors
+
+
+def _hybrid_query(
+        search_query: str, vector: list[float], index_settings: VectorIndexSettings
+) -> dict[str, Any]:
     return {
         "retriever": {
             "rrf": {
@@ -101,15 +253,13 @@ def _hybrid_query(search_query: str) -> dict[str, Any]:
                             "query": {"match": {TEXT_FIELD: search_query}}
                         }
                     },
-                    {
-                        "knn":
-                            {
-                                "field": DENSE_VECTOR_FIELD,
-                                "query_vector": vector,
-                                "k": 5,
-                                "num_candidates": 10,
-                             }
-                    }
+                    knn_retriever(
+                        DENSE_VECTOR_FIELD,
+                        vector,
+                        index_settings,
+                        k=KNN_K,
+                        num_candidates=KNN_NUM_CANDIDATES,
+                    ),
                 ]
             }
         }
@@ -123,56 +273,72 @@ def _document_mapper(hit: Mapping[str, Any]) -> Document:
     return Document(page_content=hit["_source"][TEXT_FIELD], metadata=metadata)
 
 
-async def index_attachments(course_id: UUID, attachment_ids: list[UUID]) -> None:
+@traced("rag.index_attachments")
+async def index_attachments(
+        course_id: UUID,
+        attachment_ids: list[UUID],
+        on_progress: Callable[[enums.TaskStage, int, int], None] | None = None,
+) -> None:
     index_name = f"attached-materials-{course_id}"
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1200,
-        chunk_overlap=50,
-        length_function=len
-    )
     for i, attachment_id in enumerate(attachment_ids):
-        start_time = time.time()
-        logger.info(
-            "Start `%s` file processing %s/%s, start time - %s",
-            attachment_id, i, len(attachment_ids), start_time
-        )
-        attachment = await crud.read(
-            attachment_id, model_class=models.Attachment, schema_class=schemas.Attachment
-        )
-        if attachment is None:
-            logger.warning("File %s not attached or was removed, skip this", attachment_id)
-            continue
-        md_text = convert_document_to_md(Path(attachment.filepath))
-        logger.info(
-            "File %s loaded and converted to Markdown, characters length: %s",
-            attachment.original_filename, len(md_text)
-        )
-        chunks = splitter.split_text(md_text)
-        logger.info("Addition %s chunks to %s", len(chunks), index_name)
-        _index_data(
-            index_name=index_name,
-            text_field=TEXT_FIELD,
-            dense_vector_field=DENSE_VECTOR_FIELD,
-            num_characters_field=NUM_CHARACTERS_FIELD,
-            texts=chunks,
-            metadata={
-                "course_id": course_id,
-                "attachment_id": attachment.id,
-                "original_filename": attachment.original_filename,
-            },
-        )
-        execution_time = time.time() - start_time
-        logger.info(
-            "Successfully processed `%s` file, processing duration - %s seconds",
-            attachment.id, execution_time
-        )
+        with tracer.start_as_current_span(
+            "rag.index_attachment", attributes={"attachment.id": str(attachment_id)}
+        ):
+            start_time = time.time()
+            logger.info(
+                "Start `%s` file processing %s/%s, start time - %s",
+                attachment_id, i, len(attachment_ids), start_time
+            )
+            attachment = await crud.read(
+                attachment_id, model_class=models.Attachment, schema_class=schemas.Attachment
+            )
+            if attachment is None:
+                logger.warning("File %s not attached or was removed, skip this", attachment_id)
+                continue
+            # Одинаковое содержимое индексируется в курсе один раз
+            content_key = attachment.sha256 or str(attachment.id)
+            if await asyncio.to_thread(_is_indexed, index_name, content_key):
+                logger.info("Content of file %s already indexed, skip this", attachment_id)
+                continue
+            texts, vectors = await prepare_attachment(
+                attachment,
+                on_stage=(
+                    (lambda stage, i=i: on_progress(stage, i, len(attachment_ids)))
+                    if on_progress is not None else None
+                ),
+            )
+            logger.info("Addition %s chunks to %s", len(texts), index_name)
+            await asyncio.to_thread(
+                _index_data,
+                index_name=index_name,
+                text_field=TEXT_FIELD,
+                dense_vector_field=DENSE_VECTOR_FIELD,
+                num_characters_field=NUM_CHARACTERS_FIELD,
+                texts=texts,
+                vectors=vectors,
+                metadata={
+                    "course_id": course_id,
+                    "attachment_id": attachment.id,
+                    "original_filename": attachment.original_filename,
+                },
+                content_key=content_key,
+            )
+            execution_time = time.time() - start_time
+            logger.info(
+                "Successfully processed `%s` file, processing duration - %s seconds",
+                attachment.id, execution_time
+            )
 
 
+@traced("rag.search_materials")
 async def search_materials(course_id: UUID, query: str, top_k: int = 10) -> list[str]:
     index_name = f"attached-materials-{course_id}"
+    # Запрос эмбеддится без блокировки event loop, до синхронного поиска ретривера
+    vector = await get_embeddings().aembed_query(query)
+    index_settings = await asyncio.to_thread(_vector_settings, index_name)
     hybrid_retriever = ElasticsearchRetriever(
         index_name=index_name,
-        body_func=_hybrid_query,
+        body_func=lambda search_query: _hybrid_query(search_query, vector, index_settings),
         document_mapper=_document_mapper,
         es_url=settings.elasticsearch.url
     )
@@ -0,0 +1,224 @@
+from typing import TYPE_CHECKING
+
+import logging
+import os
+import tempfile
+import threading
+from collections.abc import Sequence
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from ..settings import EmbeddingsSettings, settings
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+
+def length_sorted_batches(
+        lengths: Sequence[int], max_batch_tokens: int, batch_size: int
+) -> list[list[int]]:
+    """Группирует тексты в батчи по возрастанию длины.
+
+    Батч дополняется паддингом до самого длинного текста, поэтому тексты близкой длины
+    в одном батче почти не тратят вычисления впустую. Батч длинных текстов ограничен
+    бюджетом токенов, чтобы не раздувать память на матрицы внимания.
+
+    :param lengths: Длины текстов в токенах.
+    :param max_batch_tokens: Максимум (количество текстов x длина самого длинного).
+    :param batch_size: Максимум текстов в батче.
+    :returns: Индексы текстов для каждого батча.
+    """
+
+    batches: list[list[int]] = []
+    batch: list[int] = []
+    for index in sorted(range(len(lengths)), key=lengths.__getitem__):
+        # Тексты отсортированы, поэтому самый длинный в батче - текущий
+        if batch and (
+            len(batch) == batch_size or lengths[index] * (len(batch) + 1) > max_batch_tokens
+        ):
+            batches.append(batch)
+            batch = []
+        batch.append(index)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """Эмбеддинги модели sentence-transformers с динамическими батчами по длине текстов.
+
+    :param model: Модель с любым бэкендом (torch, onnx).
+    :param max_batch_tokens: Бюджет батча в токенах, см. `length_sorted_batches`.
+    :param batch_size: Максимум текстов в батче.
+    :param normalize_embeddings: Нормализовать ли векторы.
+    """
+
+    def __init__(
+            self,
+            model: "SentenceTransformer",
+            max_batch_tokens: int = 8192,
+            batch_size: int = 32,
+            normalize_embeddings: bool = False,
+    ) -> None:
+        self.model = model
+        self.max_batch_tokens = max_batch_tokens
+        self.batch_size = batch_size
+        self.normalize_embeddings = normalize_embeddings
+        # Токенизатор не потокобезопасен, а параллельные вызовы модели только делят ядра
+        self._lock = threading.Lock()
+
+    def token_lengths(self, texts: Sequence[str]) -> list[int]:
+        encoded = self.model.tokenizer(
+            list(texts), truncation=True, max_length=self.model.max_seq_length
+        )
+        return [len(input_ids) for input_ids in encoded["input_ids"]]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        with self._lock:
+            return self._embed(texts)
+
+    def _embed(self, texts: list[str]) -> list[list[float]]:
+        vectors: np.ndarray | None = None
+        batches = length_sorted_batches(
+            self.token_lengths(texts), self.max_batch_tokens, self.batch_size
+        )
+        for batch in batches:
+            embedded = self.model.encode(
+                [texts[index] for index in batch],
+                batch_size=len(batch),
+                normalize_embeddings=self.normalize_embeddings,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+            if vectors is None:
+                vectors = np.empty((len(texts), embedded.shape[1]), dtype=np.float32)
+            # Векторы возвращаются в исходном порядке текстов
+            vectors[batch] = embedded
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+def onnx_model_dir(embeddings_settings: EmbeddingsSettings) -> Path:
+    model_name = embeddings_settings.model_name.strip("/").replace("/", "--")
+    return embeddings_settings.onnx_dir / model_name
+
+
+def onnx_file_name(embeddings_settings: EmbeddingsSettings) -> str:
+    if embeddings_settings.quantize:
+        return f"onnx/model_int8_{embeddings_settings.quantization_config}.onnx"
+    return "onnx/model.onnx"
+
+
+def export_onnx_model(embeddings_settings: EmbeddingsSettings) -> Path:
+    """Экспортирует модель в ONNX и квантует веса в int8.
+
+    Экспорт выполняется один раз, результат сохраняется в `onnx_dir`
+    и переиспользуется всеми процессами. Файлы сначала пишутся во временную
+    директорию рядом с итоговой и переносятся переименованием, поэтому процессы,
+    одновременно экспортирующие модель, не видят недописанных файлов друг друга,
+    а прерванный экспорт их не оставляет.
+
+    :returns: Директория модели.
+    """
+
+    path = onnx_model_dir(embeddings_settings)
+    file_name = onnx_file_name(embeddings_settings)
+    if (path / file_name).exists():
+        return path
+    from sentence_transformers import (  # noqa: PLC0415
+        SentenceTransformer,
+        export_dynamic_quantized_onnx_model,
+    )
+
+    logger.info("Exporting %s to ONNX into %s", embeddings_settings.model_name, path)
+    embeddings_settings.onnx_dir.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(
+            dir=embeddings_settings.onnx_dir, prefix=f".{path.name}-", ignore_cleanup_errors=True
+    ) as staging_dir:
+        staging = Path(staging_dir)
+        source = path
+        if not (path / "onnx" / "model.onnx").exists():
+            model = SentenceTransformer(
+                embeddings_settings.model_name, device="cpu", backend="onnx"
+            )
+            model.save_pretrained(str(staging))
+            source = staging
+        if embeddings_settings.quantize:
+            model = SentenceTransformer(
+                str(source),
+                device="cpu",
+                backend="onnx",
+                model_kwargs={"file_name": "onnx/model.onnx"},
+            )
+            export_dynamic_quantized_onnx_model(
+                model,
+                quantization_config=embeddings_settings.quantization_config,
+                model_name_or_path=str(staging),
+                file_suffix=f"int8_{embeddings_settings.quantization_config}",
+            )
+        if source == staging:
+            try:
+                staging.rename(path)
+            except OSError:
+                # Другой процесс уже перенёс свою модель, добавляется только наш файл
+                pass
+            else:
+                return path
+        (path / "onnx").mkdir(parents=True, exist_ok=True)
+        os.replace(staging / file_name, path / file_name)
+    return path
+
+
+def load_model(embeddings_settings: EmbeddingsSettings) -> "SentenceTransformer":
+    from sentence_transformers import SentenceTransformer  # noqa: PLC0415
+
+    if embeddings_settings.backend == "torch":
+        if embeddings_settings.threads:
+            import torch  # noqa: PLC0415
+
+            torch.set_num_threads(embeddings_settings.threads)
+        model = SentenceTransformer(embeddings_settings.model_name, device="cpu")
+    else:
+        try:
+            import onnxruntime  # noqa: PLC0415
+            import optimum.onnxruntime  # noqa: F401, PLC0415
+        except ImportError as e:
+            raise RuntimeError(
+                "ONNX backend requires `telegram-bot[onnx]` extra to be installed"
+            ) from e
+        path = export_onnx_model(embeddings_settings)
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = embeddings_settings.threads
+        model = SentenceTransformer(
+            str(path),
+            device="cpu",
+            backend="onnx",
+            model_kwargs={
+                "file_name": onnx_file_name(embeddings_settings),
+                "provider": "CPUExecutionProvider",
+                "session_options": session_options,
+            },
+        )
+    if embeddings_settings.max_seq_length is not None:
+        model.max_seq_length = embeddings_settings.max_seq_length
+    return model
+
+
+def create_embeddings(
+        embeddings_settings: EmbeddingsSettings = settings.embeddings
+) -> SentenceTransformerEmbeddings:
+    """Создаёт модель эмбеддингов с бэкендом из настроек"""
+
+    return SentenceTransformerEmbeddings(
+        load_model(embeddings_settings),
+        max_batch_tokens=embeddings_settings.max_batch_tokens,
+        batch_size=embeddings_settings.batch_size,
+    )
@@ -0,0 +1,211 @@
+from typing import Any
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+import httpx
+import orjson
+from fastapi import FastAPI, Request, Response
+from langchain_core.embeddings import Embeddings
+
+from ..settings import PROJECT_ROOT, EmbeddingsSettings, settings
+from .embeddings import create_embeddings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVICE_URL = f"unix://{PROJECT_ROOT / '.tmp' / 'embeddings.sock'}"
+# Хост для HTTP запросов через Unix сокет, в соединении не используется
+SOCKET_BASE_URL = "http://embeddings"
+
+
+@dataclass
+class BatcherStats:
+    requests: int = 0
+    texts: int = 0
+    batches: int = 0
+    busy_seconds: float = 0.0
+    started_at: float = field(default_factory=time.monotonic)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "texts": self.texts,
+            "batches": self.batches,
+            "texts_per_batch": round(self.texts / self.batches, 2) if self.batches else None,
+            "busy_ratio": round(self.busy_seconds / (time.monotonic() - self.started_at), 3),
+        }
+
+
+class MicroBatcher:
+    """Объединяет тексты одновременных запросов в общие вызовы модели.
+
+    Первый запрос открывает окно `window` секунд, запросы, пришедшие за это окно
+    (но не больше `max_texts` текстов), считаются одним вызовом модели в отдельном потоке.
+    Пока модель занята, новые запросы копятся в очереди и уходят следующим батчем.
+
+    :param embeddings: Модель эмбеддингов.
+    :param window: Окно сбора запросов в секундах.
+    :param max_texts: Максимум текстов в одном вызове модели.
+    """
+
+    def __init__(self, embeddings: Embeddings, window: float, max_texts: int) -> None:
+        self.embeddings = embeddings
+        self.window = window
+        self.max_texts = max_texts
+        self.stats = BatcherStats()
+        self._queue: asyncio.Queue[tuple[list[str], asyncio.Future[list[list[float]]]]] = (
+            asyncio.Queue()
+        )
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="embeddings-batcher")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((texts, future))
+        return await future
+
+    async def _collect(self) -> list[tuple[list[str], asyncio.Future[list[list[float]]]]]:
+        loop = asyncio.get_running_loop()
+        pending = [await self._queue.get()]
+        size = len(pending[0][0])
+        deadline = loop.time() + self.window
+        while size < self.max_texts:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except TimeoutError:
+                    break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    async def _run(self) -> None:
+        while True:
+            pending = await self._collect()
+            texts = [text for request_texts, _ in pending for text in request_texts]
+            started_at = time.monotonic()
+            try:
+                vectors = await asyncio.to_thread(self.embeddings.embed_documents, texts)
+            except Exception as e:
+                logger.exception("Failed to embed batch of %s texts", len(texts))
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.stats.busy_seconds += time.monotonic() - started_at
+            self.stats.requests += len(pending)
+            self.stats.texts += len(texts)
+            self.stats.batches += 1
+            offset = 0
+            for request_texts, future in pending:
+                # Клиент мог отключиться, не дождавшись ответа
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+
+
+def create_app(embeddings_settings: EmbeddingsSettings = settings.embeddings) -> FastAPI:
+    """Сервис эмбеддингов: модель загружается один раз и обслуживает все процессы"""
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        embeddings = await asyncio.to_thread(create_embeddings, embeddings_settings)
+        app.state.batcher = MicroBatcher(
+            embeddings,
+            window=embeddings_settings.service_window_ms / 1000,
+            max_texts=embeddings_settings.service_max_texts,
+        )
+        app.state.batcher.start()
+        logger.info(
+            "Embeddings service loaded %s with %s backend",
+            embeddings_settings.model_name, embeddings_settings.backend,
+        )
+        yield
+        await app.state.batcher.stop()
+
+    app = FastAPI(lifespan=lifespan)
+
+    @app.post("/embed")
+    async def embed(request: Request) -> Response:
+        texts = orjson.loads(await request.body())["texts"]
+        vectors = await request.app.state.batcher.embed(texts)
+        return Response(orjson.dumps({"vectors": vectors}), media_type="application/json")
+
+    @app.get("/stats")
+    async def stats(request: Request) -> dict[str, Any]:
+        return {
+            "model_name": embeddings_settings.model_name,
+            "backend": embeddings_settings.backend,
+            **request.app.state.batcher.stats.summary(),
+        }
+
+    return app
+
+
+def _client_params(url: str) -> tuple[str, dict[str, Any]]:
+    """Базовый URL и параметры транспорта для адреса `unix:///path` или `http://host:port`"""
+
+    parts = urlsplit(url)
+    if parts.scheme == "unix":
+        return SOCKET_BASE_URL, {"uds": parts.path}
+    return url, {}
+
+
+class EmbeddingsClient(Embeddings):
+    """Клиент сервиса эмбеддингов (`embeddings_server.py`).
+
+    :param url: Адрес сервиса, `unix:///path/to/socket` или `http://host:port`.
+    :param timeout: Таймаут запроса в секундах, покрывает ожидание в очереди сервиса.
+    """
+
+    def __init__(self, url: str, timeout: float = 60.0) -> None:
+        base_url, transport_kwargs = _client_params(url)
+        self._client = httpx.Client(
+            base_url=base_url,
+            transport=httpx.HTTPTransport(**transport_kwargs),
+            timeout=timeout,
+        )
+        self._async_client = httpx.AsyncClient(
+            base_url=base_url,
+            transport=httpx.AsyncHTTPTransport(**transport_kwargs),
+            timeout=timeout,
+        )
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        response = self._client.post("/embed", content=orjson.dumps({"texts": texts}))
+        response.raise_for_status()
+        return orjson.loads(response.content)["vectors"]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        response = await self._async_client.post(
+            "/embed", content=orjson.dumps({"texts": texts})
+        )
+        response.raise_for_status()
+        return orjson.loads(response.content)["vectors"]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await self.aembed_documents([text]))[0]
@@ -0,0 +1,135 @@
+from typing import Any
+
+import numpy as np
+
+from ..settings import VectorIndexSettings
+
+# Типы HNSW индекса Elasticsearch для режимов, где векторы квантует сам Elasticsearch
+INDEX_TYPES = {"float": "hnsw", "int8": "int8_hnsw", "int4": "int4_hnsw", "bbq": "bbq_hnsw"}
+# Ключ `_meta` маппинга, в котором индекс хранит свой режим
+META_KEY = "vector_index"
+
+
+def coarse_field(field: str) -> str:
+    """Поле сокращённых векторов для первого прохода kNN (режимы truncated и binary)"""
+
+    return f"{field}_coarse"
+
+
+def vector_mappings(
+        field: str, dims: int, index_settings: VectorIndexSettings
+) -> dict[str, Any]:
+    """Маппинг полей векторов для режима хранения.
+
+    :param field: Поле полных векторов.
+    :param dims: Размерность полных векторов.
+    :param index_settings: Режим хранения векторов.
+    """
+
+    if index_settings.mode in INDEX_TYPES:
+        return {
+            field: {
+                "type": "dense_vector",
+                "dims": dims,
+                "similarity": "cosine",
+                "index_options": {"type": INDEX_TYPES[index_settings.mode]},
+            }
+        }
+    if index_settings.mode == "truncated":
+        coarse_mapping = {
+            "type": "dense_vector",
+            "dims": min(index_settings.truncated_dims, dims),
+            "similarity": "cosine",
+            "index_options": {"type": "int8_hnsw"},
+        }
+    else:
+        # Расстояние между битовыми векторами - расстояние Хэмминга
+        coarse_mapping = {
+            "type": "dense_vector",
+            "element_type": "bit",
+            "dims": dims,
+            "similarity": "l2_norm",
+            "index_options": {"type": "hnsw"},
+        }
+    # Полные векторы только хранятся для пересчёта кандидатов, HNSW граф по ним не строится
+    return {
+        field: {"type": "dense_vector", "dims": dims, "index": False},
+        coarse_field(field): coarse_mapping,
+    }
+
+
+def coarse_vectors(vectors: np.ndarray, index_settings: VectorIndexSettings) -> list[Any]:
+    """Сокращённые векторы: первые `truncated_dims` компонент или упакованные знаковые биты
+    (hex строка, по 8 компонент в байте)"""
+
+    if index_settings.mode == "truncated":
+        return vectors[:, :index_settings.truncated_dims].tolist()
+    return [row.tobytes().hex() for row in np.packbits(vectors > 0, axis=1)]
+
+
+def vector_fields(
+        field: str, vectors: list[list[float]], index_settings: VectorIndexSettings
+) -> list[dict[str, Any]]:
+    """Значения полей векторов для каждого индексируемого документа"""
+
+    if index_settings.mode in INDEX_TYPES:
+        return [{field: vector} for vector in vectors]
+    coarse = coarse_vectors(np.asarray(vectors, dtype=np.float32), index_settings)
+    return [
+        {field: vector, coarse_field(field): coarse_vector}
+        for vector, coarse_vector in zip(vectors, coarse, strict=True)
+    ]
+
+
+def knn_retriever(
+        field: str,
+        vector: list[float],
+        index_settings: VectorIndexSettings,
+        k: int,
+        num_candidates: int,
+) -> dict[str, Any]:
+    """Ретривер kNN: первый проход по квантованным или сокращённым векторам,
+    затем пересчёт близости `k x oversample` кандидатов по полным векторам.
+
+    :param field: Поле полных векторов.
+    :param vector: Вектор запроса.
+    :param index_settings: Режим хранения векторов индекса.
+    :param k: Количество ближайших соседей.
+    :param num_candidates: Кандидатов HNSW поиска без пересчёта.
+    """
+
+    # int8 квантование почти не теряет точность, пересчёт не нужен
+    if index_settings.mode in {"float", "int8"}:
+        return {
+            "knn": {
+                "field": field,
+                "query_vector": vector,
+                "k": k,
+                "num_candidates": num_candidates,
+            }
+        }
+    if index_settings.mode in INDEX_TYPES:
+        # Elasticsearch хранит исходные векторы рядом с квантованными
+        search_field, query_vector = field, vector
+    else:
+        search_field = coarse_field(field)
+        query_vector = coarse_vectors(np.asarray([vector], dtype=np.float32), index_settings)[0]
+    return {
+        "standard": {
+            "query": {
+                "script_score": {
+                    "query": {
+                        "knn": {
+                            "field": search_field,
+                            "query_vector": query_vector,
+                            "num_candidates": max(num_candidates, k * index_settings.oversample),
+                        }
+                    },
+                    "script": {
+                        "source": f"cosineSimilarity(params.query_vector, '{field}') + 1.0",
+                        "params": {"query_vector": vector},
+                    },
+                }
+            }
+        }
+    }
@@ -1,20 +1,152 @@
-from uuid import uuid4
+import logging
+from uuid import UUID, uuid4
 
+from ..ai_agents.checkpointer import delete_run_checkpoints
 from ..core import enums, schemas
-from ..database import crud, models
+from ..database import cache, crud, models, queries
 from ..rag.attached_materials import index_attachments
+from ..settings import settings
+from ..tracing import traced
+from ..worker import queue
+from .generation import CourseGenerationResult, generate_course
+from .progress import ProgressTracker, progress_broker
 
+logger = logging.getLogger(__name__)
 
+
+@traced("courses.confirm_creation")
 async def confirm_creation(teacher_inputs: schemas.TeacherInputs) -> schemas.Task:
-    course_id = uuid4()
-    course_creation_task = schemas.Task(
-        status=enums.TaskStatus.PENDING, resource_id=course_id
+    """Ставит задачу создания курса в очередь.
+
+    Индексация материалов и генерация выполняются воркером (`process_creation`),
+    поэтому вызов завершается сразу после создания задачи.
+    """
+    return await queue.enqueue(
+        enums.TaskKind.COURSE_CREATION,
+        resource_id=uuid4(),
+        payload={"teacher_inputs": teacher_inputs.model_dump(mode="json")},
+    )
+
+
+async def process_creation(task: schemas.Task) -> None:
+    """Обработчик задачи создания курса.
+
+    Индексирует материалы, генерирует модули и сохраняет курс с модулями,
+    задача считается завершённой только после сохранения. Checkpoints генерации
+    хранятся, пока задачу можно повторить.
+    """
+
+    teacher_inputs = schemas.TeacherInputs.model_validate(task.payload["teacher_inputs"])
+    tracker = ProgressTracker(task.id)
+    try:
+        await index_attachments(
+            course_id=task.resource_id,
+            attachment_ids=teacher_inputs.attachments,
+            on_progress=tracker.update,
+        )
+        result = await run_creation(task, teacher_inputs, tracker)
+        # Повтор после сбоя между сохранением курса и завершением задачи не создаёт дубликат
+        if await crud.read(
+                task.resource_id, model_class=models.Course, schema_class=schemas.Course
+        ) is None:
+            await save_course(
+                schemas.Course(
+                    id=task.resource_id,
+                    title=teacher_inputs.discipline,
+                    description=result.plan.description,
+                    discipline=teacher_inputs.discipline,
+                    creator_id=teacher_inputs.user_id,
+                ),
+                result.modules,
+            )
+    except Exception:
+        # Повтор или окончательная ошибка определяются воркером,
+        # подписчики узнают о них по статусу задачи
+        progress_broker.forget(task.id)
+        if task.attempts >= settings.worker.max_attempts:
+            # Повтора не будет, checkpoints для возобновления больше не нужны
+            await _delete_checkpoints(task.id)
+        raise
+    await _delete_checkpoints(task.id)
+    tracker.update(enums.TaskStage.COMPLETED)
+
+
+async def cleanup_creation(task: schemas.Task) -> None:
+    """Очистка после задачи создания курса, аренда которой истекла на последней попытке"""
+
+    await _delete_checkpoints(task.id)
+
+
+async def _delete_checkpoints(task_id: UUID) -> None:
+    # Ошибка очистки не должна подменять ошибку генерации или проваливать сохранённый курс
+    try:
+        await delete_run_checkpoints(task_id)
+    except Exception:
+        logger.exception("Failed to delete generation checkpoints of task %s", task_id)
+
+
+async def run_creation(
+        task: schemas.Task,
+        teacher_inputs: schemas.TeacherInputs,
+        tracker: ProgressTracker | None = None,
+) -> CourseGenerationResult:
+    """Запускает генерацию курса по задаче.
+
+    Прогресс сохраняется по `task.id`, поэтому повторный вызов после сбоя
+    продолжает генерацию с последнего завершённого модуля/блока.
+    """
+    return await generate_course(
+        course_id=task.resource_id,
+        teacher_inputs=teacher_inputs,
+        run_id=task.id,
+        on_progress=tracker.update if tracker is not None else None,
+        on_content=tracker.content if tracker is not None else None,
     )
-    await crud.create(course_creation_task, model_class=models.Task)
-    await index_attachments(course_id=course_id, attachment_ids=teacher_inputs.attachments)
-    return await crud.refresh(
-        course_creation_task.id,
-        model_class=models.Task,
-        schema_class=schemas.Task,
-        status=enums.TaskStatus.RUNNING,
+
+
+async def get_course(course_id: UUID) -> schemas.Course | None:
+    return await cache.read(course_id, model_class=models.Course, schema_class=schemas.Course)
+
+
+async def get_module(module_id: UUID) -> schemas.Module | None:
+    return await cache.read_cache.get(
+        models.Module, module_id, schemas.Module, lambda: queries.read_module(module_id)
     )
+
+
+async def save_course(course: schemas.Course, modules: list[schemas.Module]) -> None:
+    """Сохраняет курс с модулями, контент блоками и ассессментами в одной транзакции.
+
+    Каждая таблица заполняется одним пакетным INSERT, поэтому количество
+    запросов не зависит от количества модулей.
+    """
+    async with crud.unit_of_work() as session:
+        await crud.create(course, model_class=models.Course, session=session)
+        await crud.create_many(
+            [
+                crud.to_row(module, models.Module, course_id=course.id, dependencies=[])
+                for module in modules
+            ],
+            model_class=models.Module,
+            session=session,
+        )
+        await crud.create_many(
+            [
+                crud.to_row(
+                    content_block, models.ContentBlock, module_id=module.id, position=position
+                )
+                for module in modules
+                for position, content_block in enumerate(module.content_blocks)
+            ],
+            model_class=models.ContentBlock,
+            session=session,
+        )
+        await crud.create_many(
+            [
+                crud.to_row(assessment, models.Assessment, module_id=module.id)
+                for module in modules
+                for assessment in module.assessments
+            ],
+            model_class=models.Assessment,
+            session=session,
+        )
@@ -3,9 +3,12 @@ import random
 
 import html_to_markdown
 from bs4 import BeautifulSoup
+from opentelemetry import trace
 from playwright.async_api import Browser, BrowserContext, Page, async_playwright
 from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
+from ..tracing import traced
+
 logger = logging.getLogger(__name__)
 
 FINGERPRINT_SPOOFING_SCRIPT = """
@@ -225,7 +228,9 @@ def _extract_markdown_text(soup: BeautifulSoup) -> str:
     return "\n".join([html_to_markdown.convert(str(element)) for element in elements])
 
 
+@traced("crawler.crawl_web_page")
 async def crawl_web_page(url: str, headless: bool = False) -> str:
+    trace.get_current_span().set_attribute("url.full", url)
     async with async_playwright() as playwright:
         browser = await playwright.chromium.launch(headless=headless)
         page = await _get_current_page(browser)
@@ -235,6 +240,7 @@ async def crawl_web_page(url: str, headless: bool = False) -> str:
         except PlaywrightTimeoutError:
             # Fallback в случае неудачного ожидания загрузки страницы
             logger.warning("Networkidle timeout for %s, using domcontentloaded", page.url)
+            trace.get_current_span().add_event("networkidle.timeout")
             await page.wait_for_load_state("domcontentloaded")
         page_content = await page.content()
         soup = BeautifulSoup(page_content, "html.parser")
@@ -0,0 +1,515 @@
+from typing import Any
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from collections.abc import AsyncIterator, Callable, Mapping
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from itertools import starmap
+from uuid import UUID
+
+from langchain_core.runnables import Runnable, RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from pydantic import BaseModel
+
+from ..ai_agents import content_block_generator, course_structure_planner, module_designer
+from ..ai_agents.checkpointer import open_checkpointer
+from ..ai_agents.content_block_generator import GeneratorContext, block_schema
+from ..ai_agents.course_structure_planner import CourseStructurePlan, ModuleNote, PlannerContext
+from ..ai_agents.metrics import metrics_scope
+from ..ai_agents.module_designer import ContentBlock, DesignerContext, ModuleDesign
+from ..ai_agents.streaming import PartialOutput, astream_structured
+from ..core import enums, schemas
+from ..settings import settings
+from ..tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyLimiter:
+    """Ограничивает количество одновременных вызовов агентов.
+
+    :param max_concurrency: Общий лимит одновременных вызовов.
+    :param per_model_concurrency: Лимит по умолчанию для каждой модели.
+    :param model_concurrency: Индивидуальные лимиты для отдельных моделей.
+    """
+
+    def __init__(
+            self,
+            max_concurrency: int,
+            per_model_concurrency: int,
+            model_concurrency: Mapping[str, int] | None = None,
+    ) -> None:
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._per_model_concurrency = per_model_concurrency
+        self._model_concurrency = dict(model_concurrency or {})
+        self._per_model: dict[str, asyncio.Semaphore] = {}
+
+    @classmethod
+    def from_settings(cls) -> "ConcurrencyLimiter":
+        return cls(
+            max_concurrency=settings.generation.max_concurrency,
+            per_model_concurrency=settings.generation.per_model_concurrency,
+            model_concurrency=settings.generation.model_concurrency,
+        )
+
+    def _model_semaphore(self, model_name: str) -> asyncio.Semaphore:
+        if model_name not in self._per_model:
+            self._per_model[model_name] = asyncio.Semaphore(
+                self._model_concurrency.get(model_name, self._per_model_concurrency)
+            )
+        return self._per_model[model_name]
+
+    @asynccontextmanager
+    async def limit(self, model_name: str) -> AsyncIterator[None]:
+        # Сначала слот модели, затем общий, чтобы не держать общий слот в ожидании модели
+        async with self._model_semaphore(model_name), self._global:
+            yield
+
+
+@dataclass(frozen=True, slots=True)
+class AgentSpec:
+    agent: Runnable
+    model_name: str
+
+    def with_checkpointer(self, checkpointer: BaseCheckpointSaver) -> "AgentSpec":
+        return AgentSpec(self.agent.copy(update={"checkpointer": checkpointer}), self.model_name)
+
+
+@dataclass(frozen=True, slots=True)
+class GenerationAgents:
+    """Агенты участвующие в генерации курса (можно подменить на fake LLM)"""
+
+    planner: AgentSpec
+    designer: AgentSpec
+    block_generator: AgentSpec
+
+    @classmethod
+    def default(cls) -> "GenerationAgents":
+        return cls(
+            planner=AgentSpec(
+                course_structure_planner.agent, course_structure_planner.model.model_name
+            ),
+            designer=AgentSpec(module_designer.agent, module_designer.model.model_name),
+            block_generator=AgentSpec(
+                content_block_generator.agent, content_block_generator.model.model_name
+            ),
+        )
+
+    def with_checkpointer(self, checkpointer: BaseCheckpointSaver) -> "GenerationAgents":
+        return GenerationAgents(
+            planner=self.planner.with_checkpointer(checkpointer),
+            designer=self.designer.with_checkpointer(checkpointer),
+            block_generator=self.block_generator.with_checkpointer(checkpointer),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class StepTiming:
+    stage: str
+    label: str
+    model_name: str
+    started_at: float
+    duration: float
+
+
+@dataclass(slots=True)
+class GenerationReport:
+    """Отчёт о времени генерации.
+
+    `sequential_seconds` - сумма длительностей всех шагов, т.е. время,
+    которое заняла бы генерация при последовательном вызове агентов.
+    """
+
+    wall_clock_seconds: float = 0.0
+    steps: list[StepTiming] = field(default_factory=list)
+    restored_steps: int = 0
+
+    @property
+    def sequential_seconds(self) -> float:
+        return sum(step.duration for step in self.steps)
+
+    @property
+    def speedup(self) -> float:
+        if self.wall_clock_seconds == 0:
+            return 1.0
+        return self.sequential_seconds / self.wall_clock_seconds
+
+    def summary(self) -> dict[str, Any]:
+        stages: dict[str, dict[str, float]] = {}
+        for step in self.steps:
+            stage = stages.setdefault(step.stage, {"count": 0, "seconds": 0.0})
+            stage["count"] += 1
+            stage["seconds"] += step.duration
+        for stage in stages.values():
+            stage["seconds"] = round(stage["seconds"], 3)
+        return {
+            "wall_clock_seconds": round(self.wall_clock_seconds, 3),
+            "sequential_seconds": round(self.sequential_seconds, 3),
+            "speedup": round(self.speedup, 2),
+            "restored_steps": self.restored_steps,
+            "stages": stages,
+        }
+
+
+@dataclass(slots=True)
+class CourseGenerationResult:
+    plan: CourseStructurePlan
+    designs: list[ModuleDesign]
+    modules: list[schemas.Module]
+    report: GenerationReport
+
+
+@dataclass(frozen=True, slots=True)
+class _BlockJob:
+    module_index: int
+    block_index: int
+    module_note: ModuleNote
+    design: ModuleDesign
+    content_block: ContentBlock
+
+
+@dataclass(slots=True)
+class _Run:
+    """Состояние одного запуска генерации"""
+
+    course_id: UUID
+    teacher_inputs: schemas.TeacherInputs
+    agents: GenerationAgents
+    run_id: UUID | None = None
+    on_progress: Callable[[enums.TaskStage, int, int], None] | None = None
+    on_content: Callable[[schemas.ContentDelta], None] | None = None
+    report: GenerationReport = field(default_factory=GenerationReport)
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_steps: Counter[enums.TaskStage] = field(default_factory=Counter)
+    total_steps: Counter[enums.TaskStage] = field(default_factory=Counter)
+
+    def thread_id(self, label: str) -> str | None:
+        return f"{self.run_id}:{label}" if self.run_id is not None else None
+
+    def add_steps(self, stage: enums.TaskStage, count: int) -> None:
+        self.total_steps[stage] += count
+        self.notify(stage)
+
+    def finish_step(self, stage: enums.TaskStage) -> None:
+        self.finished_steps[stage] += 1
+        self.notify(stage)
+
+    def notify(self, stage: enums.TaskStage) -> None:
+        if self.on_progress is not None:
+            self.on_progress(stage, self.finished_steps[stage], self.total_steps[stage])
+
+
+class CourseGenerator:
+    """Оркестратор генерации курса.
+
+    Дизайн модулей выполняется конкурентно, а блоки контента каждого готового дизайна
+    сразу отправляются в ограниченный пул воркеров. Ошибка любого шага отменяет
+    всю генерацию.
+
+    Если передан `run_id`, каждый шаг сохраняется через LangGraph checkpointer
+    в отдельный поток (`<run_id>:<шаг>`), поэтому повторный запуск с тем же `run_id`
+    восстанавливает завершённые шаги и продолжает прерванные с последнего checkpoint.
+
+    :param agents: Агенты для планирования, дизайна модулей и генерации блоков.
+    :param limiter: Ограничитель конкурентности LLM вызовов.
+    :param block_workers: Количество воркеров генерации контент блоков.
+    :param stream_interval: Минимальный интервал публикации частичного контента блока.
+    """
+
+    def __init__(
+            self,
+            agents: GenerationAgents | None = None,
+            limiter: ConcurrencyLimiter | None = None,
+            block_workers: int = settings.generation.block_workers,
+            stream_interval: float = settings.generation.stream_interval,
+    ) -> None:
+        self.agents = agents or GenerationAgents.default()
+        self.limiter = limiter or ConcurrencyLimiter.from_settings()
+        self.block_workers = block_workers
+        self.stream_interval = stream_interval
+
+    async def _invoke(
+            self,
+            run: _Run,
+            spec: AgentSpec,
+            context: BaseModel,
+            *,
+            stage: enums.TaskStage,
+            label: str,
+            on_partial: Callable[[PartialOutput], None] | None = None,
+            schema: type[BaseModel] | None = None,
+    ) -> Any:
+        agent_input: dict[str, Any] | None = {"messages": []}
+        config: RunnableConfig = {}
+        thread_id = run.thread_id(label.replace(" ", ":"))
+        if thread_id is not None:
+            config = {"configurable": {"thread_id": thread_id}}
+            state = await spec.agent.aget_state(config)
+            structured_response = state.values.get("structured_response")
+            if structured_response is not None:
+                run.report.restored_steps += 1
+                run.finish_step(stage)
+                logger.info("Step `%s` of stage `%s` restored from checkpoint", label, stage)
+                return structured_response
+            if state.next:
+                # Продолжение прерванного шага с последнего checkpoint
+                agent_input = None
+        with tracer.start_as_current_span(
+            f"invoke_agent {label}",
+            attributes={
+                "gen_ai.operation.name": "invoke_agent",
+                "generation.stage": stage,
+                "generation.resumed": agent_input is None,
+            },
+        ) as span:
+            # Ожидание лимита конкурентности видно как разница начала спана и агента
+            async with self.limiter.limit(spec.model_name):
+                span.add_event("limiter.acquired")
+                started_at = time.perf_counter()
+                if on_partial is not None and schema is not None:
+                    result = await astream_structured(
+                        spec.agent,
+                        agent_input,
+                        config,
+                        context=context,
+                        schema=schema,
+                        on_partial=on_partial,
+                        interval=self.stream_interval,
+                    )
+                else:
+                    result = await spec.agent.ainvoke(agent_input, config, context=context)
+                duration = time.perf_counter() - started_at
+        run.report.steps.append(StepTiming(
+            stage=stage,
+            label=label,
+            model_name=spec.model_name,
+            started_at=started_at - run.started_at,
+            duration=duration,
+        ))
+        run.finish_step(stage)
+        logger.info("Step `%s` of stage `%s` finished in %.2f seconds", label, stage, duration)
+        return result["structured_response"]
+
+    async def generate(
+            self,
+            course_id: UUID,
+            teacher_inputs: schemas.TeacherInputs,
+            plan: CourseStructurePlan | None = None,
+            *,
+            run_id: UUID | None = None,
+            sequential: bool = False,
+            on_progress: Callable[[enums.TaskStage, int, int], None] | None = None,
+            on_content: Callable[[schemas.ContentDelta], None] | None = None,
+    ) -> CourseGenerationResult:
+        """Генерирует модули курса.
+
+        :param course_id: Идентификатор создаваемого курса.
+        :param teacher_inputs: Входные данные преподавателя.
+        :param plan: Готовый план курса, если не передан - будет создан планировщиком.
+        :param run_id: Идентификатор задачи для сохранения и возобновления генерации.
+        :param sequential: Вызывать агентов по одному (для сравнения времени).
+        :param on_progress: Обработчик прогресса (этап, завершено шагов, всего шагов).
+        :param on_content: Обработчик частично сгенерированного контента блоков,
+        если передан - блоки генерируются потоково через `astream`.
+        :return Результат генерации с отчётом о времени выполнения.
+        """
+        # Токены и время вызовов агентов учитываются на курс и задачу
+        with (
+            metrics_scope(course_id=course_id, task_id=run_id),
+            tracer.start_as_current_span(
+                "generate_course", attributes={"course.id": str(course_id)}
+            ),
+        ):
+            if run_id is None:
+                return await self._generate(
+                    _Run(
+                        course_id,
+                        teacher_inputs,
+                        self.agents,
+                        on_progress=on_progress,
+                        on_content=on_content,
+                    ),
+                    plan,
+                    sequential,
+                )
+            async with open_checkpointer() as checkpointer:
+                return await self._generate(
+                    _Run(
+                        course_id,
+                        teacher_inputs,
+                        self.agents.with_checkpointer(checkpointer),
+                        run_id=run_id,
+                        on_progress=on_progress,
+                        on_content=on_content,
+                    ),
+                    plan,
+                    sequential,
+                )
+
+    async def _generate(
+            self, run: _Run, plan: CourseStructurePlan | None, sequential: bool
+    ) -> CourseGenerationResult:
+        if plan is None:
+            run.add_steps(enums.TaskStage.PLANNING, 1)
+            plan = await self._invoke(
+                run,
+                run.agents.planner,
+                PlannerContext(
+                    user_id=run.teacher_inputs.user_id,
+                    course_id=run.course_id,
+                    teacher_inputs=run.teacher_inputs,
+                ),
+                stage=enums.TaskStage.PLANNING,
+                label="course",
+            )
+        run.add_steps(enums.TaskStage.DESIGNING, len(plan.module_notes))
+        designs: list[ModuleDesign | None] = [None] * len(plan.module_notes)
+        blocks: list[list[Any]] = [[] for _ in plan.module_notes]
+        if sequential:
+            await self._generate_sequentially(run, plan, designs, blocks)
+        else:
+            await self._generate_concurrently(run, plan, designs, blocks)
+        run.report.wall_clock_seconds = time.perf_counter() - run.started_at
+        logger.info("Course %s generated: %s", run.course_id, run.report.summary())
+        return CourseGenerationResult(
+            plan=plan,
+            designs=designs,
+            modules=list(starmap(
+                _assemble_module, zip(plan.module_notes, designs, blocks, strict=True)
+            )),
+            report=run.report,
+        )
+
+    async def _design_module(
+            self, run: _Run, plan: CourseStructurePlan, module_index: int
+    ) -> ModuleDesign:
+        design = await self._invoke(
+            run,
+            run.agents.designer,
+            DesignerContext(
+                course_id=run.course_id,
+                teacher_inputs=run.teacher_inputs,
+                course_description=plan.description,
+                module_note=plan.module_notes[module_index],
+            ),
+            stage=enums.TaskStage.DESIGNING,
+            label=f"module {module_index}",
+        )
+        run.add_steps(enums.TaskStage.GENERATING, len(design.content_blueprint))
+        return design
+
+    async def _generate_block(self, run: _Run, job: _BlockJob) -> Any:
+        label = f"module {job.module_index} block {job.block_index}"
+        block_type = job.content_block.block_type
+        on_partial = None
+        if run.on_content is not None:
+            on_content = run.on_content
+
+            def on_partial(partial: PartialOutput) -> None:
+                on_content(schemas.ContentDelta(
+                    label=label,
+                    block_type=block_type,
+                    delta=partial.delta,
+                    fields=partial.fields,
+                    done=partial.done,
+                ))
+
+        return await self._invoke(
+            run,
+            run.agents.block_generator,
+            GeneratorContext(
+                module_title=job.module_note.title,
+                module_description=job.module_note.description,
+                learning_sequence=job.design.learning_sequence,
+                content_block=job.content_block,
+            ),
+            stage=enums.TaskStage.GENERATING,
+            label=label,
+            on_partial=on_partial,
+            schema=block_schema(block_type),
+        )
+
+    async def _generate_sequentially(
+            self,
+            run: _Run,
+            plan: CourseStructurePlan,
+            designs: list[ModuleDesign | None],
+            blocks: list[list[Any]],
+    ) -> None:
+        for module_index, module_note in enumerate(plan.module_notes):
+            design = await self._design_module(run, plan, module_index)
+            designs[module_index] = design
+            for block_index, content_block in enumerate(design.content_blueprint):
+                job = _BlockJob(module_index, block_index, module_note, design, content_block)
+                blocks[module_index].append(await self._generate_block(run, job))
+
+    async def _generate_concurrently(
+            self,
+            run: _Run,
+            plan: CourseStructurePlan,
+            designs: list[ModuleDesign | None],
+            blocks: list[list[Any]],
+    ) -> None:
+        queue: asyncio.Queue[_BlockJob | None] = asyncio.Queue(maxsize=self.block_workers * 2)
+
+        async def design(module_index: int) -> None:
+            module_design = await self._design_module(run, plan, module_index)
+            designs[module_index] = module_design
+            blocks[module_index] = [None] * len(module_design.content_blueprint)
+            for block_index, content_block in enumerate(module_design.content_blueprint):
+                await queue.put(_BlockJob(
+                    module_index,
+                    block_index,
+                    plan.module_notes[module_index],
+                    module_design,
+                    content_block,
+                ))
+
+        async def work() -> None:
+            while (job := await queue.get()) is not None:
+                blocks[job.module_index][job.block_index] = await self._generate_block(run, job)
+
+        # TaskGroup отменяет все оставшиеся задачи при первой ошибке
+        async with asyncio.TaskGroup() as workers:
+            for _ in range(self.block_workers):
+                workers.create_task(work())
+            async with asyncio.TaskGroup() as designers:
+                for module_index in range(len(plan.module_notes)):
+                    designers.create_task(design(module_index))
+            for _ in range(self.block_workers):
+                await queue.put(None)
+
+
+def _assemble_module(
+        module_note: ModuleNote, design: ModuleDesign, module_blocks: list[Any]
+) -> schemas.Module:
+    return schemas.Module(
+        title=module_note.title,
+        description=module_note.description,
+        order=module_note.order,
+        content_blocks=[
+            schemas.ContentBlock(block_type=content_block.block_type, data=data)
+            for content_block, data in zip(design.content_blueprint, module_blocks, strict=True)
+        ],
+    )
+
+
+async def generate_course(
+        course_id: UUID,
+        teacher_inputs: schemas.TeacherInputs,
+        plan: CourseStructurePlan | None = None,
+        run_id: UUID | None = None,
+        on_progress: Callable[[enums.TaskStage, int, int], None] | None = None,
+        on_content: Callable[[schemas.ContentDelta], None] | None = None,
+) -> CourseGenerationResult:
+    return await CourseGenerator().generate(
+        course_id,
+        teacher_inputs,
+        plan,
+        run_id=run_id,
+        on_progress=on_progress,
+        on_content=on_content,
+    )
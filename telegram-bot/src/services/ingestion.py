@@ -0,0 +1,36 @@
+import logging
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..core import enums, schemas
+from ..rag.attached_materials import prepare_attachment
+from ..worker import queue
+
+logger = logging.getLogger(__name__)
+
+
+async def enqueue_preparation(attachment: schemas.Attachment) -> None:
+    """Ставит предварительную обработку загруженного вложения в очередь воркеров.
+
+    Воркеры конвертируют и эмбеддят файлы по мере их загрузки, поэтому обработка
+    первого файла альбома идёт параллельно со скачиванием следующих, а модель
+    эмбеддингов не загружается в процесс веб-приложения. Результат кэшируется
+    по sha256, и при создании курса файлы только записываются в индекс.
+    """
+    try:
+        await queue.enqueue(
+            enums.TaskKind.ATTACHMENT_PREPARATION,
+            resource_id=attachment.id,
+            payload={"attachment": attachment.model_dump(mode="json")},
+        )
+    except SQLAlchemyError:
+        # Файл будет обработан при создании курса
+        logger.exception("Failed to enqueue preparation of file %s", attachment.id)
+
+
+async def process_preparation(task: schemas.Task) -> None:
+    """Обработчик задачи предварительной обработки вложения"""
+
+    attachment = schemas.Attachment.model_validate(task.payload["attachment"])
+    await prepare_attachment(attachment)
+    logger.info("File %s prepared for indexing", attachment.id)
@@ -1,33 +1,103 @@
-from uuid import uuid4
+import logging
+from collections.abc import AsyncIterable, AsyncIterator
+from pathlib import Path
+from uuid import UUID, uuid4
 
-import magic
+from sqlalchemy import func, select
 
 from src.core import schemas
 from src.database import crud, models
-from src.settings import MEDIA_DIR
-from src.storage import local as local_storage
+from src.database.base import sessionmaker
+from src.storage import storage
+from src.storage.blobs import remove_blob, upload_blob
+
+logger = logging.getLogger(__name__)
 
 
 async def upload(user_id: int, filename: str, data: bytes) -> schemas.Attachment:
-    file_id = uuid4()
-    user_dir = MEDIA_DIR / f"{user_id}"
-    user_dir.mkdir(parents=True, exist_ok=True)
-    filepath = user_dir / f"{file_id}.{filename.rsplit(".", maxsplit=1)[-1]}"
-    mime_type = magic.from_buffer(data, mime=True)
-    attachment = schemas.Attachment(
-        id=file_id,
-        original_filename=filename,
-        filepath=str(filepath),
-        mime_type=mime_type,
-        size=len(data)
-    )
-    file = schemas.File(
-        path=str(filepath),
-        size=len(data),
-        mime_type=mime_type,
-        data=data,
-        uploaded_at=attachment.uploaded_at
+    return await upload_stream(user_id, filename, _single_chunk(data))
+
+
+async def upload_stream(
+        user_id: int, filename: str, chunks: AsyncIterable[bytes]
+) -> schemas.Attachment:
+    """Сохраняет загружаемый файл по частям, память не зависит от размера файла.
+
+    Содержимое хранится по sha256, поэтому повторная загрузка того же файла
+    (любым пользователем) добавляет только запись о вложении.
+    """
+    attachment: schemas.Attachment | None = None
+
+    async def register(stored_file: schemas.StoredFile) -> None:
+        # Запись сохраняется до дедупликации, чтобы конкурентный `remove` её учёл
+        nonlocal attachment
+        attachment = schemas.Attachment(
+            id=uuid4(),
+            original_filename=filename,
+            filepath=stored_file.key,
+            sha256=stored_file.sha256,
+            mime_type=stored_file.mime_type,
+            size=stored_file.size,
+        )
+        await crud.create(attachment, model_class=models.Attachment)
+
+    try:
+        stored_file = await upload_blob(
+            storage, chunks, suffix=Path(filename).suffix.lower(), register=register
+        )
+    except BaseException:
+        if attachment is not None:
+            await crud.remove(attachment.id, model_class=models.Attachment)
+        raise
+    logger.info(
+        "User %s uploaded attachment %s (deduplicated: %s)",
+        user_id, attachment.id, stored_file.deduplicated
     )
-    await local_storage.upload(file)
-    await crud.create(attachment, model_class=models.Attachment)
     return attachment
+
+
+async def remove(attachment_id: UUID) -> None:
+    """Удаляет вложение, а файл - только если на него больше не ссылаются"""
+
+    attachment = await crud.read(
+        attachment_id, model_class=models.Attachment, schema_class=schemas.Attachment
+    )
+    if attachment is None:
+        return
+    await crud.remove(attachment_id, model_class=models.Attachment)
+    await remove_blob(storage, attachment.filepath, lambda: _count_references(attachment.filepath))
+
+
+async def _count_references(filepath: str) -> int:
+    async with sessionmaker() as session:
+        return await session.scalar(
+            select(func.count()).where(models.Attachment.filepath == filepath)
+        )
+
+
+async def storage_usage() -> dict[str, int]:
+    """Объём загруженных файлов с учётом и без учёта дедупликации"""
+
+    async with sessionmaker() as session:
+        logical_size, attachments_count = (await session.execute(
+            select(func.coalesce(func.sum(models.Attachment.size), 0), func.count())
+        )).one()
+        unique_files = (
+            select(models.Attachment.filepath, func.max(models.Attachment.size).label("size"))
+            .group_by(models.Attachment.filepath)
+            .subquery()
+        )
+        physical_size, files_count = (await session.execute(
+            select(func.coalesce(func.sum(unique_files.c.size), 0), func.count())
+        )).one()
+    return {
+        "attachments": attachments_count,
+        "files": files_count,
+        "logical_bytes": logical_size,
+        "physical_bytes": physical_size,
+        "saved_bytes": logical_size - physical_size,
+    }
+
+
+async def _single_chunk(data: bytes) -> AsyncIterator[bytes]:  # noqa: RUF029
+    yield data
@@ -0,0 +1,200 @@
+import asyncio
+import contextlib
+import logging
+import time
+from collections import defaultdict
+from collections.abc import AsyncIterator, Iterator
+from uuid import UUID
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..core import enums, schemas
+from ..database import crud, models
+from ..settings import settings
+from ..utils import current_datetime
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class ProgressBroker:
+    """In-process pub/sub событий прогресса задач.
+
+    Подписчики в том же процессе получают каждое событие без обращения к БД.
+    Для подписчиков из других процессов снимок прогресса сохраняется в `tasks.progress`
+    не чаще чем раз в `persist_interval` секунд на задачу (и при завершении задачи).
+    Смена этапа не сбрасывает интервал: дизайн модулей и генерация блоков идут
+    одновременно, поэтому этап меняется почти с каждым событием.
+
+    Снимки одной задачи записываются последовательно и только самый новый из
+    ожидающих, поэтому старый снимок не перезаписывает новый. Подписчик из другого
+    процесса видит прогресс с задержкой до `persist_interval` + `poll_interval`
+    секунд (около 7 секунд по умолчанию).
+    """
+
+    def __init__(self, persist_interval: float) -> None:
+        self.persist_interval = persist_interval
+        self._subscribers: defaultdict[UUID, set[asyncio.Queue[schemas.ProgressEvent]]] = (
+            defaultdict(set)
+        )
+        self._latest: dict[UUID, schemas.ProgressEvent] = {}
+        self._persisted_at: dict[UUID, float] = {}
+        # Снимок, ожидающий записи, и задача, записывающая снимки задачи по очереди
+        self._unsaved: dict[UUID, schemas.ProgressEvent] = {}
+        self._writers: dict[UUID, asyncio.Task[None]] = {}
+
+    def latest(self, task_id: UUID) -> schemas.ProgressEvent | None:
+        return self._latest.get(task_id)
+
+    def forget(self, task_id: UUID) -> None:
+        self._latest.pop(task_id, None)
+        self._persisted_at.pop(task_id, None)
+
+    def publish(self, event: schemas.ProgressEvent) -> None:
+        self._latest[event.task_id] = event
+        for queue in self._subscribers.get(event.task_id, ()):
+            if queue.full():
+                # Медленный подписчик получает только актуальные события
+                queue.get_nowait()
+            queue.put_nowait(event)
+        self._maybe_persist(event)
+        if event.is_final:
+            self.forget(event.task_id)
+
+    def _maybe_persist(self, event: schemas.ProgressEvent) -> None:
+        now = time.monotonic()
+        persisted_at = self._persisted_at.get(event.task_id)
+        if (
+                not event.is_final
+                and persisted_at is not None
+                and now - persisted_at < self.persist_interval
+        ):
+            return
+        self._persisted_at[event.task_id] = now
+        self._unsaved[event.task_id] = event
+        if event.task_id not in self._writers:
+            self._writers[event.task_id] = asyncio.create_task(self._write(event.task_id))
+
+    async def _write(self, task_id: UUID) -> None:
+        try:
+            while (event := self._unsaved.pop(task_id, None)) is not None:
+                await self._persist(event)
+        finally:
+            del self._writers[task_id]
+
+    @staticmethod
+    async def _persist(event: schemas.ProgressEvent) -> None:
+        try:
+            await crud.refresh(
+                event.task_id,
+                model_class=models.Task,
+                schema_class=schemas.Task,
+                progress=event.model_dump(mode="json"),
+            )
+        except SQLAlchemyError:
+            logger.exception("Failed to persist progress of task %s", event.task_id)
+
+    @contextlib.contextmanager
+    def subscribe(self, task_id: UUID) -> Iterator[asyncio.Queue[schemas.ProgressEvent]]:
+        queue: asyncio.Queue[schemas.ProgressEvent] = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[task_id].add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers[task_id].discard(queue)
+            if not self._subscribers[task_id]:
+                del self._subscribers[task_id]
+
+
+progress_broker = ProgressBroker(persist_interval=settings.progress.persist_interval)
+
+
+class ProgressTracker:
+    """Публикует прогресс задачи и оценивает оставшееся время по скорости этапа"""
+
+    def __init__(self, task_id: UUID, broker: ProgressBroker = progress_broker) -> None:
+        self.task_id = task_id
+        self.broker = broker
+        self._stage_started_at: dict[enums.TaskStage, float] = {}
+
+    def update(
+            self, stage: enums.TaskStage, current: int = 0, total: int = 0, message: str = ""
+    ) -> None:
+        now = time.monotonic()
+        started_at = self._stage_started_at.setdefault(stage, now)
+        eta_seconds = None
+        if 0 < current < total:
+            eta_seconds = round((now - started_at) / current * (total - current), 1)
+        self.broker.publish(schemas.ProgressEvent(
+            task_id=self.task_id,
+            stage=stage,
+            current=current,
+            total=total,
+            message=message,
+            eta_seconds=eta_seconds,
+        ))
+
+    def content(self, content: schemas.ContentDelta) -> None:
+        """Публикует частично сгенерированный контент блока вместе с текущим прогрессом"""
+
+        last_event = self.broker.latest(self.task_id)
+        if last_event is None or last_event.stage != enums.TaskStage.GENERATING:
+            last_event = schemas.ProgressEvent(
+                task_id=self.task_id, stage=enums.TaskStage.GENERATING
+            )
+        self.broker.publish(last_event.model_copy(
+            update={"content": content, "created_at": current_datetime()}
+        ))
+
+
+def _snapshot(task: schemas.Task) -> schemas.ProgressEvent:
+    """Прогресс задачи по сохранённому снимку.
+
+    Статус задачи приоритетнее снимка: упавшая задача, которая вернулась в очередь,
+    продолжает отображаться, а окончательно упавшая - завершает поток.
+    """
+    if task.status == enums.TaskStatus.COMPLETED:
+        return schemas.ProgressEvent(task_id=task.id, stage=enums.TaskStage.COMPLETED)
+    if task.status == enums.TaskStatus.FAILED:
+        return schemas.ProgressEvent(
+            task_id=task.id, stage=enums.TaskStage.FAILED, message=task.error or ""
+        )
+    if task.progress is not None:
+        return schemas.ProgressEvent.model_validate(task.progress)
+    return schemas.ProgressEvent(task_id=task.id, stage=enums.TaskStage.QUEUED)
+
+
+async def watch(task_id: UUID) -> AsyncIterator[schemas.ProgressEvent]:
+    """Поток событий прогресса задачи до её завершения.
+
+    События из текущего процесса приходят сразу, а если задача выполняется
+    в другом процессе - раз в `poll_interval` секунд читается сохранённый снимок
+    (сохраняется раз в `persist_interval` секунд).
+    """
+    with progress_broker.subscribe(task_id) as queue:
+        last_event = progress_broker.latest(task_id)
+        if last_event is None:
+            task = await crud.read(task_id, model_class=models.Task, schema_class=schemas.Task)
+            if task is None:
+                return
+            last_event = _snapshot(task)
+        yield last_event
+        while not last_event.is_final:
+            try:
+                event = await asyncio.wait_for(
+                    queue.get(), timeout=settings.progress.poll_interval
+                )
+            except TimeoutError:
+                task = await crud.read(
+                    task_id, model_class=models.Task, schema_class=schemas.Task
+                )
+                if task is None:
+                    return
+                event = _snapshot(task)
+                if (event.stage, event.current, event.total) == (
+                    last_event.stage, last_event.current, last_event.total
+                ):
+                    continue
+            last_event = event
+            yield event
@@ -1,4 +1,4 @@
-from typing import Final
+from typing import Final, Literal
 
 from pathlib import Path
 
@@ -36,11 +36,35 @@ class SQLiteSettings(BaseSettings):
 
     path: Path = BASE_DIR / "telegram-bot" / "db.sqlite3"
     driver: str = "aiosqlite"
+    echo: bool = False
+    # PRAGMA, применяемые к каждому новому соединению
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    busy_timeout_ms: int = 5000
+    cache_size_kib: int = 64 * 1024
+    mmap_size: int = 256 * 1024 * 1024
+    temp_store: str = "MEMORY"
+    # Пул соединений
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
 
     @property
     def sqlalchemy_url(self) -> str:
         return f"sqlite+{self.driver}:///{self.path}"
 
+    @property
+    def pragmas(self) -> dict[str, str | int]:
+        return {
+            "journal_mode": self.journal_mode,
+            "synchronous": self.synchronous,
+            "busy_timeout": self.busy_timeout_ms,
+            # Отрицательное значение задаёт размер кэша в KiB, а не в страницах
+            "cache_size": -self.cache_size_kib,
+            "mmap_size": self.mmap_size,
+            "temp_store": self.temp_store,
+        }
+
 
 class ElasticsearchSettings(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="ELASTICSEARCH_")
@@ -85,6 +109,198 @@ class YandexCloudSettings(BaseSettings):
         return f"gpt://{self.folder_id}/qwen3-235b-a22b-fp8/latest"
 
 
+class PromptsSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="PROMPTS_")
+
+    hot_reload: bool = False
+
+
+class GenerationSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="GENERATION_")
+
+    max_concurrency: int = 8
+    per_model_concurrency: int = 4
+    model_concurrency: dict[str, int] = {}
+    block_workers: int = 6
+    # Как часто публиковать частично сгенерированный контент блока
+    stream_interval: float = 0.5
+
+
+class LLMCacheSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="LLM_CACHE_")
+
+    enabled: bool = True
+    path: Path = PROJECT_ROOT / ".tmp" / "llm_cache.sqlite3"
+    ttl_seconds: int = 7 * 24 * 60 * 60
+    max_entries: int = 50_000
+    semantic: bool = False
+    similarity_threshold: float = 0.95
+    semantic_max_candidates: int = 1000
+
+
+class WorkerSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="WORKER_")
+
+    processes: int = 1
+    concurrency: int = 2
+    lease_seconds: int = 60
+    heartbeat_interval: int = 15
+    poll_interval: float = 1.0
+    max_attempts: int = 3
+
+
+class ProgressSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="PROGRESS_")
+
+    # Подписчики из другого процесса видят прогресс с задержкой до суммы интервалов
+    persist_interval: float = 5.0
+    poll_interval: float = 2.0
+    bot_edit_interval: float = 3.0
+
+
+class ReadCacheSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="READ_CACHE_")
+
+    enabled: bool = True
+    max_size: int = 2048
+    # Ограничивает устаревание локального кэша при записи из другого процесса
+    ttl_seconds: float = 60.0
+    # Общий кэш для нескольких процессов, например redis://localhost:6379/0
+    redis_url: str | None = None
+
+
+class StorageSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="STORAGE_")
+
+    backend: Literal["local", "s3"] = "local"
+    local_root: Path = MEDIA_DIR
+    # S3 совместимое хранилище (AWS S3, MinIO, Yandex Object Storage)
+    s3_bucket: str = "education-ai"
+    s3_endpoint_url: str | None = None
+    s3_region: str | None = None
+    s3_access_key_id: str | None = None
+    s3_secret_access_key: str | None = None
+    # Размер части multipart загрузки, S3 требует не меньше 5 MiB
+    s3_part_size: int = 8 * 1024 * 1024
+
+
+class WebhookSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="WEBHOOK_")
+
+    workers: int = 16
+    max_queue_size: int = 1000
+    dedupe_size: int = 10_000
+    # Сколько ждать обработки принятых апдейтов при остановке
+    drain_timeout: float = 10.0
+
+
+class IngestionSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="INGESTION_")
+
+    # Сколько ждать следующее сообщение альбома, Telegram присылает их отдельными апдейтами
+    album_latency: float = 0.6
+    download_concurrency: int = 4
+    download_timeout: int = 300
+
+
+class FSMSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="FSM_")
+
+    backend: Literal["memory", "sqlite", "redis"] = "sqlite"
+    # Redis или совместимый сервер (Valkey, KeyDB, Dragonfly)
+    redis_url: str = "redis://localhost:6379/0"
+    # Окно, за которое изменения состояний собираются в одну запись (0 - писать сразу)
+    flush_interval: float = 0.05
+    cache_size: int = 10_000
+    # Ограничивает устаревание локального кэша при записи из другого процесса
+    cache_ttl_seconds: float = 30.0
+
+
+class WebAppSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="WEBAPP_")
+
+    # Время кэширования статики с отпечатком содержимого в имени
+    static_max_age: int = 365 * 24 * 60 * 60
+    # Меньшие ответы не сжимаются, заголовки gzip съедают выигрыш
+    compress_min_size: int = 512
+    # Перечитывать изменённые шаблоны (для разработки), иначе страницы рендерятся один раз
+    templates_auto_reload: bool = False
+
+
+class MetricsSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="METRICS_")
+
+    enabled: bool = True
+    path: Path = PROJECT_ROOT / ".tmp" / "metrics.sqlite3"
+    # Цены за 1000 токенов запроса и ответа по коротким именам моделей
+    # (`qwen3-235b-a22b-fp8`, `aliceai-llm`), задаются JSON объектом
+    model_prices: dict[str, tuple[float, float]] = {}
+
+
+class TracingSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="TRACING_")
+
+    enabled: bool = False
+    service_name: str = "education-ai"
+    # otlp - OTLP/HTTP коллектор, file - OTLP JSON Lines (читается `otlpjsonfile` коллектора)
+    exporter: Literal["otlp", "file", "console"] = "otlp"
+    # По умолчанию берётся из OTEL_EXPORTER_OTLP_TRACES_ENDPOINT или http://localhost:4318
+    otlp_endpoint: str | None = None
+    file_path: Path = PROJECT_ROOT / ".tmp" / "traces.jsonl"
+    # Доля сохраняемых трейсов, решение принимается в корне трейса и наследуется
+    sample_ratio: float = 0.1
+    max_queue_size: int = 2048
+    max_export_batch_size: int = 512
+    schedule_delay_ms: int = 5000
+    # Максимальная длина SQL запроса в атрибутах спана
+    max_statement_length: int = 1000
+
+
+class EmbeddingsSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="EMBEDDINGS_")
+
+    model_name: str = "deepvk/USER-bge-m3"
+    # torch - PyTorch fp32, onnx - ONNX Runtime (`telegram-bot[onnx]`)
+    backend: Literal["torch", "onnx"] = "torch"
+    # Динамическое int8 квантование весов ONNX модели
+    quantize: bool = True
+    # Набор инструкций процессора, под который квантуется модель
+    quantization_config: Literal["arm64", "avx2", "avx512", "avx512_vnni"] = "avx2"
+    # Потоков на один вызов модели, 0 - по числу ядер
+    threads: int = 0
+    # Батчи собираются из текстов близкой длины, бюджет батча -
+    # количество текстов x длина самого длинного текста в токенах
+    batch_size: int = 32
+    max_batch_tokens: int = 8192
+    # По умолчанию - из конфигурации модели
+    max_seq_length: int | None = None
+    # Экспортированные в ONNX и квантованные модели
+    onnx_dir: Path = PROJECT_ROOT / ".tmp" / "onnx"
+    # Адрес сервиса эмбеддингов (`embeddings_server.py`): unix:///path/to/socket
+    # или http://host:port. Если не задан, модель загружается в каждом процессе
+    service_url: str | None = None
+    # Окно, за которое запросы разных процессов собираются в один вызов модели
+    service_window_ms: float = 5.0
+    service_max_texts: int = 256
+    service_timeout: float = 120.0
+
+
+class VectorIndexSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="VECTOR_INDEX_")
+
+    # Хранение векторов для первого прохода kNN в индексах `attached-materials-*`:
+    # float - HNSW без квантования, int8 (по умолчанию Elasticsearch), int4, bbq -
+    # квантование HNSW средствами Elasticsearch, truncated - первые `truncated_dims`
+    # компонент (Matryoshka), binary - по одному биту (знаку) на компоненту.
+    # Для int4, bbq, truncated и binary кандидаты первого прохода пересчитываются
+    # по полным векторам.
+    # Режим применяется к новым индексам, созданные индексы сохраняют свой
+    mode: Literal["float", "int8", "int4", "bbq", "truncated", "binary"] = "int8"
+    truncated_dims: int = 256
+    # Кандидатов первого прохода на один результат kNN
+    oversample: int = 4
+
+
 class RAGSettings(BaseSettings):
     chunk_size: int = 1000
     chunk_overlap: int = 50
@@ -98,6 +314,21 @@ class Settings(BaseSettings):
     openai: OpenAISettings = OpenAISettings()
     yandexcloud: YandexCloudSettings = YandexCloudSettings()
     rag: RAGSettings = RAGSettings()
+    embeddings: EmbeddingsSettings = EmbeddingsSettings()
+    vector_index: VectorIndexSettings = VectorIndexSettings()
+    prompts: PromptsSettings = PromptsSettings()
+    generation: GenerationSettings = GenerationSettings()
+    llm_cache: LLMCacheSettings = LLMCacheSettings()
+    worker: WorkerSettings = WorkerSettings()
+    progress: ProgressSettings = ProgressSettings()
+    read_cache: ReadCacheSettings = ReadCacheSettings()
+    storage: StorageSettings = StorageSettings()
+    ingestion: IngestionSettings = IngestionSettings()
+    fsm: FSMSettings = FSMSettings()
+    webhook: WebhookSettings = WebhookSettings()
+    webapp: WebAppSettings = WebAppSettings()
+    metrics: MetricsSettings = MetricsSettings()
+    tracing: TracingSettings = TracingSettings()
 
 
 settings: Final[Settings] = Settings()
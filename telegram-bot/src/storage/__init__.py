@@ -0,0 +1,12 @@
+__all__ = [
+    "CHUNK_SIZE",
+    "LocalStorage",
+    "Storage",
+    "create_storage",
+    "local_copy",
+    "storage",
+]
+
+from .backends import create_storage, local_copy, storage
+from .base import CHUNK_SIZE, Storage
+from .local import LocalStorage
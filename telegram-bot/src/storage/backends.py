@@ -0,0 +1,47 @@
+import os
+import tempfile
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import aiofiles
+import aiofiles.os
+
+from ..settings import StorageSettings, settings
+from ..tracing import tracer
+from .base import Storage
+from .local import LocalStorage
+
+
+def create_storage(storage_settings: StorageSettings) -> Storage:
+    if storage_settings.backend == "s3":
+        from .s3 import S3Storage  # noqa: PLC0415
+
+        return S3Storage.from_settings(storage_settings)
+    return LocalStorage(storage_settings.local_root)
+
+
+storage = create_storage(settings.storage)
+
+
+@asynccontextmanager
+async def local_copy(key: str) -> AsyncIterator[Path]:
+    """Путь к файлу на локальном диске для библиотек, которые не читают потоки.
+
+    Для удалённых хранилищ файл скачивается во временный файл,
+    который удаляется при выходе из контекста.
+    """
+    if isinstance(storage, LocalStorage):
+        yield storage.path(key)
+        return
+    descriptor, filename = tempfile.mkstemp(suffix=Path(key).suffix)
+    os.close(descriptor)
+    path = Path(filename)
+    try:
+        with tracer.start_as_current_span("storage.download", attributes={"storage.key": key}):
+            async with aiofiles.open(path, mode="wb") as opened_file:
+                async for chunk in storage.get_stream(key):
+                    await opened_file.write(chunk)
+        yield path
+    finally:
+        await aiofiles.os.remove(path)
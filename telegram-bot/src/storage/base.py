@@ -0,0 +1,35 @@
+from typing import Protocol
+
+from collections.abc import AsyncIterable, AsyncIterator
+
+from ..core import schemas
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class Storage(Protocol):
+    """Хранилище файлов, адресуемых строковым ключом вида `blobs/ab/<sha256>.pdf`.
+
+    Все операции потоковые, ни одна не держит файл целиком в памяти.
+    """
+
+    async def put_stream(
+            self, key: str, chunks: AsyncIterable[bytes], content_type: str | None = None
+    ) -> int:
+        """Записывает файл по частям и возвращает его размер.
+
+        Файл становится виден по ключу только после успешной записи целиком.
+        """
+
+    def get_stream(self, key: str) -> AsyncIterator[bytes]:
+        """Читает файл целиком по частям"""
+
+    def get_range(self, key: str, start: int, end: int) -> AsyncIterator[bytes]:
+        """Читает байты файла с `start` по `end` включительно"""
+
+    async def delete(self, key: str) -> None:
+        """Удаляет файл, отсутствие файла не считается ошибкой"""
+
+    async def stat(self, key: str) -> schemas.FileStat | None: ...
+
+    async def move(self, source_key: str, target_key: str) -> None: ...
@@ -0,0 +1,124 @@
+import hashlib
+import logging
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable
+from uuid import uuid4
+
+import magic
+
+from ..core import schemas
+from ..tracing import tracer
+from .base import Storage
+
+logger = logging.getLogger(__name__)
+
+BLOBS_PREFIX = "blobs"
+# Количество первых байт, достаточное libmagic для определения типа файла
+MIME_SNIFF_SIZE = 8192
+
+
+class _DigestStream:
+    """Пропускает части файла, попутно считая sha256 и запоминая начало файла"""
+
+    def __init__(self, chunks: AsyncIterable[bytes]) -> None:
+        self.chunks = chunks
+        self.digest = hashlib.sha256()
+        self.head = b""
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.chunks:
+            if len(self.head) < MIME_SNIFF_SIZE:
+                self.head += chunk[:MIME_SNIFF_SIZE - len(self.head)]
+            self.digest.update(chunk)
+            yield chunk
+
+
+def blob_key(sha256: str, suffix: str = "", prefix: str = BLOBS_PREFIX) -> str:
+    return f"{prefix}/{sha256[:2]}/{sha256}{suffix}"
+
+
+async def _place_blob(storage: Storage, temp_key: str, key: str) -> bool:
+    """Перемещает загруженный файл на место или удаляет его, если такой уже есть"""
+
+    if await storage.stat(key) is not None:
+        await storage.delete(temp_key)
+        return True
+    await storage.move(temp_key, key)
+    return False
+
+
+async def upload_blob(
+        storage: Storage,
+        chunks: AsyncIterable[bytes],
+        suffix: str = "",
+        prefix: str = BLOBS_PREFIX,
+        register: Callable[[schemas.StoredFile], Awaitable[None]] | None = None,
+) -> schemas.StoredFile:
+    """Потоково записывает файл в хранилище с адресацией по содержимому.
+
+    Файл сохраняется по ключу `<prefix>/<sha256[:2]>/<sha256><suffix>`.
+    Если файл с таким содержимым уже есть, загруженная копия удаляется
+    и возвращается существующий ключ с признаком `deduplicated`.
+
+    :param storage: Хранилище файлов.
+    :param chunks: Части содержимого файла.
+    :param suffix: Расширение файла (нужно конвертерам документов).
+    :param prefix: Префикс ключей файлов.
+    :param register: Сохраняет ссылку на файл до проверки его наличия по ключу,
+     поэтому конкурентный `remove_blob` либо увидит ссылку, либо удалит файл раньше
+     проверки, и загруженная копия займёт его место.
+    """
+    stream = _DigestStream(chunks)
+    temp_key = f"{prefix}/incoming/{uuid4().hex}.part"
+    with tracer.start_as_current_span("storage.upload_blob") as span:
+        try:
+            size = await storage.put_stream(temp_key, stream)
+            stored_file = schemas.StoredFile(
+                key=blob_key(stream.digest.hexdigest(), suffix, prefix),
+                size=size,
+                sha256=stream.digest.hexdigest(),
+                mime_type=magic.from_buffer(stream.head, mime=True),
+            )
+            if register is not None:
+                await register(stored_file)
+            stored_file.deduplicated = await _place_blob(storage, temp_key, stored_file.key)
+        except BaseException:
+            await storage.delete(temp_key)
+            raise
+        span.set_attributes({
+            "storage.size": size, "storage.deduplicated": stored_file.deduplicated
+        })
+    logger.info(
+        "Blob `%s` stored, size %s bytes, deduplicated: %s",
+        stored_file.key, size, stored_file.deduplicated
+    )
+    return stored_file
+
+
+async def remove_blob(
+        storage: Storage,
+        key: str,
+        count_references: Callable[[], Awaitable[int]],
+        prefix: str = BLOBS_PREFIX,
+) -> bool:
+    """Удаляет файл, если на него больше не ссылаются.
+
+    Файл сначала переносится по временному ключу, затем ссылки пересчитываются:
+    загрузка того же содержимого (`upload_blob`) сохраняет ссылку до проверки наличия
+    файла, поэтому ссылка, появившаяся после переноса, возвращает файл на место.
+
+    :param count_references: Количество ссылок на файл.
+    :return Удалён ли файл.
+    """
+    if await count_references() or await storage.stat(key) is None:
+        return False
+    removed_key = f"{prefix}/removed/{uuid4().hex}"
+    await storage.move(key, removed_key)
+    if await count_references():
+        if await storage.stat(key) is None:
+            await storage.move(removed_key, key)
+        else:
+            # Загрузка уже положила на место копию того же содержимого
+            await storage.delete(removed_key)
+        return False
+    await storage.delete(removed_key)
+    return True
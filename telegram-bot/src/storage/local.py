@@ -1,8 +1,17 @@
+import asyncio
 import logging
+import mimetypes
+import os
+from collections.abc import AsyncIterable, AsyncIterator
+from datetime import UTC, datetime
+from pathlib import Path
+from uuid import uuid4
 
 import aiofiles
+import aiofiles.os
 
 from ..core import schemas
+from .base import CHUNK_SIZE
 
 logger = logging.getLogger(__name__)
 
@@ -11,3 +20,96 @@ async def upload(file: schemas.File) -> None:
     async with aiofiles.open(file.path, mode="wb") as opened_file:
         await opened_file.write(file.data)
     logger.info("File `%s` uploaded successfully", file.path)
+
+
+async def _write_chunks(chunks: AsyncIterable[bytes], path: Path) -> int:
+    size = 0
+    async with aiofiles.open(path, mode="wb") as opened_file:
+        async for chunk in chunks:
+            size += len(chunk)
+            await opened_file.write(chunk)
+        await opened_file.flush()
+        await asyncio.to_thread(os.fsync, opened_file.fileno())
+    return size
+
+
+class LocalStorage:
+    """Хранилище в локальной директории.
+
+    Ключ - путь относительно `root`. Отдавать файлы лучше по пути из `path`
+    (например через `FileResponse`), тогда сервер может использовать sendfile.
+
+    :param root: Корневая директория хранилища.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root.resolve()
+
+    def path(self, key: str) -> Path:
+        # Вложения, сохранённые до появления хранилищ, имеют ключом абсолютный путь внутри root
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root):
+            raise ValueError(f"Key `{key}` points outside of storage root")
+        return path
+
+    async def put_stream(
+            self, key: str, chunks: AsyncIterable[bytes], content_type: str | None = None  # noqa: ARG002
+    ) -> int:
+        """Потоково записывает файл, не загружая его целиком в память.
+
+        Данные пишутся во временный файл рядом с целевым и после успешной записи
+        атомарно переименовываются, поэтому по ключу никогда не бывает
+        частично записанного файла.
+        """
+
+        path = self.path(key)
+        await aiofiles.os.makedirs(path.parent, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.{uuid4().hex}.part")
+        try:
+            size = await _write_chunks(chunks, temp_path)
+            await aiofiles.os.replace(temp_path, path)
+        except BaseException:
+            if await aiofiles.os.path.exists(temp_path):
+                await aiofiles.os.remove(temp_path)
+            raise
+        logger.info("File `%s` uploaded successfully, size %s bytes", path, size)
+        return size
+
+    async def get_stream(self, key: str) -> AsyncIterator[bytes]:
+        async with aiofiles.open(self.path(key), mode="rb") as opened_file:
+            while chunk := await opened_file.read(CHUNK_SIZE):
+                yield chunk
+
+    async def get_range(self, key: str, start: int, end: int) -> AsyncIterator[bytes]:
+        remaining = end - start + 1
+        async with aiofiles.open(self.path(key), mode="rb") as opened_file:
+            await opened_file.seek(start)
+            while remaining > 0 and (chunk := await opened_file.read(min(CHUNK_SIZE, remaining))):
+                remaining -= len(chunk)
+                yield chunk
+
+    async def delete(self, key: str) -> None:
+        path = self.path(key)
+        try:
+            await aiofiles.os.remove(path)
+        except FileNotFoundError:
+            return
+        logger.info("File `%s` removed", path)
+
+    async def stat(self, key: str) -> schemas.FileStat | None:
+        path = self.path(key)
+        try:
+            stat_result = await aiofiles.os.stat(path)
+        except FileNotFoundError:
+            return None
+        return schemas.FileStat(
+            size=stat_result.st_size,
+            content_type=mimetypes.guess_type(path.name)[0],
+            etag=f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"',
+            modified_at=datetime.fromtimestamp(stat_result.st_mtime, tz=UTC),
+        )
+
+    async def move(self, source_key: str, target_key: str) -> None:
+        target_path = self.path(target_key)
+        await aiofiles.os.makedirs(target_path.parent, exist_ok=True)
+        await aiofiles.os.replace(self.path(source_key), target_path)
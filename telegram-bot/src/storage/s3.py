@@ -0,0 +1,184 @@
+from typing import Any
+
+import asyncio
+import logging
+from collections.abc import AsyncIterable, AsyncIterator
+from contextlib import AsyncExitStack
+
+from ..core import schemas
+from ..settings import StorageSettings
+from .base import CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+NOT_FOUND_CODES = {"404", "NoSuchKey", "NotFound"}
+
+
+class S3Storage:
+    """S3 совместимое хранилище (AWS S3, MinIO, Yandex Object Storage, moto).
+
+    Клиент создаётся при первом обращении и переиспользуется. Файлы больше
+    `part_size` загружаются multipart загрузкой, поэтому в памяти держится
+    не больше одной части.
+
+    :param bucket: Бакет для файлов.
+    :param endpoint_url: Адрес S3 совместимого сервера, для AWS не указывается.
+    :param part_size: Размер части multipart загрузки.
+    """
+
+    def __init__(
+            self,
+            bucket: str,
+            endpoint_url: str | None = None,
+            region: str | None = None,
+            access_key_id: str | None = None,
+            secret_access_key: str | None = None,
+            part_size: int = 8 * 1024 * 1024,
+    ) -> None:
+        try:
+            from aiobotocore.session import get_session  # noqa: PLC0415
+        except ImportError as e:
+            raise RuntimeError(
+                "S3 storage requires `aiobotocore` package, install `telegram-bot[s3]`"
+            ) from e
+        self.bucket = bucket
+        self.part_size = part_size
+        self._session = get_session()
+        self._client_options = {
+            "endpoint_url": endpoint_url,
+            "region_name": region,
+            "aws_access_key_id": access_key_id,
+            "aws_secret_access_key": secret_access_key,
+        }
+        self._client: Any = None
+        self._exit_stack = AsyncExitStack()
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_settings(cls, storage_settings: StorageSettings) -> "S3Storage":
+        return cls(
+            bucket=storage_settings.s3_bucket,
+            endpoint_url=storage_settings.s3_endpoint_url,
+            region=storage_settings.s3_region,
+            access_key_id=storage_settings.s3_access_key_id,
+            secret_access_key=storage_settings.s3_secret_access_key,
+            part_size=storage_settings.s3_part_size,
+        )
+
+    async def _get_client(self) -> Any:
+        async with self._lock:
+            if self._client is None:
+                self._client = await self._exit_stack.enter_async_context(
+                    self._session.create_client("s3", **self._client_options)
+                )
+        return self._client
+
+    async def close(self) -> None:
+        await self._exit_stack.aclose()
+        self._client = None
+
+    async def put_stream(
+            self, key: str, chunks: AsyncIterable[bytes], content_type: str | None = None
+    ) -> int:
+        client = await self._get_client()
+        options = {"Bucket": self.bucket, "Key": key}
+        if content_type is not None:
+            options["ContentType"] = content_type
+        upload = _ChunkedUpload(client, options)
+        try:
+            size = await upload.write(chunks, self.part_size)
+        except BaseException:
+            await upload.abort()
+            raise
+        logger.info("Object `%s` uploaded successfully, size %s bytes", key, size)
+        return size
+
+    async def _get(self, key: str, **options: Any) -> AsyncIterator[bytes]:
+        client = await self._get_client()
+        response = await client.get_object(Bucket=self.bucket, Key=key, **options)
+        async with response["Body"] as body:
+            while chunk := await body.read(CHUNK_SIZE):
+                yield chunk
+
+    def get_stream(self, key: str) -> AsyncIterator[bytes]:
+        return self._get(key)
+
+    def get_range(self, key: str, start: int, end: int) -> AsyncIterator[bytes]:
+        return self._get(key, Range=f"bytes={start}-{end}")
+
+    async def delete(self, key: str) -> None:
+        client = await self._get_client()
+        await client.delete_object(Bucket=self.bucket, Key=key)
+        logger.info("Object `%s` removed", key)
+
+    async def stat(self, key: str) -> schemas.FileStat | None:
+        client = await self._get_client()
+        try:
+            response = await client.head_object(Bucket=self.bucket, Key=key)
+        except client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] in NOT_FOUND_CODES:
+                return None
+            raise
+        return schemas.FileStat(
+            size=response["ContentLength"],
+            content_type=response.get("ContentType"),
+            etag=response.get("ETag"),
+            modified_at=response.get("LastModified"),
+        )
+
+    async def move(self, source_key: str, target_key: str) -> None:
+        # Копирование выполняется на стороне сервера (одним запросом до 5 GiB)
+        client = await self._get_client()
+        await client.copy_object(
+            Bucket=self.bucket,
+            Key=target_key,
+            CopySource={"Bucket": self.bucket, "Key": source_key},
+        )
+        await client.delete_object(Bucket=self.bucket, Key=source_key)
+
+
+class _ChunkedUpload:
+    """Загрузка объекта: одним запросом, если он меньше части, иначе multipart"""
+
+    def __init__(self, client: Any, options: dict[str, str]) -> None:
+        self.client = client
+        self.options = options
+        self.upload_id: str | None = None
+        self.parts: list[dict[str, Any]] = []
+
+    async def write(self, chunks: AsyncIterable[bytes], part_size: int) -> int:
+        buffer = bytearray()
+        size = 0
+        async for chunk in chunks:
+            buffer += chunk
+            size += len(chunk)
+            if len(buffer) >= part_size:
+                await self._upload_part(bytes(buffer))
+                buffer.clear()
+        if self.upload_id is None:
+            await self.client.put_object(Body=bytes(buffer), **self.options)
+            return size
+        if buffer:
+            await self._upload_part(bytes(buffer))
+        await self.client.complete_multipart_upload(
+            **self._target, UploadId=self.upload_id, MultipartUpload={"Parts": self.parts}
+        )
+        return size
+
+    async def abort(self) -> None:
+        if self.upload_id is not None:
+            await self.client.abort_multipart_upload(**self._target, UploadId=self.upload_id)
+
+    @property
+    def _target(self) -> dict[str, str]:
+        return {"Bucket": self.options["Bucket"], "Key": self.options["Key"]}
+
+    async def _upload_part(self, data: bytes) -> None:
+        if self.upload_id is None:
+            response = await self.client.create_multipart_upload(**self.options)
+            self.upload_id = response["UploadId"]
+        part_number = len(self.parts) + 1
+        response = await self.client.upload_part(
+            **self._target, UploadId=self.upload_id, PartNumber=part_number, Body=data
+        )
+        self.parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
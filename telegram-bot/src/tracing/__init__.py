@@ -0,0 +1,123 @@
+from typing import Any, cast
+
+import functools
+import inspect
+import logging
+from collections.abc import Callable, Mapping
+
+from opentelemetry import context as otel_context
+from opentelemetry import propagate, trace
+from opentelemetry.context import Context
+from sqlalchemy import Engine, event
+
+from ..settings import TracingSettings, settings
+
+# Ключ контекста трейса в payload задачи, связывает запрос вебхука с её выполнением воркером
+TRACE_CONTEXT_KEY = "trace_context"
+
+logger = logging.getLogger(__name__)
+
+# Модули создают спаны через API OpenTelemetry: пока `setup_tracing` не вызван
+# (или трассировка выключена), спаны ничего не стоят и никуда не пишутся.
+# Клиент Elasticsearch создаёт спаны своих запросов сам
+tracer = trace.get_tracer("education-ai")
+
+
+def setup_tracing(component: str, tracing_settings: TracingSettings = settings.tracing) -> None:
+    """Подключает SDK OpenTelemetry и экспорт спанов (`telegram-bot[tracing]`).
+
+    :param component: Компонент приложения (`webapp`, `worker`), добавляется к имени сервиса.
+    :param tracing_settings: Настройки трассировки.
+    """
+
+    if not tracing_settings.enabled:
+        return
+    from .exporters import create_tracer_provider  # noqa: PLC0415
+
+    trace.set_tracer_provider(create_tracer_provider(component, tracing_settings))
+    logger.info(
+        "Tracing enabled, exporter `%s`, sample ratio %s",
+        tracing_settings.exporter, tracing_settings.sample_ratio
+    )
+
+
+def traced[F: Callable[..., Any]](name: str, **attributes: Any) -> Callable[[F], F]:
+    """Выполняет функцию (синхронную или асинхронную) внутри спана `name`"""
+
+    def decorator(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with tracer.start_as_current_span(name, attributes=attributes):
+                    return await func(*args, **kwargs)
+
+            return cast(F, async_wrapper)
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with tracer.start_as_current_span(name, attributes=attributes):
+                return func(*args, **kwargs)
+
+        return cast(F, wrapper)
+
+    return decorator
+
+
+def inject_context() -> dict[str, str]:
+    """Текущий контекст трейса в заголовках W3C (`traceparent`) для передачи в другой процесс"""
+
+    carrier: dict[str, str] = {}
+    propagate.inject(carrier)
+    return carrier
+
+
+def extract_context(carrier: Mapping[str, str] | None) -> Context:
+    """Контекст трейса из заголовков W3C, без них - текущий контекст"""
+
+    return propagate.extract(carrier or {}, context=otel_context.get_current())
+
+
+def instrument_sqlalchemy(engine: Engine, system: str) -> None:
+    """Создаёт спаны SQL запросов движка.
+
+    Запросы вне трейса (например опрос очереди задач воркером) не трассируются,
+    иначе каждый из них стал бы отдельным трейсом.
+
+    :param engine: Синхронный движок (`AsyncEngine.sync_engine`).
+    :param system: Название СУБД для атрибута `db.system.name`.
+    """
+
+    max_statement_length = settings.tracing.max_statement_length
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_span(connection, cursor, statement, parameters, context, executemany) -> None:  # noqa: ARG001
+        if not trace.get_current_span().is_recording():
+            return
+        operation = statement.lstrip().split(maxsplit=1)[0].upper() if statement.strip() else ""
+        connection.info["otel_span"] = tracer.start_span(
+            operation or system,
+            kind=trace.SpanKind.CLIENT,
+            attributes={
+                "db.system.name": system,
+                "db.operation.name": operation,
+                "db.query.text": statement[:max_statement_length],
+                "db.operation.batch.size": len(parameters) if executemany else 1,
+            },
+        )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def end_span(connection, cursor, statement, parameters, context, executemany) -> None:  # noqa: ARG001
+        span = connection.info.pop("otel_span", None)
+        if span is not None:
+            span.end()
+
+    @event.listens_for(engine, "handle_error")
+    def fail_span(exception_context) -> None:
+        if exception_context.connection is None:
+            return
+        span = exception_context.connection.info.pop("otel_span", None)
+        if span is not None:
+            error = exception_context.original_exception
+            span.record_exception(error)
+            span.set_status(trace.StatusCode.ERROR, type(error).__name__)
+            span.end()
@@ -0,0 +1,89 @@
+from typing import IO
+
+import threading
+from collections.abc import Sequence
+
+from ..settings import TracingSettings
+
+try:  # noqa: PLW0717
+    from google.protobuf.json_format import MessageToJson
+    from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+    from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+    from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+    from opentelemetry.sdk.trace.export import (
+        BatchSpanProcessor,
+        ConsoleSpanExporter,
+        SpanExporter,
+        SpanExportResult,
+    )
+    from opentelemetry.sdk.trace.sampling import ParentBasedTraceIdRatio
+except ImportError as e:
+    raise RuntimeError(
+        "Tracing requires `opentelemetry-sdk` and `opentelemetry-exporter-otlp-proto-http` "
+        "packages, install `telegram-bot[tracing]`"
+    ) from e
+
+
+class OTLPJsonFileSpanExporter(SpanExporter):
+    """Пишет спаны в файл в формате OTLP JSON, по одному запросу экспорта на строку.
+
+    Такой файл читает приёмник `otlpjsonfile` OpenTelemetry Collector,
+    поэтому трейсы можно собрать без работающего коллектора и загрузить позже.
+
+    :param path: Путь к файлу, записи добавляются в конец.
+    """
+
+    def __init__(self, path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file: IO[str] = path.open("a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        line = MessageToJson(encode_spans(spans), indent=None)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:  # noqa: ARG002
+        with self._lock:
+            self._file.flush()
+        return True
+
+
+def create_exporter(tracing_settings: TracingSettings) -> SpanExporter:
+    if tracing_settings.exporter == "file":
+        return OTLPJsonFileSpanExporter(tracing_settings.file_path)
+    if tracing_settings.exporter == "console":
+        return ConsoleSpanExporter()
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import (  # noqa: PLC0415
+        OTLPSpanExporter,
+    )
+
+    # Без явного адреса используются переменные окружения OTEL_EXPORTER_OTLP_*
+    return OTLPSpanExporter(endpoint=tracing_settings.otlp_endpoint)
+
+
+def create_tracer_provider(component: str, tracing_settings: TracingSettings) -> TracerProvider:
+    """Провайдер спанов с выборкой по доле трейсов и пакетным экспортом.
+
+    Решение о записи трейса принимается в его корне (запрос вебхука) и передаётся
+    дочерним спанам, в том числе в воркер через payload задачи, поэтому трейсы
+    сохраняются целиком или не сохраняются вовсе.
+    """
+
+    provider = TracerProvider(
+        resource=Resource.create({SERVICE_NAME: f"{tracing_settings.service_name}-{component}"}),
+        sampler=ParentBasedTraceIdRatio(tracing_settings.sample_ratio),
+    )
+    provider.add_span_processor(BatchSpanProcessor(
+        create_exporter(tracing_settings),
+        max_queue_size=tracing_settings.max_queue_size,
+        max_export_batch_size=tracing_settings.max_export_batch_size,
+        schedule_delay_millis=tracing_settings.schedule_delay_ms,
+    ))
+    return provider
@@ -2,8 +2,12 @@ __all__ = ["router"]
 
 from fastapi import APIRouter
 
+from .courses import router as courses_router
 from .media import router as media_router
+from .tasks import router as tasks_router
 
 router = APIRouter(prefix="/api/v1", tags=["REST API"])
 
+router.include_router(courses_router)
 router.include_router(media_router)
+router.include_router(tasks_router)
@@ -0,0 +1,48 @@
+from typing import Any
+
+from uuid import UUID
+
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import Response
+
+from ....core import schemas
+from ....database.cache import read_cache
+from ....services import courses
+from ...serialization import course_adapter, json_response, module_adapter
+
+router = APIRouter(prefix="/courses", tags=["Courses"])
+
+
+@router.get(
+    path="/cache/stats",
+    status_code=status.HTTP_200_OK,
+    summary="Статистика кэша чтения курсов и модулей"
+)
+async def get_cache_stats() -> dict[str, Any]:
+    return read_cache.stats()
+
+
+@router.get(
+    path="/{course_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.Course,
+    summary="Получение курса"
+)
+async def get_course(course_id: UUID) -> Response:
+    course = await courses.get_course(course_id)
+    if course is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
+    return json_response(course_adapter, course)
+
+
+@router.get(
+    path="/modules/{module_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.Module,
+    summary="Получение модуля с контент блоками и ассессментами"
+)
+async def get_module(module_id: UUID) -> Response:
+    module = await courses.get_module(module_id)
+    if module is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Module not found")
+    return json_response(module_adapter, module)
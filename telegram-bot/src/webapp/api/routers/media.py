@@ -1,7 +1,15 @@
-from fastapi import APIRouter, File, Header, UploadFile, status
+from collections.abc import AsyncIterator
+from urllib.parse import quote
+from uuid import UUID
+
+from fastapi import APIRouter, File, Header, HTTPException, UploadFile, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
 from ....core.schemas import Attachment
+from ....database import crud, models
 from ....services import media
+from ....storage import CHUNK_SIZE, LocalStorage, storage
+from ...serialization import attachment_adapter, json_response
 
 router = APIRouter(prefix="/media", tags=["Media"])
 
@@ -14,7 +22,101 @@ router = APIRouter(prefix="/media", tags=["Media"])
 )
 async def upload(
         user_id: str = Header(alias="X-User-ID"), file: UploadFile = File(...)
-) -> Attachment:
-    return await media.upload(
-        user_id=int(user_id), filename=file.filename, data=await file.read()
+) -> Response:
+    attachment = await media.upload_stream(
+        user_id=int(user_id), filename=file.filename, chunks=_iter_chunks(file)
+    )
+    return json_response(attachment_adapter, attachment, status_code=status.HTTP_201_CREATED)
+
+
+@router.get(
+    path="/{attachment_id}",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    summary="Потоковое скачивание медиа с поддержкой HTTP Range"
+)
+async def download(
+        attachment_id: UUID,
+        range_header: str | None = Header(default=None, alias="Range"),
+        if_range: str | None = Header(default=None, alias="If-Range"),
+) -> Response:
+    attachment = await crud.read(
+        attachment_id, model_class=models.Attachment, schema_class=Attachment
+    )
+    if attachment is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Attachment not found")
+    if isinstance(storage, LocalStorage):
+        # FileResponse сам обрабатывает Range и If-Range, а если ASGI сервер
+        # поддерживает расширение `http.response.pathsend`, отдаёт файл через sendfile
+        return FileResponse(
+            storage.path(attachment.filepath),
+            media_type=attachment.mime_type,
+            filename=attachment.original_filename,
+        )
+    file_stat = await storage.stat(attachment.filepath)
+    if file_stat is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    etag = f'"{attachment.sha256}"' if attachment.sha256 else file_stat.etag
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": (
+            f"attachment; filename*=utf-8''{quote(attachment.original_filename)}"
+        ),
+    }
+    if etag is not None:
+        headers["ETag"] = etag
+    byte_range = (
+        _parse_range(range_header, file_stat.size)
+        if if_range is None or if_range == etag else None
+    )
+    if byte_range is None:
+        return StreamingResponse(
+            storage.get_stream(attachment.filepath),
+            media_type=attachment.mime_type,
+            headers={**headers, "Content-Length": str(file_stat.size)},
+        )
+    start, end = byte_range
+    return StreamingResponse(
+        storage.get_range(attachment.filepath, start, end),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=attachment.mime_type,
+        headers={
+            **headers,
+            "Content-Length": str(end - start + 1),
+            "Content-Range": f"bytes {start}-{end}/{file_stat.size}",
+        },
     )
+
+
+async def _iter_chunks(file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await file.read(CHUNK_SIZE):
+        yield chunk
+
+
+def _parse_range(range_header: str | None, size: int) -> tuple[int, int] | None:
+    """Разбирает заголовок `Range` с одним диапазоном байт.
+
+    Для нескольких диапазонов и некорректного заголовка отдаётся весь файл,
+    что допускается RFC 9110.
+
+    :return: Первый и последний байт диапазона включительно.
+    """
+    if range_header is None or not range_header.startswith("bytes="):
+        return None
+    spec = range_header.removeprefix("bytes=").strip()
+    if "," in spec or "-" not in spec:
+        return None
+    first, last = (value.strip() for value in spec.split("-", 1))
+    if not (first or last) or not (first or "0").isdigit() or not (last or "0").isdigit():
+        return None
+    if not first:
+        # Суффиксный диапазон `bytes=-N` - последние N байт
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
@@ -0,0 +1,63 @@
+from collections.abc import AsyncIterator
+from uuid import UUID
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import Response, StreamingResponse
+
+from ....core import schemas
+from ....database import crud, models
+from ....services.progress import watch
+from ...serialization import json_response, task_adapter
+
+router = APIRouter(prefix="/tasks", tags=["Tasks"])
+
+
+async def _get_task(task_id: UUID) -> schemas.Task:
+    task = await crud.read(task_id, model_class=models.Task, schema_class=schemas.Task)
+    if task is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    return task
+
+
+@router.get(
+    path="/{task_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.Task,
+    summary="Получение задачи"
+)
+async def get_task(task_id: UUID) -> Response:
+    return json_response(task_adapter, await _get_task(task_id))
+
+
+@router.get(
+    path="/{task_id}/progress",
+    status_code=status.HTTP_200_OK,
+    summary="Поток прогресса задачи (Server-Sent Events)"
+)
+async def stream_progress(task_id: UUID) -> StreamingResponse:
+    """События называются по этапу задачи, а частично сгенерированный
+    контент блоков приходит событиями `content` по мере генерации.
+    """
+    await _get_task(task_id)
+
+    async def events() -> AsyncIterator[str]:
+        async for event in watch(task_id):
+            name = "content" if event.content is not None else event.stage
+            yield f"event: {name}\ndata: {event.model_dump_json()}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/{task_id}/progress/ws")
+async def progress_websocket(websocket: WebSocket, task_id: UUID) -> None:
+    await websocket.accept()
+    try:
+        async for event in watch(task_id):
+            await websocket.send_text(event.model_dump_json())
+    except WebSocketDisconnect:
+        return
+    await websocket.close()
@@ -3,19 +3,17 @@ from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 
 from aiogram.types import Update
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from starlette.templating import Jinja2Templates
 
-from ..bot.bot import bot, dp
-from ..settings import PROJECT_ROOT, settings
+from ..bot.bot import bot, dp, update_queue
+from ..bot.updates import EnqueueResult
+from ..settings import settings
+from ..tracing.asgi import TracingMiddleware
 from .api.routers import router as api_router
 from .routers import router
+from .serialization import ORJSONResponse
 
-WEBAPP_DIR = PROJECT_ROOT / "src" / "webapp"
-TEMPLATES_DIR = WEBAPP_DIR / "templates"
-STATIC_DIR = WEBAPP_DIR / "static"
 WEBHOOK_URL = f"{settings.ngrok.url}/hook"
 
 logger = logging.getLogger(__name__)
@@ -30,13 +28,12 @@ async def lifespan(_: FastAPI) -> AsyncIterator[None]:
     yield
     await bot.delete_webhook()
     logger.info("Webhook removed")
+    await update_queue.stop(timeout=settings.webhook.drain_timeout)
+    # Записывает накопленные изменения состояний FSM
+    await dp.storage.close()
 
 
-app = FastAPI(lifespan=lifespan)
-
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
-
-templates = Jinja2Templates(directory=TEMPLATES_DIR)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.include_router(router)
 app.include_router(api_router)
@@ -48,10 +45,18 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Добавлено последним, поэтому внешнее: спан охватывает всю обработку запроса
+app.add_middleware(TracingMiddleware)
 
 
 @app.post("/hook")
-async def handle_telegram_bot_update(request: Request) -> None:
-    data = await request.json()
-    update = Update.model_validate(data, context={"bot": bot})
-    await dp.feed_update(bot=bot, update=update)
+async def handle_telegram_bot_update(request: Request) -> Response:
+    """Принимает апдейт и сразу отвечает, обработка выполняется очередью апдейтов"""
+
+    # Тело разбирается сразу в модель, без промежуточного словаря
+    update = Update.model_validate_json(await request.body(), context={"bot": bot})
+    if update_queue.put(update) == EnqueueResult.QUEUE_FULL:
+        # Telegram повторит доставку позже
+        logger.warning("Update queue is full, update %s rejected", update.update_id)
+        return Response(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return Response(status_code=status.HTTP_200_OK)
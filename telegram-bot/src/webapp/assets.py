@@ -0,0 +1,227 @@
+from typing import Any
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import Request, status
+from fastapi.responses import Response
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, pass_context
+from jinja2.bccache import Bucket
+from starlette.datastructures import Headers
+from starlette.templating import Jinja2Templates
+
+from ..settings import PROJECT_ROOT, settings
+
+WEBAPP_DIR = PROJECT_ROOT / "src" / "webapp"
+TEMPLATES_DIR = WEBAPP_DIR / "templates"
+STATIC_DIR = WEBAPP_DIR / "static"
+TEMPLATES_CACHE_DIR = PROJECT_ROOT / ".tmp" / "jinja"
+
+IMMUTABLE_CACHE_CONTROL = f"public, max-age={settings.webapp.static_max_age}, immutable"
+# Браузер хранит ответ, но перед использованием проверяет его по ETag
+REVALIDATE_CACHE_CONTROL = "no-cache"
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+IDENTITY = "identity"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Asset:
+    """Файл или страница, заранее сжатые всеми поддерживаемыми кодировками"""
+
+    media_type: str
+    digest: str
+    variants: dict[str, bytes]
+
+    def etag(self, encoding: str) -> str:
+        # Варианты в разных кодировках - разные представления, им нужны разные ETag
+        return f'"{self.digest}"' if encoding == IDENTITY else f'"{self.digest}-{encoding}"'
+
+
+def compress(body: bytes, media_type: str) -> Asset:
+    """Создаёт gzip и brotli варианты, если они меньше исходного содержимого.
+
+    Brotli используется только при установленном пакете `brotli`
+    (`telegram-bot[brotli]`), иначе клиенты получают gzip.
+    """
+
+    variants = {IDENTITY: body}
+    if len(body) >= settings.webapp.compress_min_size and media_type.startswith(
+        COMPRESSIBLE_TYPES
+    ):
+        # mtime=0 делает сжатие детерминированным, а ETag стабильным между перезапусками
+        variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+        try:
+            import brotli  # noqa: PLC0415
+        except ImportError:
+            pass
+        else:
+            variants["br"] = brotli.compress(body, quality=11)
+    return Asset(
+        media_type=media_type,
+        digest=hashlib.sha256(body).hexdigest()[:16],
+        variants={
+            encoding: data for encoding, data in variants.items()
+            if encoding == IDENTITY or len(data) < len(body)
+        },
+    )
+
+
+def negotiate_encoding(accept_encoding: str | None, available: dict[str, bytes]) -> str:
+    """Выбирает кодировку ответа по заголовку `Accept-Encoding`, brotli предпочтительнее gzip"""
+
+    if not accept_encoding:
+        return IDENTITY
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        # Кодировки с `q=0` клиент явно отвергает
+        _, _, quality = params.strip().partition("q=")
+        try:
+            if float(quality or 1) > 0:
+                accepted.add(coding.strip().lower())
+        except ValueError:
+            continue
+    for encoding in ("br", "gzip"):
+        if encoding in available and (encoding in accepted or "*" in accepted):
+            return encoding
+    return IDENTITY
+
+
+def asset_response(asset: Asset, request: Request, cache_control: str) -> Response:
+    """Отдаёт подходящий вариант ресурса или 304, если у клиента актуальная копия"""
+
+    encoding = negotiate_encoding(request.headers.get("Accept-Encoding"), asset.variants)
+    etag = asset.etag(encoding)
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if encoding != IDENTITY:
+        headers["Content-Encoding"] = encoding
+    if _is_not_modified(request.headers, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    body = asset.variants[encoding]
+    return Response(
+        content=b"" if request.method == "HEAD" else body,
+        media_type=asset.media_type,
+        headers={**headers, "Content-Length": str(len(body))},
+    )
+
+
+def _is_not_modified(headers: Headers, etag: str) -> bool:
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match is None:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+class StaticAssets:
+    """Статические файлы веб-приложения с отпечатками содержимого в именах.
+
+    Все файлы читаются и сжимаются один раз при создании. Адрес с отпечатком
+    (`css/style.3f2a9c1b7d4e5f60.css`) меняется вместе с содержимым, поэтому
+    кэшируется клиентом навсегда (`immutable`). Адрес без отпечатка тоже
+    обслуживается, но с обязательной проверкой по ETag.
+
+    :param directory: Директория со статикой.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._assets: dict[str, Asset] = {}
+        self._fingerprinted: dict[str, str] = {}
+        for file in sorted(directory.rglob("*")):
+            if not file.is_file():
+                continue
+            path = file.relative_to(directory).as_posix()
+            media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            if media_type.startswith("text/") or media_type == "application/javascript":
+                media_type = f"{media_type}; charset=utf-8"
+            asset = compress(file.read_bytes(), media_type)
+            stem, dot, suffix = path.rpartition(".")
+            fingerprinted = f"{stem}.{asset.digest}.{suffix}" if dot else f"{path}.{asset.digest}"
+            self._assets[path] = self._assets[fingerprinted] = asset
+            self._fingerprinted[path] = fingerprinted
+        logger.info("Loaded %s static assets from %s", len(self._fingerprinted), directory)
+
+    def fingerprint(self, path: str) -> str:
+        """Путь файла с отпечатком содержимого, неизвестные пути возвращаются как есть"""
+
+        return self._fingerprinted.get(path, path)
+
+    def response(self, request: Request, path: str) -> Response:
+        asset = self._assets.get(path)
+        if asset is None:
+            return Response(status_code=status.HTTP_404_NOT_FOUND)
+        # Словарь отпечатков индексирован путями без отпечатка
+        is_fingerprinted = path not in self._fingerprinted
+        return asset_response(
+            asset,
+            request,
+            IMMUTABLE_CACHE_CONTROL if is_fingerprinted else REVALIDATE_CACHE_CONTROL,
+        )
+
+
+class RenderedPages:
+    """Страницы, отрендеренные один раз и отдаваемые из памяти.
+
+    Подходит для шаблонов, не зависящих от запроса: ссылки на статику строятся
+    без хоста (`static_url`), поэтому страница кэшируется по имени шаблона,
+    а не по заголовку `Host`, который задаёт клиент.
+    При включённой перезагрузке шаблонов страница рендерится на каждый запрос.
+
+    :param templates: Шаблоны веб-приложения.
+    """
+
+    def __init__(self, templates: Jinja2Templates) -> None:
+        self.templates = templates
+        self._pages: dict[str, Asset] = {}
+
+    def response(self, request: Request, name: str) -> Response:
+        page = self._pages.get(name)
+        if page is None:
+            html = self.templates.get_template(name).render({"request": request})
+            page = compress(html.encode(), "text/html; charset=utf-8")
+            if not self.templates.env.auto_reload:
+                self._pages[name] = page
+        # HTML ссылается на статику с отпечатками, поэтому сам не может кэшироваться навсегда
+        return asset_response(page, request, REVALIDATE_CACHE_CONTROL)
+
+
+class LazyBytecodeCache(FileSystemBytecodeCache):
+    """Кэш скомпилированных шаблонов, создающий директорию при первой записи, а не при импорте"""
+
+    def dump_bytecode(self, bucket: Bucket) -> None:
+        Path(self.directory).mkdir(parents=True, exist_ok=True)
+        super().dump_bytecode(bucket)
+
+
+@pass_context
+def static_url(context: dict[str, Any], path: str) -> str:
+    """Путь статического файла с отпечатком содержимого для шаблонов (без хоста)"""
+
+    return context["request"].url_for("static", path=static_assets.fingerprint(path)).path
+
+
+static_assets = StaticAssets(STATIC_DIR)
+
+templates = Jinja2Templates(
+    env=Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        autoescape=True,
+        auto_reload=settings.webapp.templates_auto_reload,
+        # Скомпилированные шаблоны переживают перезапуск процесса,
+        # при разработке (перезагрузка шаблонов) на диск ничего не пишется
+        bytecode_cache=(
+            None if settings.webapp.templates_auto_reload
+            else LazyBytecodeCache(str(TEMPLATES_CACHE_DIR))
+        ),
+    )
+)
+templates.env.globals["static_url"] = static_url
+
+pages = RenderedPages(templates)
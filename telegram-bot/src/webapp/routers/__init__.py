@@ -3,7 +3,9 @@ __all__ = ["router"]
 from fastapi import APIRouter
 
 from .courses import router as courses_router
+from .static import router as static_router
 
 router = APIRouter(prefix="")
 
 router.include_router(courses_router)
+router.include_router(static_router)
@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
+
+from ..assets import pages
 
 router = APIRouter(prefix="/courses")
 
 
 @router.get(path="/create", response_class=HTMLResponse)
-async def create_course(request: Request) -> HTMLResponse:
-    from ..app import templates  # noqa: PLC0415
-
-    return templates.TemplateResponse("create_course.html", {"request": request})
+async def create_course(request: Request) -> Response:
+    return pages.response(request, "create_course.html")
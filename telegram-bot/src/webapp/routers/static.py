@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import Response
+
+from ..assets import static_assets
+
+router = APIRouter(prefix="/static")
+
+
+@router.api_route(path="/{path:path}", methods=["GET", "HEAD"], name="static")
+async def get_static(request: Request, path: str) -> Response:  # noqa: RUF029
+    return static_assets.response(request, path)
@@ -0,0 +1,39 @@
+from typing import Any
+
+import orjson
+from fastapi import status
+from fastapi.responses import JSONResponse, Response
+from pydantic import TypeAdapter
+
+from ..core import schemas
+
+# Валидаторы и сериализаторы схем строятся один раз при импорте, а не на каждый запрос
+attachment_adapter = TypeAdapter(schemas.Attachment)
+course_adapter = TypeAdapter(schemas.Course)
+module_adapter = TypeAdapter(schemas.Module)
+task_adapter = TypeAdapter(schemas.Task)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON ответ, сериализуемый через orjson вместо стандартного `json`"""
+
+    def render(self, content: Any) -> bytes:  # noqa: PLR6301
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def json_response[T](
+        adapter: TypeAdapter[T], value: T, status_code: int = status.HTTP_200_OK
+) -> Response:
+    """Сериализует значение сразу в JSON байты сериализатором pydantic.
+
+    FastAPI не валидирует возвращённый `Response` повторно по `response_model`
+    и не строит промежуточный словарь, `response_model` остаётся только для схемы OpenAPI.
+
+    :param adapter: Закэшированный адаптер схемы значения.
+    :param value: Значение для ответа.
+    :param status_code: Код ответа, статус из декоратора маршрута к `Response` не применяется.
+    """
+
+    return Response(
+        content=adapter.dump_json(value), status_code=status_code, media_type="application/json"
+    )
@@ -0,0 +1,18 @@
+from collections.abc import Mapping
+
+from ..core import enums
+from ..services import courses, ingestion
+from .pool import Handler
+
+
+def get_handlers() -> Mapping[str, Handler]:
+    return {
+        enums.TaskKind.COURSE_CREATION: courses.process_creation,
+        enums.TaskKind.ATTACHMENT_PREPARATION: ingestion.process_preparation,
+    }
+
+
+def get_expired_handlers() -> Mapping[str, Handler]:
+    return {
+        enums.TaskKind.COURSE_CREATION: courses.cleanup_creation,
+    }
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import multiprocessing
+import signal
+from collections.abc import Awaitable, Callable, Mapping
+from contextlib import suppress
+
+from opentelemetry import trace
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..core import schemas
+from ..settings import settings
+from ..tracing import TRACE_CONTEXT_KEY, extract_context, tracer
+from . import queue
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[schemas.Task], Awaitable[None]]
+
+
+class Worker:
+    """Асинхронный воркер очереди задач.
+
+    Одновременно выполняет до `concurrency` задач, продлевая их аренду heartbeat'ами.
+    Упавшая задача возвращается в очередь, пока не исчерпано `max_attempts` попыток.
+
+    :param handlers: Обработчики задач по их типу.
+    :param concurrency: Количество одновременно выполняемых задач.
+    :param expired_handlers: Обработчики очистки по типу задачи, вызываются для задач,
+     аренда которых истекла на последней попытке (обработчик задачи не завершился сам,
+     например, упал процесс воркера).
+    """
+
+    def __init__(
+            self,
+            handlers: Mapping[str, Handler],
+            concurrency: int = settings.worker.concurrency,
+            worker_id: str | None = None,
+            expired_handlers: Mapping[str, Handler] | None = None,
+    ) -> None:
+        self.handlers = handlers
+        self.expired_handlers = expired_handlers or {}
+        self.concurrency = concurrency
+        self.worker_id = worker_id or queue.new_worker_id()
+        self.lease_seconds = settings.worker.lease_seconds
+        self.heartbeat_interval = settings.worker.heartbeat_interval
+        self.poll_interval = settings.worker.poll_interval
+        self.max_attempts = settings.worker.max_attempts
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Забирает задачи из очереди до установки события `stop`.
+
+        После остановки дожидается завершения уже запущенных задач.
+        """
+        logger.info("Worker `%s` started with concurrency %s", self.worker_id, self.concurrency)
+        slots = asyncio.Semaphore(self.concurrency)
+        async with asyncio.TaskGroup() as task_group:
+            while not stop.is_set():
+                await slots.acquire()
+                try:
+                    for expired_task in await queue.expire(self.max_attempts):
+                        task_group.create_task(self._cleanup(expired_task))
+                    task = await queue.claim(
+                        self.worker_id, self.lease_seconds, self.max_attempts
+                    )
+                except SQLAlchemyError:
+                    # Временная ошибка БД (например, "database is locked") не должна
+                    # останавливать воркер и отменять уже выполняемые задачи
+                    logger.exception("Worker `%s` failed to claim a task", self.worker_id)
+                    task = None
+                if task is None:
+                    slots.release()
+                    with suppress(TimeoutError):
+                        await asyncio.wait_for(stop.wait(), timeout=self.poll_interval)
+                    continue
+                task_group.create_task(self._execute(task, slots))
+        logger.info("Worker `%s` stopped", self.worker_id)
+
+    async def _heartbeat(self, task: schemas.Task, handler: asyncio.Task[None]) -> None:
+        """Продлевает аренду задачи, а при её потере отменяет обработчик"""
+
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                renewed = await queue.heartbeat(task.id, self.worker_id, self.lease_seconds)
+            except SQLAlchemyError:
+                # Аренда длиннее интервала heartbeat, следующая попытка успеет её продлить
+                logger.exception(
+                    "Worker `%s` failed to renew lease of task %s", self.worker_id, task.id
+                )
+                continue
+            if not renewed:
+                # Задачу с истёкшей арендой уже может выполнять другой воркер
+                logger.warning(
+                    "Worker `%s` lost lease of task %s, cancelling it", self.worker_id, task.id
+                )
+                handler.cancel()
+                return
+
+    async def _execute(self, task: schemas.Task, slots: asyncio.Semaphore) -> None:
+        # Продолжает трейс запроса, поставившего задачу в очередь
+        with tracer.start_as_current_span(
+            f"task {task.kind}",
+            context=extract_context(task.payload.get(TRACE_CONTEXT_KEY)),
+            kind=trace.SpanKind.CONSUMER,
+            attributes={"task.id": str(task.id), "task.attempt": task.attempts},
+        ) as span:
+            handler = asyncio.create_task(self.handlers[task.kind](task))
+            heartbeat = asyncio.create_task(self._heartbeat(task, handler))
+            try:
+                await handler
+            except asyncio.CancelledError:
+                current_task = asyncio.current_task()
+                if current_task is not None and current_task.cancelling():
+                    # Отменён сам воркер, а не обработчик
+                    handler.cancel()
+                    raise
+                # Аренда потеряна, результат задачи записывает её новый владелец
+                span.set_status(trace.StatusCode.ERROR, "Lease lost")
+            except Exception as e:  # noqa: BLE001
+                span.record_exception(e)
+                span.set_status(trace.StatusCode.ERROR, type(e).__name__)
+                await self._finish(task, error=f"{type(e).__name__}: {e}")
+            else:
+                await self._finish(task)
+            finally:
+                heartbeat.cancel()
+                slots.release()
+
+    async def _cleanup(self, task: schemas.Task) -> None:
+        """Вызывает обработчик очистки задачи с истёкшей арендой"""
+
+        handler = self.expired_handlers.get(task.kind)
+        if handler is None:
+            return
+        try:
+            await handler(task)
+        except Exception:
+            logger.exception(
+                "Worker `%s` failed to clean up expired task %s", self.worker_id, task.id
+            )
+
+    async def _finish(self, task: schemas.Task, error: str | None = None) -> None:
+        """Записывает результат задачи, ошибка БД не останавливает воркер"""
+
+        try:
+            if error is None:
+                await queue.complete(task.id, self.worker_id)
+            else:
+                await queue.fail(
+                    task.id, self.worker_id, error=error, retry=task.attempts < self.max_attempts
+                )
+        except SQLAlchemyError:
+            # Задача останется в статусе RUNNING и вернётся в очередь после истечения аренды
+            logger.exception(
+                "Worker `%s` failed to record result of task %s", self.worker_id, task.id
+            )
+
+
+async def serve(
+        handlers: Mapping[str, Handler],
+        concurrency: int,
+        expired_handlers: Mapping[str, Handler] | None = None,
+) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await Worker(handlers, concurrency, expired_handlers=expired_handlers).run(stop)
+
+
+def run_pool(
+        handlers_factory: Callable[[], Mapping[str, Handler]],
+        processes: int,
+        concurrency: int,
+        expired_handlers_factory: Callable[[], Mapping[str, Handler]] | None = None,
+) -> None:
+    """Запускает пул воркеров в отдельных процессах.
+
+    :param handlers_factory: Функция верхнего уровня, возвращающая обработчики задач
+     (вызывается в каждом процессе, чтобы модели загружались уже в нём).
+    :param processes: Количество процессов.
+    :param concurrency: Количество одновременно выполняемых задач в каждом процессе.
+    :param expired_handlers_factory: Функция верхнего уровня, возвращающая обработчики
+     очистки задач с истёкшей арендой.
+    """
+    if processes == 1:
+        _run_process(handlers_factory, concurrency, expired_handlers_factory)
+        return
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(
+            target=_run_process,
+            args=(handlers_factory, concurrency, expired_handlers_factory),
+            name=f"worker-{i}",
+        )
+        for i in range(processes)
+    ]
+    for process in workers:
+        process.start()
+
+    def terminate(*_: object) -> None:
+        for process in workers:
+            process.terminate()
+
+    signal.signal(signal.SIGTERM, terminate)
+    for process in workers:
+        process.join()
+
+
+def _run_process(
+        handlers_factory: Callable[[], Mapping[str, Handler]],
+        concurrency: int,
+        expired_handlers_factory: Callable[[], Mapping[str, Handler]] | None = None,
+) -> None:
+    handlers = handlers_factory()
+    expired_handlers = expired_handlers_factory() if expired_handlers_factory else None
+    asyncio.run(serve(handlers, concurrency, expired_handlers))
@@ -0,0 +1,207 @@
+from typing import Any
+
+import logging
+from datetime import datetime, timedelta
+from uuid import UUID, uuid4
+
+from sqlalchemy import ColumnElement, and_, or_, select, update
+
+from ..core import enums, schemas
+from ..database import models
+from ..database.base import sessionmaker
+from ..tracing import TRACE_CONTEXT_KEY, inject_context
+from ..utils import current_datetime
+
+logger = logging.getLogger(__name__)
+
+
+def _elapsed_seconds(start: datetime, end: datetime) -> float:
+    # SQLite не хранит часовой пояс, поэтому сравниваем наивные значения
+    return (end.replace(tzinfo=None) - start.replace(tzinfo=None)).total_seconds()
+
+
+async def enqueue(
+        kind: enums.TaskKind, resource_id: UUID, payload: dict[str, Any]
+) -> schemas.Task:
+    """Ставит задачу в очередь.
+
+    :param kind: Тип задачи (определяет обработчик).
+    :param resource_id: Идентификатор создаваемого/обрабатываемого ресурса.
+    :param payload: JSON-сериализуемые аргументы обработчика.
+    :return Созданная задача в статусе PENDING.
+    """
+    trace_context = inject_context()
+    if trace_context:
+        # Воркер продолжает трейс запроса, поставившего задачу
+        payload = {**payload, TRACE_CONTEXT_KEY: trace_context}
+    task = schemas.Task(
+        kind=kind, payload=payload, status=enums.TaskStatus.PENDING, resource_id=resource_id
+    )
+    async with sessionmaker() as session:
+        session.add(models.Task(**task.model_dump()))
+        await session.commit()
+    logger.info("Task %s of kind `%s` enqueued", task.id, kind)
+    return task
+
+
+def _lease_expired(now: datetime) -> ColumnElement[bool]:
+    return and_(
+        models.Task.status == enums.TaskStatus.RUNNING,
+        models.Task.lease_expires_at < now,
+    )
+
+
+async def expire(max_attempts: int) -> list[schemas.Task]:
+    """Переводит в статус FAILED задачи с истёкшей арендой и исчерпанными попытками.
+
+    Такие задачи не захватываются повторно, иначе задача, роняющая процесс воркера,
+    выполнялась бы бесконечно. Каждая задача возвращается только одному вызывающему,
+    поэтому очистку после неё выполняет один воркер.
+
+    :param max_attempts: Максимальное количество попыток выполнения задачи.
+    :return Задачи, переведённые в статус FAILED.
+    """
+    now = current_datetime()
+    stmt = (
+        update(models.Task)
+        .where(_lease_expired(now), models.Task.attempts >= max_attempts)
+        .values(
+            status=enums.TaskStatus.FAILED,
+            error="Lease expired",
+            finished_at=now,
+            lease_expires_at=None,
+            updated_at=now,
+        )
+        .returning(models.Task)
+    )
+    async with sessionmaker() as session:
+        result = await session.execute(stmt)
+        await session.commit()
+        tasks = [schemas.Task.model_validate(model) for model in result.scalars()]
+    for task in tasks:
+        logger.warning("Task %s failed: lease expired after %s attempts", task.id, task.attempts)
+    return tasks
+
+
+async def claim(
+        worker_id: str, lease_seconds: int, max_attempts: int
+) -> schemas.Task | None:
+    """Атомарно захватывает самую старую доступную задачу.
+
+    Доступны задачи в статусе PENDING и задачи в статусе RUNNING с истёкшей арендой
+    (воркер упал или перестал отправлять heartbeat), у которых остались попытки.
+    Задачи с исчерпанными попытками завершает `expire`.
+
+    :param worker_id: Идентификатор воркера.
+    :param lease_seconds: Длительность аренды задачи.
+    :param max_attempts: Максимальное количество попыток выполнения задачи.
+    :return Захваченная задача или `None`, если очередь пуста.
+    """
+    now = current_datetime()
+    available = (
+        select(models.Task.id)
+        .where(or_(
+            models.Task.status == enums.TaskStatus.PENDING,
+            and_(_lease_expired(now), models.Task.attempts < max_attempts),
+        ))
+        .order_by(models.Task.created_at)
+        .limit(1)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(models.Task)
+        .where(models.Task.id == available)
+        .values(
+            status=enums.TaskStatus.RUNNING,
+            worker_id=worker_id,
+            started_at=now,
+            heartbeat_at=now,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            attempts=models.Task.attempts + 1,
+            updated_at=now,
+        )
+        .returning(models.Task)
+    )
+    async with sessionmaker() as session:
+        result = await session.execute(stmt)
+        await session.commit()
+        model = result.scalar_one_or_none()
+    if model is None:
+        return None
+    task = schemas.Task.model_validate(model)
+    logger.info(
+        "Task %s claimed by worker `%s` (attempt %s), waited in queue %.2f seconds",
+        task.id, worker_id, task.attempts, _elapsed_seconds(task.created_at, now)
+    )
+    return task
+
+
+async def heartbeat(task_id: UUID, worker_id: str, lease_seconds: int) -> bool:
+    """Продлевает аренду задачи.
+
+    :return `False`, если задача больше не принадлежит воркеру.
+    """
+    now = current_datetime()
+    stmt = (
+        update(models.Task)
+        .where(
+            models.Task.id == task_id,
+            models.Task.worker_id == worker_id,
+            models.Task.status == enums.TaskStatus.RUNNING,
+        )
+        .values(heartbeat_at=now, lease_expires_at=now + timedelta(seconds=lease_seconds))
+    )
+    async with sessionmaker() as session:
+        result = await session.execute(stmt)
+        await session.commit()
+    return result.rowcount == 1
+
+
+async def complete(task_id: UUID, worker_id: str) -> None:
+    now = current_datetime()
+    stmt = (
+        update(models.Task)
+        .where(models.Task.id == task_id, models.Task.worker_id == worker_id)
+        .values(
+            status=enums.TaskStatus.COMPLETED,
+            finished_at=now,
+            lease_expires_at=None,
+            updated_at=now,
+        )
+        .returning(models.Task.started_at)
+    )
+    async with sessionmaker() as session:
+        result = await session.execute(stmt)
+        await session.commit()
+        started_at = result.scalar_one_or_none()
+    if started_at is not None:
+        logger.info(
+            "Task %s completed in %.2f seconds",
+            task_id, _elapsed_seconds(started_at, now)
+        )
+
+
+async def fail(task_id: UUID, worker_id: str, error: str, retry: bool) -> None:
+    """Отмечает неудачное выполнение задачи.
+
+    :param retry: Вернуть задачу в очередь вместо перевода в статус FAILED.
+    """
+    now = current_datetime()
+    values: dict[str, Any] = {"error": error, "lease_expires_at": None, "updated_at": now}
+    if retry:
+        values |= {"status": enums.TaskStatus.PENDING, "worker_id": None}
+    else:
+        values |= {"status": enums.TaskStatus.FAILED, "finished_at": now}
+    stmt = (
+        update(models.Task)
+        .where(models.Task.id == task_id, models.Task.worker_id == worker_id)
+        .values(**values)
+    )
+    async with sessionmaker() as session:
+        await session.execute(stmt)
+        await session.commit()
+    logger.warning("Task %s failed (retry: %s): %s", task_id, retry, error)
+
+
+def new_worker_id() -> str:
+    return uuid4().hex[:12]
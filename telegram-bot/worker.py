@@ -0,0 +1,35 @@
+import argparse
+import logging
+from collections.abc import Mapping
+
+from src.settings import settings
+from src.tracing import setup_tracing
+from src.worker.handlers import get_expired_handlers, get_handlers
+from src.worker.pool import Handler, run_pool
+
+
+def configure_logging(level=logging.INFO):
+    logging.basicConfig(
+        level=level,
+        datefmt="%Y-%m-%d %H:%M:%S",
+        format="[%(asctime)s.%(msecs)03d] %(processName)s %(module)10s:%(lineno)-3d %(levelname)-7s - %(message)s",  # noqa: E501
+    )
+
+
+def init_process() -> Mapping[str, Handler]:
+    configure_logging()
+    setup_tracing("worker")
+    return get_handlers()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пул воркеров очереди задач")
+    parser.add_argument("--processes", type=int, default=settings.worker.processes)
+    parser.add_argument("--concurrency", type=int, default=settings.worker.concurrency)
+    args = parser.parse_args()
+    run_pool(
+        init_process,
+        processes=args.processes,
+        concurrency=args.concurrency,
+        expired_handlers_factory=get_expired_handlers,
+    )